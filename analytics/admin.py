@@ -0,0 +1,65 @@
+from django.contrib import admin
+from django.template.response import TemplateResponse
+
+from category.models import Category
+from . import rollups
+from .models import SalesRollup
+
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    """
+    Sales dashboard. The changelist is replaced by summaries of the rollup
+    table, so it never aggregates the order or payment tables.
+    """
+    change_list_template = 'admin/analytics/dashboard.html'
+    dashboard_days = (7, 30, 90, 365)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        try:
+            days = int(request.GET.get('days', 30))
+        except ValueError:
+            days = 30
+        if days not in self.dashboard_days:
+            days = 30
+        start, end = rollups.day_range(days)
+
+        daily = rollups.series(SalesRollup.DAY, SalesRollup.ALL, start, end)
+        categories = rollups.breakdown(SalesRollup.CATEGORY, start, end)
+        names = Category.objects.in_bulk([int(row['key']) for row in categories if row['key']])
+        for row in categories:
+            category = names.get(int(row['key'])) if row['key'] else None
+            row['name'] = category.name if category else 'Uncategorized'
+
+        orders = sum(row.count for row in daily)
+        revenue = sum(row.amount for row in daily)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.opts,
+            'title': 'Sales dashboard',
+            'days': days,
+            'dashboard_days': self.dashboard_days,
+            'start': start,
+            'end': end,
+            'totals': {
+                'count': orders,
+                'amount': revenue,
+                'units': sum(row.units for row in daily),
+                'average': revenue / orders if orders else None,
+            },
+            'daily': reversed(daily),
+            'categories': categories,
+            'payment_statuses': rollups.breakdown(SalesRollup.PAYMENT_STATUS, start, end),
+            **(extra_context or {}),
+        }
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, self.change_list_template, context)
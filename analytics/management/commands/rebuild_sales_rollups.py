@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from analytics import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute sales rollups from orders and payments (run nightly to reconcile incremental updates)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Number of most recent days to rebuild, including today')
+
+    def handle(self, *args, **options):
+        start, end = rollups.day_range(options['days'])
+        rows = rollups.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows from {start:%Y-%m-%d} to {end:%Y-%m-%d}"))
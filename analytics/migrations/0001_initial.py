@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('dimension', models.CharField(choices=[('all', 'All orders'), ('category', 'Category'), ('payment_status', 'Payment status')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['granularity', 'dimension', 'bucket', 'key'],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'dimension', 'bucket', 'key'), name='sales_rollup_unique')],
+            },
+        ),
+    ]
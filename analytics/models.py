@@ -0,0 +1,50 @@
+from django.db import models
+
+
+class SalesRollup(models.Model):
+    """
+    Precomputed sales totals for one time bucket and one dimension value.
+
+    Maintained incrementally from order/payment events and rebuilt nightly
+    by `python manage.py rebuild_sales_rollups`; dashboards read only this table.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+
+    ALL = 'all'
+    CATEGORY = 'category'
+    PAYMENT_STATUS = 'payment_status'
+    DIMENSION_CHOICES = [
+        (ALL, 'All orders'),
+        (CATEGORY, 'Category'),
+        (PAYMENT_STATUS, 'Payment status'),
+    ]
+
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Category id or payment status; '' for ALL and for uncategorized products
+    key = models.CharField(max_length=50, blank=True)
+    # Orders (payments for PAYMENT_STATUS), their total amount and units sold
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['granularity', 'dimension', 'bucket', 'key']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'dimension', 'bucket', 'key'], name='sales_rollup_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.dimension}={self.key}"
+
+    @property
+    def average(self):
+        return self.amount / self.count if self.count else None
@@ -0,0 +1,234 @@
+"""
+Incrementally maintained sales rollups and the queries that read them
+"""
+import logging
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from order.models import Order, OrderItem
+from payment.models import Payment
+from .models import SalesRollup
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = (SalesRollup.HOUR, SalesRollup.DAY)
+
+
+def bucket_start(when, granularity):
+    """Start of the hour/day containing `when`, in the current time zone"""
+    local = timezone.localtime(when).replace(minute=0, second=0, microsecond=0)
+    if granularity == SalesRollup.DAY:
+        local = local.replace(hour=0)
+    return local
+
+
+class Deltas(dict):
+    """Pending changes per rollup cell: (granularity, bucket, dimension, key) -> [count, amount, units]"""
+
+    def add(self, dimension, key, when, count=0, amount=0, units=0):
+        for granularity in GRANULARITIES:
+            cell = self.setdefault((granularity, bucket_start(when, granularity), dimension, key), [0, Decimal(0), 0])
+            cell[0] += count
+            cell[1] += amount
+            cell[2] += units
+
+
+def apply_deltas(deltas):
+    """Add deltas to their rollup rows, creating missing rows first"""
+    with transaction.atomic():
+        SalesRollup.objects.bulk_create(
+            [SalesRollup(granularity=g, bucket=b, dimension=d, key=k) for g, b, d, k in deltas],
+            ignore_conflicts=True,
+        )
+        for (granularity, bucket, dimension, key), (count, amount, units) in deltas.items():
+            SalesRollup.objects.filter(granularity=granularity, bucket=bucket, dimension=dimension, key=key).update(
+                count=F('count') + count, amount=F('amount') + amount, units=F('units') + units,
+            )
+
+
+def category_key(category_id):
+    return '' if category_id is None else str(category_id)
+
+
+def allocate(total, amounts):
+    """
+    Split an order total across keys in proportion to their undiscounted amounts.
+
+    Works in cents and hands leftover cents to the largest remainders (ties
+    by key), so the shares always add up to `total` exactly.
+    """
+    base = sum(amounts.values())
+    if not base or total == base:
+        return dict(amounts)
+    total_cents = int(total * 100)
+    base_cents = int(base * 100)
+    shares = {}
+    remainders = []
+    for key, amount in amounts.items():
+        share, remainder = divmod(total_cents * int(amount * 100), base_cents)
+        shares[key] = share
+        remainders.append((-remainder, key))
+    for _, key in sorted(remainders)[:total_cents - sum(shares.values())]:
+        shares[key] += 1
+    return {key: Decimal(cents).scaleb(-2) for key, cents in shares.items()}
+
+
+def order_deltas(order, sign=1):
+    deltas = Deltas()
+    lines = OrderItem.objects.filter(order=order).values_list('product__category_id', 'unit_price', 'quantity')
+    amounts = {}
+    units = {}
+    for category_id, unit_price, quantity in lines:
+        key = category_key(category_id)
+        amounts[key] = amounts.get(key, Decimal(0)) + unit_price * quantity
+        units[key] = units.get(key, 0) + quantity
+
+    deltas.add(SalesRollup.ALL, '', order.created_at, sign, sign * order.total, sign * sum(units.values()))
+    # Order discounts are pro-rated across categories so they add up to the ALL amount
+    for key, amount in allocate(order.total, amounts).items():
+        deltas.add(SalesRollup.CATEGORY, key, order.created_at, sign, sign * amount, sign * units[key])
+    return deltas
+
+
+def record_order(order_id, sign=1):
+    """Task: add (sign=1) or remove (sign=-1, on cancellation) an order from the rollups"""
+    order = Order.objects.filter(pk=order_id).first()
+    if order is not None:
+        apply_deltas(order_deltas(order, sign))
+
+
+def record_payment(payment_id, previous_status, status):
+    """Task: move a payment from its previous status bucket to the new one"""
+    payment = Payment.objects.filter(pk=payment_id).first()
+    if payment is None:
+        return
+    deltas = Deltas()
+    if previous_status is not None:
+        deltas.add(SalesRollup.PAYMENT_STATUS, previous_status, payment.created_at, -1, -payment.amount)
+    deltas.add(SalesRollup.PAYMENT_STATUS, status, payment.created_at, 1, payment.amount)
+    apply_deltas(deltas)
+
+
+def rebuild(start, end, batch_size=1000):
+    """
+    Recompute every rollup row with a bucket in [start, end) from the source tables.
+
+    Only hourly GROUP BYs run against orders/payments; daily rows are summed
+    from the hourly ones. Replaces the range in one transaction.
+    """
+    started = time.perf_counter()
+    cells = {}
+
+    def put(dimension, key, bucket, count=0, amount=0, units=0):
+        cell = cells.setdefault((dimension, key, bucket), [0, Decimal(0), 0])
+        cell[0] += count
+        cell[1] += amount or 0
+        cell[2] += units or 0
+
+    orders = (
+        Order.objects.filter(created_at__gte=start, created_at__lt=end)
+        .exclude(status=Order.CANCELLED)
+        .annotate(bucket=TruncHour('created_at'))
+    )
+    for row in orders.values('bucket').annotate(orders=Count('id'), total=Sum('total')).order_by():
+        put(SalesRollup.ALL, '', row['bucket'], row['orders'], row['total'])
+
+    lines = (
+        OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+        .exclude(order__status=Order.CANCELLED)
+        .annotate(bucket=TruncHour('order__created_at'))
+        .values('bucket', 'product__category_id')
+        .annotate(
+            orders=Count('order_id', distinct=True),
+            total=Sum(F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            quantity=Sum('quantity'),
+        )
+        .order_by()
+    )
+    for row in lines:
+        key = category_key(row['product__category_id'])
+        put(SalesRollup.CATEGORY, key, row['bucket'], row['orders'], row['total'], row['quantity'])
+        put(SalesRollup.ALL, '', row['bucket'], units=row['quantity'])
+
+    # The line totals above are undiscounted; take each discounted order's
+    # pro-rated discount off its categories, as order_deltas() does
+    discounted = (
+        OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end, order__discount_total__gt=0)
+        .exclude(order__status=Order.CANCELLED)
+        .order_by('order_id')
+        .values_list('order_id', 'order__total', 'order__created_at', 'product__category_id', 'unit_price', 'quantity')
+        .iterator(chunk_size=batch_size)
+    )
+    for _, order_lines in groupby(discounted, key=itemgetter(0)):
+        amounts = {}
+        for _, total, created_at, category_id, unit_price, quantity in order_lines:
+            key = category_key(category_id)
+            amounts[key] = amounts.get(key, Decimal(0)) + unit_price * quantity
+        hour = bucket_start(created_at, SalesRollup.HOUR)
+        for key, amount in allocate(total, amounts).items():
+            put(SalesRollup.CATEGORY, key, hour, amount=amount - amounts[key])
+
+    payments = (
+        Payment.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(bucket=TruncHour('created_at'))
+        .values('bucket', 'status')
+        .annotate(payments=Count('id'), total=Sum('amount'))
+        .order_by()
+    )
+    for row in payments:
+        put(SalesRollup.PAYMENT_STATUS, row['status'], row['bucket'], row['payments'], row['total'])
+
+    rows = {}
+    for (dimension, key, hour), (count, amount, units) in cells.items():
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(hour, granularity)
+            row = rows.get((granularity, bucket, dimension, key))
+            if row is None:
+                row = rows[granularity, bucket, dimension, key] = SalesRollup(
+                    granularity=granularity, bucket=bucket, dimension=dimension, key=key, amount=Decimal(0),
+                )
+            row.count += count
+            row.amount += amount
+            row.units += units
+
+    with transaction.atomic():
+        SalesRollup.objects.filter(bucket__gte=start, bucket__lt=end).delete()
+        SalesRollup.objects.bulk_create(rows.values(), batch_size=batch_size)
+    logger.info(f"Rebuilt {len(rows)} sales rollup rows for {start} - {end} in {time.perf_counter() - started:.1f}s")
+    return len(rows)
+
+
+def day_range(days, today=None):
+    """[start, end) covering the last `days` local days, including today"""
+    today = bucket_start(today or timezone.now(), SalesRollup.DAY)
+    return today - timedelta(days=days - 1), today + timedelta(days=1)
+
+
+def series(granularity, dimension, start, end, key=None):
+    """Rollup rows for a time range, oldest first"""
+    queryset = SalesRollup.objects.filter(
+        granularity=granularity, dimension=dimension, bucket__gte=start, bucket__lt=end,
+    )
+    if key is not None:
+        queryset = queryset.filter(key=key)
+    return list(queryset.order_by('bucket', 'key'))
+
+
+def breakdown(dimension, start, end):
+    """Totals per key over a range of whole days, largest amount first"""
+    return list(
+        SalesRollup.objects.filter(
+            granularity=SalesRollup.DAY, dimension=dimension, bucket__gte=start, bucket__lt=end,
+        )
+        .values('key')
+        .annotate(count=Sum('count'), amount=Sum('amount'), units=Sum('units'))
+        .order_by('-amount')
+    )
@@ -0,0 +1,29 @@
+"""
+Feed order and payment events into the sales rollups
+"""
+from django.dispatch import receiver
+
+from ecommerce import tasks
+from order.models import Order
+from order.signals import order_placed, order_status_changed
+from payment.signals import payment_status_changed
+from . import rollups
+
+
+@receiver(order_placed)
+def rollup_order_placed(sender, order, **kwargs):
+    tasks.dispatch_on_commit(rollups.record_order, order.pk)
+
+
+@receiver(order_status_changed)
+def rollup_order_status_changed(sender, order, previous_status, **kwargs):
+    # Cancelled orders don't count towards sales
+    if order.status == Order.CANCELLED:
+        tasks.dispatch_on_commit(rollups.record_order, order.pk, -1)
+    elif previous_status == Order.CANCELLED:
+        tasks.dispatch_on_commit(rollups.record_order, order.pk)
+
+
+@receiver(payment_status_changed)
+def rollup_payment_status_changed(sender, payment, previous_status, **kwargs):
+    tasks.dispatch_on_commit(rollups.record_payment, payment.pk, previous_status, payment.status)
@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from category.models import Category
+from order.models import Order, OrderItem
+from product.models import Product
+from . import rollups
+from .models import SalesRollup
+
+User = get_user_model()
+
+
+class AllocateTests(SimpleTestCase):
+    def test_shares_add_up_to_the_total(self):
+        shares = rollups.allocate(Decimal('10.00'), {'a': Decimal('3.00'), 'b': Decimal('3.00'), 'c': Decimal('3.00')})
+        self.assertEqual(sum(shares.values()), Decimal('10.00'))
+        # The leftover cent goes to the first key on a tie
+        self.assertEqual(shares, {'a': Decimal('3.34'), 'b': Decimal('3.33'), 'c': Decimal('3.33')})
+
+    def test_discount_is_split_in_proportion(self):
+        shares = rollups.allocate(Decimal('90.00'), {'a': Decimal('75.00'), 'b': Decimal('25.00')})
+        self.assertEqual(shares, {'a': Decimal('67.50'), 'b': Decimal('22.50')})
+
+    def test_undiscounted_and_empty_orders_are_unchanged(self):
+        amounts = {'a': Decimal('1.99'), '': Decimal('5.01')}
+        self.assertEqual(rollups.allocate(Decimal('7.00'), amounts), amounts)
+        self.assertEqual(rollups.allocate(Decimal('0.00'), {'a': Decimal(0)}), {'a': Decimal(0)})
+
+
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='buyer@example.com', username='buyer', phone_number='+15550006666', password='x',
+        )
+        cls.books = Category.objects.create(name='Books', slug='books')
+        cls.games = Category.objects.create(name='Games', slug='games')
+        cls.book = Product.objects.create(name='Book', sku='BOOK', price=Decimal('10.00'), category=cls.books)
+        cls.game = Product.objects.create(name='Game', sku='GAME', price=Decimal('20.00'), category=cls.games)
+        cls.mug = Product.objects.create(name='Mug', sku='MUG', price=Decimal('5.00'))
+
+    def place_order(self, lines, discount=Decimal(0)):
+        subtotal = sum(product.price * quantity for product, quantity in lines)
+        order = Order.objects.create(
+            user=self.user, subtotal=subtotal, discount_total=discount, total=subtotal - discount,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, product_name=product.name, sku=product.sku,
+                      unit_price=product.price, quantity=quantity)
+            for product, quantity in lines
+        ])
+        return order
+
+    def totals(self, granularity=SalesRollup.DAY):
+        return {
+            (row.dimension, row.key): (row.count, row.amount, row.units)
+            for row in SalesRollup.objects.filter(granularity=granularity).exclude(count=0)
+        }
+
+    def test_discounted_order_categories_add_up_to_all(self):
+        order = self.place_order([(self.book, 3), (self.game, 1), (self.mug, 1)], discount=Decimal('11.00'))
+        rollups.record_order(order.pk)
+
+        totals = self.totals()
+        self.assertEqual(totals[SalesRollup.ALL, ''], (1, Decimal('44.00'), 5))
+        category_amounts = {key: amount for (dimension, key), (_, amount, _) in totals.items()
+                            if dimension == SalesRollup.CATEGORY}
+        self.assertEqual(category_amounts, {
+            str(self.books.pk): Decimal('24.00'), str(self.games.pk): Decimal('16.00'), '': Decimal('4.00'),
+        })
+        self.assertEqual(sum(category_amounts.values()), Decimal('44.00'))
+        self.assertEqual(self.totals(SalesRollup.HOUR), totals)
+
+    def test_cancellation_removes_the_order(self):
+        order = self.place_order([(self.book, 1), (self.game, 2)], discount=Decimal('5.00'))
+        rollups.record_order(order.pk)
+        rollups.record_order(order.pk, -1)
+        self.assertEqual(self.totals(), {})
+
+    def test_rebuild_matches_incremental_rollups(self):
+        orders = [
+            self.place_order([(self.book, 3), (self.game, 1), (self.mug, 1)], discount=Decimal('11.00')),
+            self.place_order([(self.book, 1), (self.mug, 2)], discount=Decimal('0.01')),
+            self.place_order([(self.game, 2)]),
+        ]
+        for order in orders:
+            rollups.record_order(order.pk)
+        incremental = (self.totals(SalesRollup.HOUR), self.totals(SalesRollup.DAY))
+
+        start, end = rollups.day_range(1, timezone.now())
+        rollups.rebuild(start, end)
+        self.assertEqual((self.totals(SalesRollup.HOUR), self.totals(SalesRollup.DAY)), incremental)
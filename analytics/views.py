@@ -0,0 +1,69 @@
+from datetime import datetime, time as dt_time, timedelta
+
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import rollups
+from .models import SalesRollup
+
+MAX_DAYS = 366
+
+
+def parse_range(params):
+    """[start, end) from ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive dates) or ?days=N"""
+    if 'start' in params or 'end' in params:
+        try:
+            first = datetime.strptime(params['start'], '%Y-%m-%d').date()
+            last = datetime.strptime(params.get('end', params['start']), '%Y-%m-%d').date()
+        except (KeyError, ValueError):
+            raise ValidationError({'start': 'Use start=YYYY-MM-DD and optionally end=YYYY-MM-DD.'})
+        if last < first or (last - first).days >= MAX_DAYS:
+            raise ValidationError({'end': f'End must be on or after start, at most {MAX_DAYS} days.'})
+        start = timezone.make_aware(datetime.combine(first, dt_time.min))
+        return start, timezone.make_aware(datetime.combine(last + timedelta(days=1), dt_time.min))
+    try:
+        days = int(params.get('days', 30))
+    except ValueError:
+        raise ValidationError({'days': 'Must be a number.'})
+    return rollups.day_range(min(max(days, 1), MAX_DAYS))
+
+
+class SalesAnalyticsView(APIView):
+    """
+    Sales time series read from the precomputed rollups.
+
+    Query parameters: granularity (hour|day), dimension (all|category|payment_status),
+    key (one category id or payment status), and start/end dates or days.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        granularity = request.query_params.get('granularity', SalesRollup.DAY)
+        dimension = request.query_params.get('dimension', SalesRollup.ALL)
+        if granularity not in dict(SalesRollup.GRANULARITY_CHOICES):
+            raise ValidationError({'granularity': 'Must be hour or day.'})
+        if dimension not in dict(SalesRollup.DIMENSION_CHOICES):
+            raise ValidationError({'dimension': 'Must be all, category or payment_status.'})
+        start, end = parse_range(request.query_params)
+
+        rows = rollups.series(granularity, dimension, start, end, key=request.query_params.get('key'))
+        return Response({
+            'granularity': granularity,
+            'dimension': dimension,
+            'start': start,
+            'end': end,
+            'results': [
+                {
+                    'bucket': row.bucket,
+                    'key': row.key,
+                    'count': row.count,
+                    'amount': row.amount,
+                    'units': row.units,
+                    'average': row.average,
+                }
+                for row in rows
+            ],
+        })
@@ -0,0 +1,122 @@
+"""
+Admin changelist helpers for large tables: index-friendly search and estimated counts
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+# ADMIN_SEARCH_MODE values
+SEARCH_CONTAINS = 'contains'  # Django default: icontains OR across search_fields
+SEARCH_INDEXED = 'indexed'    # exact/prefix lookups on indexed columns only
+SEARCH_TRIGRAM = 'trigram'    # icontains on pg_trgm-indexed columns (PostgreSQL only)
+
+
+def estimate_table_rows(model, using='default'):
+    """Return the planner's row estimate for a model's table, or None if unavailable"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 for tables that have never been analyzed
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+
+    Unfiltered querysets use the PostgreSQL planner estimate once the table is
+    bigger than `exact_count_limit`. Filtered querysets are counted up to the
+    limit only, so the changelist can page through the first
+    `exact_count_limit` matches and the user is expected to narrow the filter.
+    Other backends have no cheap estimate and get the exact count, so every
+    page stays reachable.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().count
+
+        limit = self.exact_count_limit
+        if not queryset.query.has_filters():
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+
+        return queryset.order_by()[:limit].count()
+
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin mixin for tables too big for the default changelist queries.
+
+    `indexed_search_fields` maps field lookups to the lookup type used in the
+    "indexed" search mode, e.g. {'email': 'exact', 'username': 'startswith'}.
+    `trigram_search_fields` lists the columns with pg_trgm indexes on
+    UPPER(column::text) (see ecommerce.trigram_indexes), searched with
+    icontains in the "trigram" mode. Any other mode falls back to the
+    regular search_fields behaviour.
+    """
+    indexed_search_fields = {}
+    trigram_search_fields = ()
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_mode(self, request):
+        mode = getattr(settings, 'ADMIN_SEARCH_MODE', SEARCH_CONTAINS)
+        if mode == SEARCH_TRIGRAM and connections['default'].vendor != 'postgresql':
+            return SEARCH_INDEXED
+        return mode
+
+    def search_term_pk(self, queryset, search_term):
+        """Return the search term as a primary key value, or None if it can't be one"""
+        if not (search_term.isascii() and search_term.isdigit()):
+            return None
+        connection = connections[queryset.db]
+        try:
+            _, max_value = connection.ops.integer_field_range(queryset.model._meta.pk.get_internal_type())
+        except KeyError:
+            # Not an integer primary key
+            return None
+        # Compare lengths first so a huge term is never converted to an int
+        if max_value is not None and len(search_term.lstrip('0')) > len(str(max_value)):
+            return None
+        value = int(search_term)
+        if max_value is not None and value > max_value:
+            return None
+        return value
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        mode = self.get_search_mode(request)
+        if not search_term or mode == SEARCH_CONTAINS:
+            return super().get_search_results(request, queryset, search_term)
+
+        if mode == SEARCH_TRIGRAM and self.trigram_search_fields:
+            lookups = {field: 'icontains' for field in self.trigram_search_fields}
+        else:
+            lookups = self.indexed_search_fields
+
+        query = Q()
+        for field, lookup in lookups.items():
+            query |= Q(**{f'{field}__{lookup}': search_term})
+        pk = self.search_term_pk(queryset, search_term)
+        if pk is not None:
+            query |= Q(pk=pk)
+
+        # None of these lookups span a to-many relation, so no distinct() is needed
+        return queryset.filter(query), False
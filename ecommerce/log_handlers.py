@@ -0,0 +1,186 @@
+"""
+Non-blocking logging: handlers that hand records to a background writer thread
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+# Incoming X-Request-ID values are copied into every log line, so only short
+# token-like ids are trusted; anything else gets a fresh id
+REQUEST_ID_RE = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+_async_handlers = []
+
+
+class _WriterListener(QueueListener):
+    """QueueListener whose stop() gives up after a timeout instead of hanging"""
+
+    def stop(self, timeout=5.0):
+        """Return True once the writer has drained the queue and exited"""
+        thread = self._thread
+        if thread is None:
+            return True
+        self._thread = None
+        try:
+            # The stock stop() uses put_nowait() and raises when the queue is full
+            self.queue.put(self._sentinel, timeout=timeout)
+        except queue.Full:
+            # The writer is stuck (e.g. a hung disk); abandon the queued records
+            return False
+        thread.join(timeout)
+        return not thread.is_alive()
+
+
+class AsyncLogHandler(QueueHandler):
+    """
+    Format records on the calling thread and write them from a background thread.
+
+    `target` is 'file' or 'console' (stderr). The log file is reopened when
+    it is moved, so it can be rotated externally (logrotate) while several
+    worker processes write to it. With `max_bytes` set the handler rotates
+    the file itself, which is only safe for a single process.
+
+    The queue is bounded; when the writer falls behind (e.g. during a disk
+    stall) new records are dropped and counted instead of blocking the
+    request thread. The number dropped is logged once the writer catches up.
+    """
+
+    def __init__(self, target='file', filename=None, max_bytes=0, backup_count=5,
+                 queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = target
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+        self.reported = 0
+        self.listener = None
+        self.start()
+        _async_handlers.append(self)
+
+    def _make_target(self):
+        if self.target == 'console':
+            handler = logging.StreamHandler(sys.stderr)
+        elif self.max_bytes:
+            handler = RotatingFileHandler(
+                self.filename, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8',
+            )
+        else:
+            handler = WatchedFileHandler(self.filename, encoding='utf-8')
+        # Records arrive already formatted by this handler's formatter
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        return handler
+
+    def start(self):
+        self.listener = _WriterListener(self.queue, self._make_target())
+        self.listener.start()
+
+    def stop(self, timeout=5.0):
+        """Flush queued records and stop the writer thread, waiting at most timeout seconds"""
+        listener, self.listener = self.listener, None
+        if listener is None:
+            return
+        if not listener.stop(timeout):
+            # The writer may still be blocked inside a handler; leave its files open
+            return
+        for handler in listener.handlers:
+            if self.dropped > self.reported:
+                handler.handle(self._dropped_record())
+                self.reported = self.dropped
+            handler.close()
+
+    def _dropped_record(self):
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            f"{self.dropped - self.reported} log record(s) dropped because the log writer fell behind",
+            None, None,
+        )
+        record.request_id = request_id_var.get()
+        return self.prepare(record)
+
+    def enqueue(self, record):
+        try:
+            if self.dropped > self.reported:
+                # Report earlier drops as soon as there is room again
+                dropped = self.dropped
+                self.queue.put_nowait(self._dropped_record())
+                self.reported = dropped
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+def _stop_async_handlers():
+    for handler in _async_handlers:
+        handler.stop()
+
+
+def _restart_async_handlers():
+    # Writer threads do not survive fork(); give each child process its own
+    for handler in _async_handlers:
+        handler.queue = queue.Queue(maxsize=handler.queue.maxsize)
+        handler.start()
+
+
+atexit.register(_stop_async_handlers)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_async_handlers)
+
+
+class RequestIDFilter(logging.Filter):
+    """Attach the current request id to every record"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class RequestIDMiddleware:
+    """Assign each request an id (from a valid X-Request-ID or a new uuid) for log correlation"""
+
+    header = 'HTTP_X_REQUEST_ID'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.META.get(self.header, '')
+        if not REQUEST_ID_RE.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response['X-Request-ID'] = request_id
+        return response
@@ -0,0 +1,77 @@
+"""
+Path-aware middleware: run the session/CSRF/auth/messages stack only where it is needed
+"""
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class PathScopedMiddleware:
+    """
+    Wrap the middleware listed in settings.PATH_SCOPED_MIDDLEWARE and skip it
+    for requests under settings.LEAN_MIDDLEWARE_PATH_PREFIXES.
+
+    The JWT-authenticated API never uses sessions, CSRF cookies,
+    request.user from AuthenticationMiddleware or flash messages, so API
+    requests go straight to the next middleware and never touch the
+    session store. Everything else (the admin) gets the full stack,
+    including the wrapped middleware's process_view/process_exception/
+    process_template_response hooks, which Django would otherwise only
+    call for middleware listed directly in MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lean_prefixes = tuple(settings.LEAN_MIDDLEWARE_PATH_PREFIXES)
+        self.view_hooks = []
+        self.template_response_hooks = []
+        self.exception_hooks = []
+
+        handler = get_response
+        for middleware_path in reversed(settings.PATH_SCOPED_MIDDLEWARE):
+            try:
+                instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            # Same hook ordering as django.core.handlers.base.BaseHandler.load_middleware
+            if hasattr(instance, 'process_view'):
+                self.view_hooks.insert(0, instance.process_view)
+            if hasattr(instance, 'process_template_response'):
+                self.template_response_hooks.append(instance.process_template_response)
+            if hasattr(instance, 'process_exception'):
+                self.exception_hooks.append(instance.process_exception)
+            handler = convert_exception_to_response(instance)
+        self.full_stack = handler
+
+    def is_lean(self, request):
+        return request.path_info.startswith(self.lean_prefixes)
+
+    def __call__(self, request):
+        if self.is_lean(request):
+            return self.get_response(request)
+        return self.full_stack(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_lean(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if not self.is_lean(request):
+            for hook in self.template_response_hooks:
+                response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.is_lean(request):
+            return None
+        for hook in self.exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
@@ -0,0 +1,174 @@
+"""
+Pre-fork bootstrap for production app servers.
+
+Importing this module sets up Django, builds the WSGI/ASGI applications and
+warms the caches that every worker would otherwise fill on its first
+requests (URL resolver, compiled templates, serializer fields, password
+hashers, translations, ...). It then closes database connections and calls
+gc.freeze() so the warmed objects stay in copy-on-write pages shared by
+all forked workers instead of being copied by the garbage collector.
+
+    gunicorn ecommerce.preload:application --preload --workers 4
+    gunicorn ecommerce.preload:asgi_application --preload -k uvicorn.workers.UvicornWorker
+"""
+import gc
+import importlib
+import logging
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce.settings')
+
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+# get_wsgi_application() runs django.setup()
+application = get_wsgi_application()
+asgi_application = get_asgi_application()
+
+from django.apps import apps  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.db import connections  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+def warm_urls():
+    """
+    Build the URL resolver's reverse lookup tables. Reversing inside a
+    namespace (e.g. 'admin:index') builds a separate, cached resolver per
+    namespace, so reverse one name in each of them too.
+    """
+    from django.urls import NoReverseMatch, get_resolver, reverse
+
+    def populate(resolver, path=''):
+        count = len(resolver.reverse_dict)
+        for namespace, (_, namespaced) in resolver.namespace_dict.items():
+            name = next((name for name in namespaced.reverse_dict if isinstance(name, str)), None)
+            if name is not None:
+                try:
+                    reverse(f'{path}{namespace}:{name}')
+                except NoReverseMatch:
+                    # Names that need arguments still populate the namespace resolver
+                    pass
+            count += populate(namespaced, f'{path}{namespace}:')
+        return count
+
+    return populate(get_resolver())
+
+
+def warm_templates():
+    """Compile every project, app and form widget template into the cached loaders"""
+    from django.forms.renderers import get_default_renderer
+    from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+
+    renderer = get_default_renderer()
+    # Form widgets render through the form renderer's own template engine
+    renderer_engines = [renderer.engine] if hasattr(renderer, 'engine') else []
+    count = 0
+    for engine in engines.all() + renderer_engines:
+        for directory in getattr(engine, 'template_dirs', ()):
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if not name.endswith(('.html', '.txt')):
+                        continue
+                    template_name = os.path.relpath(os.path.join(root, name), directory)
+                    try:
+                        engine.get_template(template_name)
+                    except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError):
+                        continue
+                    count += 1
+    return count
+
+
+def warm_serializers():
+    """Import every app's serializers and build their fields once"""
+    from rest_framework import serializers
+
+    count = 0
+    for app_config in apps.get_app_configs():
+        try:
+            module = importlib.import_module(f'{app_config.name}.serializers')
+        except ModuleNotFoundError:
+            continue
+        for value in vars(module).values():
+            if (
+                isinstance(value, type) and issubclass(value, serializers.Serializer)
+                and value.__module__ == module.__name__
+            ):
+                try:
+                    value().fields
+                except Exception:
+                    # Serializers that need context or arguments warm up on first use
+                    continue
+                count += 1
+    return count
+
+
+def warm_password_hashers():
+    from django.contrib.auth.hashers import get_hasher, get_hashers_by_algorithm
+
+    get_hasher('default')
+    return len(get_hashers_by_algorithm())
+
+
+def warm_translations():
+    from django.utils import translation
+
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.gettext('Home')
+    translation.deactivate()
+    return 1
+
+
+def warm_token_filter():
+    """Build the token revocation Bloom filter synchronously, before any worker thread exists"""
+    from user.tokens import revocation_store
+
+    revocation_store.build()
+    return revocation_store.filter.count
+
+
+def warm_recommendations():
+    from product.recommendations import recommendation_table
+
+    recommendation_table._maybe_reload()
+    return 0 if recommendation_table._keys is None else len(recommendation_table._keys)
+
+
+WARMERS = [
+    warm_urls,
+    warm_templates,
+    warm_serializers,
+    warm_password_hashers,
+    warm_translations,
+    warm_token_filter,
+    warm_recommendations,
+]
+
+
+def warm_up():
+    started = time.perf_counter()
+    for warmer in WARMERS:
+        step_started = time.perf_counter()
+        try:
+            count = warmer()
+        except Exception as e:
+            logger.warning(f"Preload step {warmer.__name__} failed: {str(e)}")
+            continue
+        logger.info(f"Preload {warmer.__name__}: {count} in {(time.perf_counter() - step_started) * 1000:.0f} ms")
+
+    # Workers must open their own database connections
+    connections.close_all()
+
+    # Move everything allocated so far out of the collector's reach, so gc passes
+    # in the workers don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"Preload finished in {(time.perf_counter() - started) * 1000:.0f} ms, "
+        f"{gc.get_freeze_count()} objects frozen"
+    )
+
+
+warm_up()
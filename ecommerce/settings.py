@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     'tracking',
     'payment',
     'notification',
+    'analytics',
 ]
 
 REST_FRAMEWORK = {
@@ -81,15 +82,42 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+SIMPLE_JWT = {
+    # Every refresh returns a new refresh token and revokes the old one
+    'ROTATE_REFRESH_TOKENS': True,
+    'TOKEN_REFRESH_SERIALIZER': 'user.tokens.RotatingTokenRefreshSerializer',
+}
+
+# Revoked refresh tokens are checked against an in-process Bloom filter before the
+# database. Size the filter for the number of refreshes within one refresh token
+# lifetime (~1.8 MB per million entries at 0.1% false positives); it is rebuilt
+# larger automatically when exceeded. Expired entries: python manage.py prune_revoked_tokens
+TOKEN_REVOCATION_FILTER_CAPACITY = config('TOKEN_REVOCATION_FILTER_CAPACITY', default=1_000_000, cast=int)
+TOKEN_REVOCATION_FILTER_ERROR_RATE = config('TOKEN_REVOCATION_FILTER_ERROR_RATE', default=0.001, cast=float)
+TOKEN_REVOCATION_SYNC_SECONDS = config('TOKEN_REVOCATION_SYNC_SECONDS', default=1.0, cast=float)
+
 MIDDLEWARE = [
+    'ecommerce.log_handlers.RequestIDMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'ecommerce.middleware.PathScopedMiddleware',  # Runs PATH_SCOPED_MIDDLEWARE below
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Session-based middleware used by the admin. The JWT API doesn't need any of it,
+# so it is skipped for requests under LEAN_MIDDLEWARE_PATH_PREFIXES.
+PATH_SCOPED_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+LEAN_MIDDLEWARE_PATH_PREFIXES = ['/api/']
+
+# The admin checks look for session/auth/messages middleware directly in MIDDLEWARE;
+# they are provided through PathScopedMiddleware instead (pinned by
+# ecommerce.tests.PathScopedMiddlewareTests).
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'ecommerce.urls'
 
@@ -111,6 +139,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ecommerce.wsgi.application'
 
+TEST_RUNNER = 'ecommerce.test_runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -122,6 +152,16 @@ DATABASES = {
     }
 }
 
+# Per-process by default. With several workers, point this at a shared cache
+# (e.g. django.core.cache.backends.redis.RedisCache) so invalidations made by one
+# worker reach all of them; the order history first page is only cached then.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -164,6 +204,77 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'  # For production
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# In production collectstatic writes content-hashed names plus .gz and .br
+# (needs the `Brotli` package from requirements.txt) variants of text assets
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'ecommerce.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Product image variants (name: max width in px), generated as JPEG and WebP
+PRODUCT_IMAGE_SIZES = {'thumb': 150, 'small': 320, 'medium': 640, 'large': 1280}
+# Processes per app server worker that resize uploaded images (0 resizes in the
+# background task thread itself). Backfills use generate_product_images --workers
+PRODUCT_IMAGE_UPLOAD_PROCESSES = config('PRODUCT_IMAGE_UPLOAD_PROCESSES', default=2, cast=int)
+
+# "Frequently bought together": top-K related products per product, served from a
+# memory-mapped table written by `python manage.py build_recommendations`
+RECOMMENDATIONS_TOP_K = config('RECOMMENDATIONS_TOP_K', default=10, cast=int)
+RECOMMENDATIONS_FILE = config('RECOMMENDATIONS_FILE', default=str(BASE_DIR / 'var' / 'recommendations.npy'))
+# After an order updates the co-occurrence counts, the table is re-exported in the
+# background at most this often (seconds); lookups read the counts directly until
+# the first export exists
+RECOMMENDATIONS_EXPORT_INTERVAL = config('RECOMMENDATIONS_EXPORT_INTERVAL', default=300, cast=int)
+# Orders with more distinct products than this are ignored (bulk buys say little about affinity)
+RECOMMENDATIONS_MAX_BASKET = config('RECOMMENDATIONS_MAX_BASKET', default=50, cast=int)
+
+# Audit log (user.activity): events are queued in memory and written in batches of
+# ACTIVITY_LOG_BATCH_SIZE, at most ACTIVITY_LOG_FLUSH_SECONDS after they happen.
+# When the queue is full, request threads write a batch themselves instead of dropping events.
+ACTIVITY_LOG_QUEUE_SIZE = config('ACTIVITY_LOG_QUEUE_SIZE', default=10000, cast=int)
+ACTIVITY_LOG_BATCH_SIZE = config('ACTIVITY_LOG_BATCH_SIZE', default=500, cast=int)
+ACTIVITY_LOG_FLUSH_SECONDS = config('ACTIVITY_LOG_FLUSH_SECONDS', default=2.0, cast=float)
+# Write each event inline instead (ecommerce.test_runner turns this on for tests)
+ACTIVITY_LOG_EAGER = config('ACTIVITY_LOG_EAGER', default=False, cast=bool)
+
+# Order history API: default page size, and how long a user's cached first page
+# may live (it is also dropped whenever their orders or shipments change; not
+# cached at all with a per-process CACHES backend)
+ORDER_HISTORY_PAGE_SIZE = config('ORDER_HISTORY_PAGE_SIZE', default=20, cast=int)
+ORDER_HISTORY_CACHE_SECONDS = config('ORDER_HISTORY_CACHE_SECONDS', default=300, cast=int)
+
+# Rate card backend per carrier code; rates are synced into the database with
+# `python manage.py sync_shipping_rates` and quoted from memory (tracking.rates).
+# The stub carrier generates a deterministic rate card for offline use.
+SHIPPING_CARRIER_BACKENDS = {
+    'stub': 'tracking.carriers.StubCarrier',
+}
+
+# Product page views are buffered per process and flushed every
+# PRODUCT_VIEW_FLUSH_SECONDS (see product.counters). Trending ranks by views decayed
+# with this half-life (hours, at least 1; changing it rescales scores on the next
+# flush); trending/most-viewed lists hold PRODUCT_TOP_SIZE products and are cached
+# for PRODUCT_TOP_CACHE_SECONDS.
+PRODUCT_VIEW_FLUSH_SECONDS = config('PRODUCT_VIEW_FLUSH_SECONDS', default=10, cast=float)
+PRODUCT_POPULARITY_HALF_LIFE_HOURS = config('PRODUCT_POPULARITY_HALF_LIFE_HOURS', default=72, cast=float)
+PRODUCT_TOP_SIZE = config('PRODUCT_TOP_SIZE', default=50, cast=int)
+PRODUCT_TOP_CACHE_SECONDS = config('PRODUCT_TOP_CACHE_SECONDS', default=60, cast=int)
+
+# Serve STATIC_ROOT/MEDIA_ROOT from Django (precompressed variants, immutable caching
+# for hashed names, sendfile via FileResponse) when no web server sits in front
+SERVE_STATIC = config('SERVE_STATIC', default=False, cast=bool)
+# Media paths whose names are content hashes, so they can be cached forever
+IMMUTABLE_MEDIA_PREFIXES = ['products/originals/', 'products/variants/']
+# Static and media responses don't need sessions either (see PathScopedMiddleware)
+LEAN_MIDDLEWARE_PATH_PREFIXES += ['/' + STATIC_URL, '/' + MEDIA_URL]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -171,6 +282,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'user.CustomUser'
 
+# Country calling code (e.g. '44') applied to phone numbers entered without a
+# '+' or '00' prefix; a leading trunk '0' is dropped. Empty leaves such numbers
+# unprefixed, so they fail E.164 validation (registration needs a '+' number)
+# instead of being guessed. Required by migration user 0010 when existing users
+# have numbers stored without a country code.
+PHONE_DEFAULT_COUNTRY_CODE = config('PHONE_DEFAULT_COUNTRY_CODE', default='')
+
+# Admin search for large tables:
+#   'contains' - Django default, icontains across all search_fields (table scans)
+#   'indexed'  - exact/prefix matches on indexed columns only
+#   'trigram'  - icontains on pg_trgm-indexed columns (PostgreSQL only, falls back to 'indexed')
+ADMIN_SEARCH_MODE = config('ADMIN_SEARCH_MODE', default='contains')
+
 # Security Settings
 if not DEBUG:
     # HTTPS Settings
@@ -185,28 +309,72 @@ if not DEBUG:
     SECURE_HSTS_PRELOAD = True
 
 # Logging Configuration
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
-            'style': '{',
+# LOG_ASYNC=True hands log records to background writer threads (bounded queue)
+# so request threads never block on log I/O.
+# LOG_JSON=True writes one JSON object per line, including the request id.
+LOG_ASYNC = config('LOG_ASYNC', default=False, cast=bool)
+LOG_JSON = config('LOG_JSON', default=False, cast=bool)
+# Rotate logs/django.log externally (logrotate); the async handler reopens it when
+# it is moved. LOG_MAX_BYTES > 0 makes the handler rotate by size itself, which
+# is only safe when a single process writes the file.
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=0, cast=int)
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=5, cast=int)
+
+if LOG_ASYNC:
+    LOG_HANDLERS = {
+        'file': {
+            'level': 'INFO',
+            'class': 'ecommerce.log_handlers.AsyncLogHandler',
+            'target': 'file',
+            'filename': BASE_DIR / 'logs' / 'django.log',
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'formatter': 'json' if LOG_JSON else 'verbose',
+            'filters': ['request_id'],
         },
-    },
-    'handlers': {
+        'console': {
+            'level': 'DEBUG',
+            'class': 'ecommerce.log_handlers.AsyncLogHandler',
+            'target': 'console',
+            'formatter': 'json' if LOG_JSON else 'verbose',
+            'filters': ['request_id'],
+        },
+    }
+else:
+    LOG_HANDLERS = {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'logging.handlers.WatchedFileHandler',
             'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
+            'formatter': 'json' if LOG_JSON else 'verbose',
+            'filters': ['request_id'],
         },
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'formatter': 'json' if LOG_JSON else 'verbose',
+            'filters': ['request_id'],
+        },
+    }
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'verbose': {
+            'format': '{levelname} {asctime} {request_id} {module} {message}',
+            'style': '{',
+        },
+        'json': {
+            '()': 'ecommerce.log_handlers.JSONFormatter',
+        },
+    },
+    'filters': {
+        'request_id': {
+            '()': 'ecommerce.log_handlers.RequestIDFilter',
         },
     },
+    'handlers': LOG_HANDLERS,
     'root': {
         'handlers': ['console', 'file'],
         'level': 'INFO',
@@ -239,6 +407,31 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@ecommerce.com')
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
 
+# Background tasks (ecommerce.tasks: welcome emails, counters, image processing, user
+# removal jobs) run in an in-process thread pool after the request's transaction
+# commits. Tasks that fail or overflow the queue are stored in the database; retry
+# them with: python manage.py run_pending_tasks
+BACKGROUND_TASK_WORKERS = config('BACKGROUND_TASK_WORKERS', default=4, cast=int)
+BACKGROUND_TASK_QUEUE_SIZE = config('BACKGROUND_TASK_QUEUE_SIZE', default=1000, cast=int)
+# Run tasks inline instead of in the pool (useful for tests and debugging)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+
+# Seconds to hold notifications of these types so bursts of one type for the same
+# user are coalesced into one digest (delivered by `python manage.py send_notification_digests`).
+# Types not listed are sent immediately.
+NOTIFICATION_COALESCE_WINDOWS = {
+    'order_placed': 300,
+    'order_shipped': 300,
+    'order_delivered': 300,
+    'promotion': 3600,
+    'system': 600,
+}
+# Notifications whose digest email failed stay pending and are retried after this many seconds
+NOTIFICATION_DIGEST_RETRY_SECONDS = config('NOTIFICATION_DIGEST_RETRY_SECONDS', default=300, cast=int)
+
+# Where `python manage.py archive_notifications --to jsonl` writes compressed archives
+NOTIFICATION_ARCHIVE_DIR = config('NOTIFICATION_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+
 # For development, use console backend (emails print to console)
 # For production, set EMAIL_BACKEND to 'django.core.mail.backends.smtp.EmailBackend'
 # and configure EMAIL_HOST, EMAIL_PORT, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Serve static and media files with precompressed variants and long-lived caching
+"""
+import mimetypes
+import posixpath
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_hashed_names = None
+
+
+def accepted_encodings(header):
+    """Return the content codings allowed by an Accept-Encoding header (q=0 excluded)"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding)
+    return accepted
+
+
+def is_hashed_static(path):
+    """True if path is a content-hashed name from the collectstatic manifest"""
+    global _hashed_names
+    if _hashed_names is None:
+        hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+        if hashed_files is not None and not hashed_files:
+            hashed_files = staticfiles_storage.load_manifest()
+        _hashed_names = frozenset(hashed_files.values()) if hashed_files else frozenset()
+    return path in _hashed_names
+
+
+def set_cache_headers(response, statobj, immutable, max_age):
+    response['Last-Modified'] = http_date(statobj.st_mtime)
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else f'public, max-age={max_age}'
+    return response
+
+
+def serve_file(request, path, document_root, immutable=False, max_age=3600):
+    """
+    Serve a file from document_root, preferring a precompressed variant.
+
+    Uses FileResponse so WSGI servers that provide wsgi.file_wrapper can
+    send the file with sendfile() instead of copying it through Python.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    fullpath = Path(safe_join(document_root, path))
+    if not fullpath.is_file():
+        raise Http404(f'"{path}" does not exist')
+
+    statobj = fullpath.stat()
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), statobj.st_mtime):
+        # A 304 carries the same caching headers as the 200 it stands in for
+        return set_cache_headers(HttpResponseNotModified(), statobj, immutable, max_age)
+
+    content_type, _ = mimetypes.guess_type(str(fullpath))
+    served, content_encoding = fullpath, None
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    for coding, suffix in ENCODINGS:
+        variant = fullpath.with_name(fullpath.name + suffix)
+        if coding in accepted and variant.is_file():
+            served, content_encoding = variant, coding
+            break
+
+    # filename= keeps Content-Disposition on the original name, not the .gz/.br variant
+    response = FileResponse(
+        served.open('rb'), content_type=content_type or 'application/octet-stream', filename=fullpath.name,
+    )
+    set_cache_headers(response, statobj, immutable, max_age)
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    return response
+
+
+def serve_static(request, path):
+    return serve_file(request, path, settings.STATIC_ROOT, immutable=is_hashed_static(path))
+
+
+def serve_media(request, path):
+    immutable = path.startswith(tuple(getattr(settings, 'IMMUTABLE_MEDIA_PREFIXES', ())))
+    return serve_file(request, path, settings.MEDIA_ROOT, immutable=immutable)
@@ -0,0 +1,65 @@
+"""
+Static files storage that writes gzip/brotli variants next to the hashed files
+"""
+import gzip
+import logging
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # in requirements.txt; without it only .gz variants are written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.svg', '.html', '.txt', '.json', '.xml', '.ico', '.ttf', '.otf', '.eot',
+}
+# Don't keep a variant unless it saves at least this fraction of the original size
+MIN_SAVING = 0.05
+
+
+def compress_file(path):
+    """Write path.gz (and path.br when brotli is installed) if compression pays off"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    if not content:
+        return []
+
+    variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compress in variants:
+        compressed = compress(content)
+        if len(compressed) <= len(content) * (1 - MIN_SAVING):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also precompresses text assets at collectstatic time.
+
+    Hashed names are safe to cache forever; see ecommerce.static_serving
+    for the view that serves them with immutable cache headers and picks
+    the .br/.gz variant from Accept-Encoding.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        # Both the original and the hashed copies are served, so compress both
+        names = set(paths) | set(self.hashed_files.values())
+        count = 0
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                count += len(compress_file(self.path(name)))
+        logger.info(f"Wrote {count} precompressed static file variants")
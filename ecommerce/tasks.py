@@ -0,0 +1,140 @@
+"""
+Project-wide in-process dispatcher for side effects that must run after a
+transaction commits (emails, counters, image processing, user removal jobs).
+
+Calls that can't run are stored as notification.PendingTask rows and retried
+with `python manage.py run_pending_tasks`.
+"""
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class TaskDispatcher:
+    """
+    Small thread-pool task queue.
+
+    Tasks are plain module-level functions called with JSON-serializable
+    arguments. When the queue is full, the pool is shut down, or a task
+    raises, the call is stored as a PendingTask row so it can be retried
+    later with `python manage.py run_pending_tasks`.
+    """
+
+    def __init__(self, max_workers, max_queued):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        # Created lazily so forked workers don't inherit dead threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='background-task',
+                    )
+        return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) on the pool, falling back to the database"""
+        if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+            self._run(func, args, kwargs, release=False)
+            return
+
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"Task queue full, storing {task_path(func)} for later")
+            store_pending(func, args, kwargs, 'Task queue full')
+            return
+
+        try:
+            self.executor.submit(self._run, func, args, kwargs)
+        except RuntimeError as e:
+            # Interpreter is shutting down; keep the task rather than dropping it
+            self._slots.release()
+            store_pending(func, args, kwargs, str(e))
+
+    def _run(self, func, args, kwargs, release=True):
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Task {task_path(func)} failed: {str(e)}")
+            store_pending(func, args, kwargs, str(e))
+        finally:
+            if release:
+                # Pool threads are long-lived: close their connections like the end of a
+                # request would, instead of leaving one open per thread
+                connections.close_all()
+                self._slots.release()
+
+    def shutdown(self, wait=True):
+        """Drain queued tasks (called at interpreter exit)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+def task_path(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def store_pending(func, args, kwargs, error=''):
+    """Persist a task call so it survives a failure or a process restart"""
+    from notification.models import PendingTask
+
+    try:
+        return PendingTask.objects.create(
+            task=task_path(func),
+            args=list(args),
+            kwargs=dict(kwargs),
+            last_error=error,
+        )
+    except Exception as e:
+        logger.error(f"Could not store pending task {task_path(func)}: {str(e)}")
+
+
+def run_pending(limit=100):
+    """Retry stored tasks, returning (succeeded, failed) counts"""
+    from notification.models import PendingTask
+
+    succeeded = failed = 0
+    for pending in PendingTask.objects.order_by('id')[:limit]:
+        try:
+            import_string(pending.task)(*pending.args, **pending.kwargs)
+        except Exception as e:
+            failed += 1
+            pending.attempts += 1
+            pending.last_error = str(e)
+            pending.save(update_fields=['attempts', 'last_error', 'updated_at'])
+            logger.error(f"Pending task {pending.task} failed again: {str(e)}")
+        else:
+            succeeded += 1
+            pending.delete()
+    return succeeded, failed
+
+
+dispatcher = TaskDispatcher(
+    max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 4),
+    max_queued=getattr(settings, 'BACKGROUND_TASK_QUEUE_SIZE', 1000),
+)
+atexit.register(dispatcher.shutdown)
+
+
+def dispatch(func, *args, **kwargs):
+    """Run func in the background as soon as possible"""
+    dispatcher.submit(func, *args, **kwargs)
+
+
+def dispatch_on_commit(func, *args, **kwargs):
+    """Run func in the background once the current transaction commits"""
+    transaction.on_commit(lambda: dispatcher.submit(func, *args, **kwargs))
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Writes audit events inline, so none are still queued when the test database is destroyed
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._activity_log_eager = settings.ACTIVITY_LOG_EAGER
+        settings.ACTIVITY_LOG_EAGER = True
+
+    def teardown_test_environment(self, **kwargs):
+        settings.ACTIVITY_LOG_EAGER = self._activity_log_eager
+        super().teardown_test_environment(**kwargs)
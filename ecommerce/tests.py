@@ -0,0 +1,282 @@
+import csv
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from .admin_exports import StreamingExportMixin
+from .log_handlers import AsyncLogHandler, RequestIDFilter, RequestIDMiddleware
+from .middleware import PathScopedMiddleware
+from .static_serving import serve_file
+from .trigram_indexes import create_trigram_indexes
+
+
+class BlockingHandler(logging.Handler):
+    """Target handler that holds the writer thread until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.messages.append(record.getMessage())
+
+
+class AsyncLogHandlerTests(SimpleTestCase):
+    def make_handler(self, target, queue_size=2):
+        handler = AsyncLogHandler(target='console', queue_size=queue_size)
+        handler.stop()
+        handler._make_target = lambda: target
+        handler.start()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.addCleanup(handler.stop, 0.1)
+        return handler
+
+    def record(self, message):
+        return logging.LogRecord('test', logging.INFO, __file__, 0, message, None, None)
+
+    def test_dropped_records_are_reported_once_there_is_room(self):
+        target = BlockingHandler()
+        handler = self.make_handler(target)
+        for n in range(6):
+            handler.handle(self.record(f'm{n}'))
+        self.assertGreater(handler.dropped, 0)
+
+        target.unblock.set()
+        while not handler.queue.empty():
+            time.sleep(0.01)
+        handler.handle(self.record('after'))
+        handler.stop()
+
+        self.assertEqual(handler.reported, handler.dropped)
+        self.assertIn(f'{handler.dropped} log record(s) dropped because the log writer fell behind', target.messages)
+        self.assertEqual(target.messages[-1], 'after')
+
+    def test_stop_gives_up_when_the_writer_is_stuck(self):
+        handler = self.make_handler(BlockingHandler(), queue_size=1)
+        for n in range(3):
+            handler.handle(self.record(f'm{n}'))
+
+        started = time.monotonic()
+        handler.stop(timeout=0.2)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertIsNone(handler.listener)
+
+    def test_file_target_follows_external_rotation(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'app.log')
+            handler = AsyncLogHandler(target='file', filename=path)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            handler.handle(self.record('before'))
+            handler.stop()
+            handler.start()
+            os.rename(path, path + '.1')
+            handler.handle(self.record('after'))
+            handler.close()
+
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(file.read(), 'after\n')
+
+
+class RequestIDMiddlewareTests(SimpleTestCase):
+    def request_id(self, header=None):
+        seen = {}
+
+        def view(request):
+            record = logging.LogRecord('test', logging.INFO, __file__, 0, '', None, None)
+            RequestIDFilter().filter(record)
+            seen['request_id'] = record.request_id
+            return HttpResponse()
+
+        headers = {} if header is None else {'HTTP_X_REQUEST_ID': header}
+        response = RequestIDMiddleware(view)(RequestFactory().get('/', **headers))
+        self.assertEqual(response['X-Request-ID'], seen['request_id'])
+        return seen['request_id']
+
+    def test_valid_incoming_id_is_kept(self):
+        self.assertEqual(self.request_id('abc-123.DEF_4'), 'abc-123.DEF_4')
+
+    def test_invalid_incoming_ids_are_replaced(self):
+        for header in ('', 'x' * 65, 'bad id', 'inject\nWARNING fake', 'café'):
+            request_id = self.request_id(header)
+            self.assertNotEqual(request_id, header)
+            self.assertRegex(request_id, r'^[0-9a-f]{32}$')
+
+    def test_missing_id_is_generated(self):
+        self.assertRegex(self.request_id(), r'^[0-9a-f]{32}$')
+
+
+class ServeFileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        with open(os.path.join(self.root, 'app.css'), 'w') as file:
+            file.write('body {}')
+        with open(os.path.join(self.root, 'app.css.gz'), 'wb') as file:
+            file.write(b'gzipped')
+        self.mtime = os.stat(os.path.join(self.root, 'app.css')).st_mtime
+
+    def serve(self, **headers):
+        request = RequestFactory().get('/static/app.css', **headers)
+        return serve_file(request, 'app.css', self.root, immutable=True)
+
+    def test_precompressed_variant_keeps_original_name_and_type(self):
+        response = self.serve(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.addCleanup(response.close)
+        self.assertEqual(b''.join(response.streaming_content), b'gzipped')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="app.css"')
+
+    def test_not_modified_has_caching_headers(self):
+        response = self.serve(HTTP_IF_MODIFIED_SINCE=http_date(self.mtime + 60))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Last-Modified'], http_date(self.mtime))
+
+
+class StreamingExportTests(TestCase):
+    url = reverse('admin:user_customuser_export')
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', phone_number='+15550001001', password='x',
+        )
+        cls.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', phone_number='+15550001002', password='x', is_staff=True,
+        )
+        User.objects.create_user(username='buyer', email='buyer@example.com', phone_number='+15550001003', password='x')
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_csv_has_only_export_fields(self):
+        self.client.force_login(self.admin)
+        rows = self.export()
+        self.assertEqual(rows[0][:3], ['id', 'uuid', 'username'])
+        self.assertNotIn('password', rows[0])
+        self.assertEqual(sorted(row[2] for row in rows[1:]), ['admin', 'buyer', 'staff'])
+
+    def test_changelist_filters_and_search_apply(self):
+        self.client.force_login(self.admin)
+        self.assertEqual([row[2] for row in self.export(is_staff__exact=1)[1:]], ['admin', 'staff'])
+        self.assertEqual([row[2] for row in self.export(q='buyer')[1:]], ['buyer'])
+
+    def test_bad_filter_redirects_to_the_changelist(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, {'id__gte': 'abc'})
+        self.assertRedirects(response, reverse('admin:user_customuser_changelist') + '?e=1', fetch_redirect_response=False)
+
+    def test_view_permission_is_required(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.staff.user_permissions.add(Permission.objects.get(codename='view_customuser'))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_export_fields_are_required(self):
+        class NoFieldsAdmin(StreamingExportMixin, admin.ModelAdmin):
+            pass
+
+        errors = NoFieldsAdmin(get_user_model(), admin.AdminSite()).check()
+        self.assertIn('ecommerce.E001', [error.id for error in errors])
+
+
+class TrigramIndexTests(SimpleTestCase):
+    def setUp(self):
+        # The mocked connection has no real transactions
+        patcher = mock.patch('ecommerce.trigram_indexes.transaction')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def schema_editor(self, existing):
+        editor = mock.MagicMock()
+        editor.connection.vendor = 'postgresql'
+        editor.quote_name = lambda name: f'"{name}"'
+        editor.connection.cursor.return_value.__enter__.return_value.fetchone.return_value = existing
+        return editor
+
+    def statements(self, editor):
+        return [call.args[0] for call in editor.execute.call_args_list]
+
+    def test_index_is_on_the_expression_icontains_queries(self):
+        editor = self.schema_editor(None)
+        create_trigram_indexes(editor, 'user_customuser', {'email_trgm': 'email'})
+        self.assertEqual(self.statements(editor)[1:], [
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS "email_trgm" ON "user_customuser" '
+            'USING gin ((UPPER("email"::text)) gin_trgm_ops)',
+        ])
+
+    def test_bare_column_index_is_rebuilt(self):
+        editor = self.schema_editor((True, 'CREATE INDEX email_trgm ON user_customuser USING gin (email gin_trgm_ops)'))
+        create_trigram_indexes(editor, 'user_customuser', {'email_trgm': 'email'})
+        self.assertEqual(self.statements(editor)[1], 'DROP INDEX CONCURRENTLY IF EXISTS "email_trgm"')
+        self.assertEqual(len(self.statements(editor)), 3)
+
+    def test_valid_expression_index_is_kept(self):
+        editor = self.schema_editor((True, 'CREATE INDEX email_trgm ON user_customuser USING gin (upper((email)::text) gin_trgm_ops)'))
+        create_trigram_indexes(editor, 'user_customuser', {'email_trgm': 'email'})
+        self.assertEqual(self.statements(editor), ['CREATE EXTENSION IF NOT EXISTS pg_trgm'])
+
+
+class PathScopedMiddlewareTests(TestCase):
+    """Pins what silencing admin.E408-E410 relies on"""
+
+    def run_middleware(self, request):
+        seen = {}
+
+        def view(request):
+            seen.update(
+                session=hasattr(request, 'session'), user=hasattr(request, 'user'),
+                messages=hasattr(request, '_messages'),
+            )
+            return HttpResponse()
+
+        response = PathScopedMiddleware(view)(request)
+        return seen, response
+
+    def test_api_requests_skip_the_session_stack(self):
+        seen, response = self.run_middleware(RequestFactory().post('/api/users/login/'))
+        self.assertEqual(seen, {'session': False, 'user': False, 'messages': False})
+        self.assertEqual(response.cookies, {})
+
+    def test_other_requests_get_the_full_stack(self):
+        seen, _ = self.run_middleware(RequestFactory().get('/admin/'))
+        self.assertEqual(seen, {'session': True, 'user': True, 'messages': True})
+
+    def test_api_post_is_not_csrf_checked(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse('login'), {'email': 'x@example.com', 'password': 'x'}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_admin_enforces_csrf_and_sets_request_user(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse('admin:login'), {'username': 'x', 'password': 'x'})
+        self.assertEqual(response.status_code, 403)
+
+        admin_user = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', phone_number='+15550001001', password='x',
+        )
+        client.force_login(admin_user)
+        response = client.get(reverse('admin:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, admin_user)
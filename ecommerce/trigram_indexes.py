@@ -0,0 +1,64 @@
+"""
+Migration helper for the pg_trgm GIN indexes behind ADMIN_SEARCH_MODE='trigram'.
+
+The search uses icontains, which Django's PostgreSQL backend renders as
+UPPER("column"::text) LIKE UPPER(%s), so the indexes are built on that
+expression; an index on the bare column is never used for it. PostgreSQL
+only, and skipped when the pg_trgm extension is not available to this
+role. Indexes are built CONCURRENTLY so the table stays writable, which
+can't run inside a transaction: migrations using this need atomic = False.
+"""
+from django.db import migrations, transaction
+
+
+def _index_state(schema_editor, name):
+    """None if the index doesn't exist, else whether it is valid and on the UPPER() expression"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indisvalid, pg_get_indexdef(indexrelid) FROM pg_index WHERE indexrelid = to_regclass(%s)",
+            [name],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    valid, definition = row
+    return valid and 'upper(' in definition.lower()
+
+
+def create_trigram_indexes(schema_editor, table, indexes):
+    """Create (or rebuild when invalid or on the bare column) {index name: column} indexes"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        return
+    quote = schema_editor.quote_name
+    for name, column in indexes.items():
+        state = _index_state(schema_editor, name)
+        if state:
+            continue
+        if state is not None:
+            # Invalid after a failed concurrent build, or on the bare column (built that way
+            # by earlier migrations); IF NOT EXISTS would keep either
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}')
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} ON {quote(table)} '
+            f'USING gin ((UPPER({quote(column)}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(schema_editor, indexes):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in indexes:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(name)}')
+
+
+def trigram_indexes_operation(table, indexes):
+    """RunPython operation creating {index name: column} trigram indexes on a table"""
+    return migrations.RunPython(
+        lambda apps, schema_editor: create_trigram_indexes(schema_editor, table, indexes),
+        lambda apps, schema_editor: drop_trigram_indexes(schema_editor, indexes),
+    )
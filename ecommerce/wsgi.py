@@ -3,6 +3,9 @@ WSGI config for ecommerce project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+Pre-forking servers should load ``ecommerce.preload:application`` instead, which
+warms caches once before the workers fork (see ecommerce/preload.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
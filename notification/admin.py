@@ -1,21 +1,30 @@
 from django.contrib import admin
-from .models import Notification
+from ecommerce.admin_exports import StreamingExportMixin
+from ecommerce.admin_search import LargeTableAdminMixin
+from .models import ArchivedNotification, Notification, PendingNotification, PendingTask
 
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('user', 'notification_type', 'title', 'email_sent', 'read', 'created_at')
+class NotificationAdmin(LargeTableAdminMixin, StreamingExportMixin, admin.ModelAdmin):
+    list_display = ('user', 'notification_type', 'title', 'group_size', 'email_sent', 'read', 'created_at')
     list_filter = ('notification_type', 'email_sent', 'read', 'created_at')
     search_fields = ('user__email', 'user__username', 'title', 'message')
+    indexed_search_fields = {'user__email': 'exact', 'user__username': 'exact'}
+    trigram_search_fields = ('user__email', 'title', 'message')
     readonly_fields = ('created_at', 'updated_at', 'email_sent_at', 'read_at')
-    date_hierarchy = 'created_at'
+    # No date_hierarchy: it runs a date aggregation over the whole table on every
+    # changelist load. The created_at list_filter covers the common date ranges.
+    export_fields = (
+        'id', 'user__email', 'notification_type', 'title', 'message',
+        'email_sent', 'email_sent_at', 'read', 'read_at', 'created_at',
+    )
     
     fieldsets = (
         ('User Information', {
             'fields': ('user',)
         }),
         ('Notification Details', {
-            'fields': ('notification_type', 'title', 'message')
+            'fields': ('notification_type', 'title', 'message', 'group_size')
         }),
         ('Email Status', {
             'fields': ('email_sent', 'email_sent_at')
@@ -27,3 +36,31 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(PendingTask)
+class PendingTaskAdmin(admin.ModelAdmin):
+    list_display = ('task', 'attempts', 'created_at', 'updated_at')
+    search_fields = ('task',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(PendingNotification)
+class PendingNotificationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'notification_type', 'title', 'created_at', 'due_at')
+    list_filter = ('notification_type',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'user', 'notification_type', 'title', 'created_at', 'archived_at')
+    list_filter = ('notification_type',)
+    indexed_search_fields = {'user__email': 'exact'}
+    raw_id_fields = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
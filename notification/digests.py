@@ -0,0 +1,111 @@
+"""
+Delivery of coalesced notifications (see NotificationService.notify)
+"""
+import logging
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PendingNotification
+from .services import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+def coalesce_windows(items, now):
+    """
+    Split one user's pending notifications of one type into coalescing windows.
+
+    A window starts at its first notification and takes every later one
+    created within that type's NOTIFICATION_COALESCE_WINDOWS seconds; a
+    notification arriving after the window has expired starts the next
+    one. Yields the windows that are due at `now`.
+    """
+    length = timedelta(seconds=NotificationService.coalesce_window(items[0].notification_type))
+    window = []
+    for item in items:
+        if window and item.created_at >= window[0].created_at + length:
+            if min(pending.due_at for pending in window) <= now:
+                yield window
+            window = []
+        window.append(item)
+    if min(pending.due_at for pending in window) <= now:
+        yield window
+
+
+def flush_due(now=None, batch_size=500):
+    """
+    Deliver pending notifications whose coalescing window has closed.
+
+    Each user gets one digest per notification type and window (see
+    coalesce_windows). Processes at most `batch_size` (user, type) pairs;
+    returns (digests, notifications) delivered.
+
+    The rows are only deleted once the digest is sent. If sending fails the
+    window's transaction is rolled back and its notifications stay pending,
+    due again after NOTIFICATION_DIGEST_RETRY_SECONDS.
+    """
+    now = now or timezone.now()
+    due = set(
+        PendingNotification.objects.filter(due_at__lte=now)
+        .order_by()
+        .values_list('user_id', 'notification_type')
+        .distinct()[:batch_size]
+    )
+    if not due:
+        return 0, 0
+
+    pending = (
+        PendingNotification.objects.filter(
+            user_id__in={user_id for user_id, _ in due},
+            notification_type__in={notification_type for _, notification_type in due},
+        )
+        .select_related('user')
+        .order_by('user_id', 'notification_type', 'created_at', 'id')
+    )
+    digests = delivered = failed = 0
+    # One SMTP connection for the whole batch
+    with get_connection() as connection:
+        for key, items in groupby(pending, key=lambda item: (item.user_id, item.notification_type)):
+            if key not in due:
+                continue
+            for window in coalesce_windows(list(items), now):
+                ids = [item.pk for item in window]
+                try:
+                    with transaction.atomic():
+                        # Claim the rows first; if another flusher got them, skip the window
+                        claimed = PendingNotification.objects.filter(pk__in=ids).delete()[0]
+                        if claimed != len(window):
+                            transaction.set_rollback(True)
+                            continue
+                        # An email error rolls back the delete and the digest Notification
+                        NotificationService.send_digest(
+                            window[0].user, window, connection=connection, fail_silently=False,
+                        )
+                except Exception:
+                    failed += 1
+                    retry_at = timezone.now() + timedelta(seconds=settings.NOTIFICATION_DIGEST_RETRY_SECONDS)
+                    PendingNotification.objects.filter(pk__in=ids, due_at__lt=retry_at).update(due_at=retry_at)
+                    continue
+                digests += 1
+                delivered += len(window)
+
+    logger.info(f"Delivered {delivered} pending notification(s) in {digests} digest(s)")
+    if failed:
+        logger.warning(f"Could not deliver {failed} digest(s); they will be retried")
+    return digests, delivered
+
+
+def flush_all_due(now=None, batch_size=500):
+    """Call flush_due() until nothing is due"""
+    now = now or timezone.now()
+    digests = delivered = 0
+    while PendingNotification.objects.filter(due_at__lte=now).exists():
+        batch_digests, batch_delivered = flush_due(now, batch_size)
+        digests += batch_digests
+        delivered += batch_delivered
+    return digests, delivered
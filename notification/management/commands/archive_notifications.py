@@ -0,0 +1,50 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notification.retention import JSONLSink, TableSink, archive_read_notifications, drop_archive_before
+
+
+class Command(BaseCommand):
+    help = 'Archive read notifications older than N days into the archive table or compressed JSONL files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Archive read notifications older than this many days')
+        parser.add_argument('--to', choices=['table', 'jsonl'], default='table', help='Archive destination')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows moved per transaction')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+        parser.add_argument(
+            '--purge-archive-days', type=int, default=None,
+            help='Also remove archived notifications older than this many days',
+        )
+
+    def handle(self, *args, **options):
+        if options['to'] == 'jsonl':
+            archive_dir = settings.NOTIFICATION_ARCHIVE_DIR
+            os.makedirs(archive_dir, exist_ok=True)
+            path = os.path.join(archive_dir, f"notifications-{timezone.now():%Y%m%d%H%M%S}.jsonl.gz")
+            sink = JSONLSink(path)
+            self.stdout.write(f"Writing archive to {path}")
+        else:
+            sink = TableSink()
+
+        def progress(count, elapsed):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {count} archived ({count / elapsed:.0f} rows/s)")
+
+        archived = archive_read_notifications(
+            older_than_days=options['days'],
+            sink=sink,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} notification(s)"))
+
+        if options['purge_archive_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['purge_archive_days'])
+            removed = drop_archive_before(cutoff)
+            self.stdout.write(self.style.SUCCESS(f"Purged archive before {cutoff:%Y-%m-%d} ({removed} archived notification(s) removed)"))
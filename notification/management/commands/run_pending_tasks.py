@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.tasks import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Retry background tasks that were stored after a failure or a full queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Maximum number of tasks to retry')
+
+    def handle(self, *args, **options):
+        succeeded, failed = run_pending(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"{succeeded} task(s) succeeded, {failed} failed"))
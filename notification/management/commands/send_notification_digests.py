@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notification.digests import flush_all_due
+
+
+class Command(BaseCommand):
+    help = 'Deliver coalesced notifications whose window has closed, one digest per user and type'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='(user, type) pairs processed per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep running, flushing every --interval seconds')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between flushes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            users, delivered = flush_all_due(batch_size=options['batch_size'])
+            if delivered or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Delivered {delivered} notification(s) as {users} digest(s)"
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from ecommerce.trigram_indexes import trigram_indexes_operation
+
+# GIN trigram index used by ADMIN_SEARCH_MODE='trigram' (see ecommerce.trigram_indexes)
+INDEXES = {
+    'notification_notification_title_trgm': 'title',
+}
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('notification', '0002_pendingtask'),
+    ]
+
+    operations = [
+        trigram_indexes_operation('notification_notification', INDEXES),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def partition_archive_table(apps, schema_editor):
+    """On PostgreSQL, recreate the (still empty) archive table range-partitioned by created_at"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    schema_editor.execute('DROP TABLE notification_archivednotification')
+    schema_editor.execute(f"""
+        CREATE TABLE notification_archivednotification (
+            id bigint NOT NULL,
+            user_id bigint NOT NULL REFERENCES {user_table} (id) DEFERRABLE INITIALLY DEFERRED,
+            notification_type varchar(50) NOT NULL,
+            title varchar(255) NOT NULL,
+            message text NOT NULL,
+            email_sent boolean NOT NULL,
+            read_at timestamp with time zone NULL,
+            created_at timestamp with time zone NOT NULL,
+            archived_at timestamp with time zone NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    schema_editor.execute(
+        'CREATE INDEX notif_archive_user_created ON notification_archivednotification (user_id, created_at)'
+    )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_notification_trigram_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('notification_type', models.CharField(choices=[('welcome', 'Welcome Email'), ('order_placed', 'Order Placed'), ('order_shipped', 'Order Shipped'), ('order_delivered', 'Order Delivered'), ('payment_received', 'Payment Received'), ('password_reset', 'Password Reset'), ('account_activated', 'Account Activated'), ('account_deactivated', 'Account Deactivated'), ('promotion', 'Promotion'), ('system', 'System Notification')], max_length=50)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('email_sent', models.BooleanField(default=False)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='notif_archive_user_created')],
+            },
+        ),
+        # Monthly partitions are created on demand by notification.retention
+        migrations.RunPython(partition_archive_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0005_notification_user_no_fk_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='group_size',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='archivednotification',
+            name='notification_type',
+            field=models.CharField(choices=[('welcome', 'Welcome Email'), ('order_placed', 'Order Placed'), ('order_shipped', 'Order Shipped'), ('order_delivered', 'Order Delivered'), ('payment_received', 'Payment Received'), ('password_reset', 'Password Reset'), ('account_activated', 'Account Activated'), ('account_deactivated', 'Account Deactivated'), ('promotion', 'Promotion'), ('system', 'System Notification'), ('digest', 'Digest')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('welcome', 'Welcome Email'), ('order_placed', 'Order Placed'), ('order_shipped', 'Order Shipped'), ('order_delivered', 'Order Delivered'), ('payment_received', 'Payment Received'), ('password_reset', 'Password Reset'), ('account_activated', 'Account Activated'), ('account_deactivated', 'Account Deactivated'), ('promotion', 'Promotion'), ('system', 'System Notification'), ('digest', 'Digest')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='PendingNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('welcome', 'Welcome Email'), ('order_placed', 'Order Placed'), ('order_shipped', 'Order Shipped'), ('order_delivered', 'Order Delivered'), ('payment_received', 'Payment Received'), ('password_reset', 'Password Reset'), ('account_activated', 'Account Activated'), ('account_deactivated', 'Account Deactivated'), ('promotion', 'Promotion'), ('system', 'System Notification'), ('digest', 'Digest')], max_length=50)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('send_email', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('due_at', models.DateTimeField()),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pending_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='notif_pending_user_created'), models.Index(fields=['due_at'], name='notif_pending_due')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from ecommerce.trigram_indexes import trigram_indexes_operation
+
+# GIN trigram index on message used by ADMIN_SEARCH_MODE='trigram' (see ecommerce.trigram_indexes)
+INDEXES = {
+    'notification_notification_message_trgm': 'message',
+}
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('notification', '0006_notification_group_size_and_more'),
+    ]
+
+    operations = [
+        trigram_indexes_operation('notification_notification', INDEXES),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from ecommerce.trigram_indexes import create_trigram_indexes
+
+# Rebuild the trigram indexes from 0003 and 0007 on UPPER(column::text), the
+# expression icontains queries; indexes already on it are left alone
+INDEXES = {
+    'notification_notification_title_trgm': 'title',
+    'notification_notification_message_trgm': 'message',
+}
+
+
+def rebuild_trigram_indexes(apps, schema_editor):
+    create_trigram_indexes(schema_editor, 'notification_notification', INDEXES)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('notification', '0007_notification_message_trigram_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_trigram_indexes, migrations.RunPython.noop),
+    ]
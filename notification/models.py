@@ -20,9 +20,11 @@ class Notification(models.Model):
         ('account_deactivated', 'Account Deactivated'),
         ('promotion', 'Promotion'),
         ('system', 'System Notification'),
+        ('digest', 'Digest'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    # No separate FK index: the (user, read) index below covers user_id lookups
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications', db_index=False)
     notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES)
     title = models.CharField(max_length=255)
     message = models.TextField()
@@ -30,6 +32,8 @@ class Notification(models.Model):
     email_sent_at = models.DateTimeField(null=True, blank=True)
     read = models.BooleanField(default=False)
     read_at = models.DateTimeField(null=True, blank=True)
+    # Number of coalesced notifications summarized by a digest (1 for regular ones)
+    group_size = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -47,12 +51,88 @@ class Notification(models.Model):
     def mark_as_read(self):
         """Mark notification as read"""
         if not self.read:
+            from user import activity
+            from user.models import ActivityLog
+
             self.read = True
             self.read_at = timezone.now()
             self.save(update_fields=['read', 'read_at'])
+            activity.record(ActivityLog.NOTIFICATION_READ, self.user_id, object_id=self.pk)
     
     def mark_email_sent(self):
         """Mark email as sent"""
         self.email_sent = True
         self.email_sent_at = timezone.now()
         self.save(update_fields=['email_sent', 'email_sent_at'])
+
+
+class PendingTask(models.Model):
+    """
+    Background task call that could not run in-process and is waiting for a retry
+    """
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.task} ({self.attempts} attempts)"
+
+
+class PendingNotification(models.Model):
+    """
+    Notification held back so it can be coalesced with others into a digest.
+
+    Rows are deleted once delivered by `python manage.py send_notification_digests`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pending_notifications', db_index=False)
+    notification_type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    send_email = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # End of this notification's coalescing window
+    due_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='notif_pending_user_created'),
+            models.Index(fields=['due_at'], name='notif_pending_due'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title} (due {self.due_at})"
+
+
+class ArchivedNotification(models.Model):
+    """
+    Compact copy of an old, read notification moved out of the main table.
+
+    On PostgreSQL the table is range-partitioned by month on created_at
+    (see notification.retention); elsewhere it is a regular table.
+    """
+    id = models.BigIntegerField(primary_key=True)  # id of the original Notification
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications', db_index=False)
+    notification_type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    email_sent = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='notif_archive_user_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title} (archived)"
@@ -0,0 +1,160 @@
+"""
+Retention for the notification table: move old, read notifications out in small batches
+"""
+import gzip
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedNotification, Notification
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'notification_type', 'title', 'message',
+    'email_sent', 'read_at', 'created_at',
+)
+ARCHIVE_TABLE = ArchivedNotification._meta.db_table
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(value):
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(value):
+    return f"{ARCHIVE_TABLE}_y{value.year}m{value.month:02d}"
+
+
+def ensure_archive_partitions(start, end):
+    """Create the monthly archive partitions covering [start, end] (PostgreSQL only)"""
+    if connection.vendor != 'postgresql':
+        return
+    month = month_start(start)
+    with connection.cursor() as cursor:
+        while month <= end:
+            following = next_month(month)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {ARCHIVE_TABLE} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [month, following],
+            )
+            month = following
+
+
+def drop_archive_before(cutoff, batch_size=5000):
+    """
+    Remove archived notifications created before cutoff and return how many rows went.
+
+    On PostgreSQL whole monthly partitions are dropped, which is instant and
+    leaves no dead tuples; months straddling the cutoff are kept. Elsewhere
+    rows are deleted in batches.
+    """
+    if connection.vendor == 'postgresql':
+        deleted = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = %s",
+                [ARCHIVE_TABLE],
+            )
+            partitions = [row[0] for row in cursor.fetchall()]
+            for name in partitions:
+                year, month = int(name[-7:-3]), int(name[-2:])
+                if next_month(datetime(year, month, 1, tzinfo=dt_timezone.utc)) <= cutoff:
+                    # Counted under the same lock as the drop so the total is exact
+                    cursor.execute(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE")
+                    cursor.execute(f"SELECT count(*) FROM {name}")
+                    deleted += cursor.fetchone()[0]
+                    cursor.execute(f"DROP TABLE {name}")
+        return deleted
+
+    deleted = 0
+    while True:
+        ids = list(
+            ArchivedNotification.objects.filter(created_at__lt=cutoff)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += ArchivedNotification.objects.filter(id__in=ids).delete()[0]
+
+
+class TableSink:
+    """Write archived rows into the ArchivedNotification table"""
+
+    def write(self, rows):
+        ensure_archive_partitions(min(row[-1] for row in rows), max(row[-1] for row in rows))
+        ArchivedNotification.objects.bulk_create(
+            [ArchivedNotification(**dict(zip(ARCHIVE_FIELDS, row))) for row in rows]
+        )
+
+    def close(self):
+        pass
+
+
+class JSONLSink:
+    """Write archived rows to a gzip-compressed JSON Lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def write(self, rows):
+        dumps = json.dumps
+        self.file.writelines(dumps(dict(zip(ARCHIVE_FIELDS, row)), default=str) + '\n' for row in rows)
+        # Rows are deleted right after this returns, so they must be on disk first
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def archive_read_notifications(older_than_days, sink, batch_size=1000, pause=0.0, progress=None):
+    """
+    Move read notifications older than `older_than_days` into `sink`.
+
+    Each batch is selected by primary key, written to the sink and deleted in
+    its own short transaction, so locks are held for one batch at a time.
+    Returns the number of notifications archived.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    queryset = Notification.objects.filter(read=True, created_at__lt=cutoff).order_by('pk')
+    archived = 0
+    last_pk = 0
+    started = time.perf_counter()
+
+    try:
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    queryset.filter(pk__gt=last_pk)
+                    .select_for_update(skip_locked=True)
+                    .values_list(*ARCHIVE_FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+                sink.write(rows)
+                # Notification has no dependent rows, so this is a single DELETE ... WHERE id IN
+                Notification.objects.filter(pk__in=[row[0] for row in rows]).delete()
+
+            archived += len(rows)
+            last_pk = rows[-1][0]
+            if progress:
+                progress(archived, time.perf_counter() - started)
+            if pause:
+                time.sleep(pause)
+    finally:
+        sink.close()
+
+    logger.info(f"Archived {archived} notifications older than {older_than_days} days")
+    return archived
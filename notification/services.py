@@ -1,11 +1,14 @@
 """
 Notification service for sending emails and creating notifications
 """
-from django.core.mail import send_mail
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Notification
+from django.utils import timezone
+from .models import Notification, PendingNotification
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,8 +21,25 @@ class NotificationService:
     """
     
     @staticmethod
-    def send_welcome_email(user):
-        """Send welcome email to new user"""
+    def send_welcome_email(user, fail_silently=True):
+        """
+        Send welcome email to new user.
+
+        Safe to call again after a failure: the welcome notification is
+        created once and the email is only sent while it is unsent. With
+        fail_silently=False errors propagate, so a background task can be retried.
+        """
+        notification = Notification.objects.filter(user=user, notification_type='welcome').first()
+        if notification is None:
+            notification = Notification.objects.create(
+                user=user,
+                notification_type='welcome',
+                title='Welcome to Our Platform!',
+                message=f'Welcome {user.username}! Thank you for joining us.',
+            )
+        if notification.email_sent:
+            return True
+
         try:
             subject = 'Welcome to Our E-commerce Platform!'
             context = {
@@ -41,15 +61,6 @@ class NotificationService:
                 html_message=html_message,
                 fail_silently=False,
             )
-            
-            # Create notification record
-            notification = Notification.objects.create(
-                user=user,
-                notification_type='welcome',
-                title='Welcome to Our Platform!',
-                message=f'Welcome {user.username}! Thank you for joining us.',
-                email_sent=True,
-            )
             notification.mark_email_sent()
             
             logger.info(f"Welcome email sent to {user.email}")
@@ -57,14 +68,8 @@ class NotificationService:
             
         except Exception as e:
             logger.error(f"Error sending welcome email to {user.email}: {str(e)}")
-            # Still create notification even if email fails
-            Notification.objects.create(
-                user=user,
-                notification_type='welcome',
-                title='Welcome to Our Platform!',
-                message=f'Welcome {user.username}! Thank you for joining us.',
-                email_sent=False,
-            )
+            if not fail_silently:
+                raise
             return False
     
     @staticmethod
@@ -257,3 +262,86 @@ class NotificationService:
         
         return notification
 
+    @staticmethod
+    def coalesce_window(notification_type):
+        """Seconds notifications of this type are held for coalescing (0 = send immediately)"""
+        return getattr(settings, 'NOTIFICATION_COALESCE_WINDOWS', {}).get(notification_type, 0)
+
+    @staticmethod
+    def notify(user, notification_type, title, message, send_email=True):
+        """
+        Create a notification, coalescing high-frequency types.
+
+        Types with a window in NOTIFICATION_COALESCE_WINDOWS are stored as
+        PendingNotification and delivered later, together with the user's
+        other notifications of that type from the same window, as a single
+        digest. Returns the
+        Notification, or the PendingNotification when deferred.
+        """
+        window = NotificationService.coalesce_window(notification_type)
+        if not window:
+            return NotificationService.create_notification(user, notification_type, title, message, send_email)
+
+        return PendingNotification.objects.create(
+            user=user,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            send_email=send_email,
+            due_at=timezone.now() + timedelta(seconds=window),
+        )
+
+    @staticmethod
+    def send_digest(user, pending, connection=None, fail_silently=True):
+        """
+        Deliver a user's pending notifications as one Notification and at most one email.
+
+        A single pending notification is delivered as itself. With
+        fail_silently=False email errors propagate, so the caller can roll
+        back and keep the notifications pending.
+        """
+        if len(pending) == 1:
+            item = pending[0]
+            notification_type, title, message = item.notification_type, item.title, item.message
+        else:
+            notification_type = 'digest'
+            title = f'You have {len(pending)} updates'
+            message = '\n'.join(f'- {item.title}' for item in pending)
+
+        notification = Notification.objects.create(
+            user=user,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            group_size=len(pending),
+        )
+
+        if user.email and any(item.send_email for item in pending):
+            try:
+                context = {
+                    'user': user,
+                    'notification': notification,
+                    'items': pending,
+                }
+                html_message = render_to_string('notification/emails/digest.html', context)
+                plain_message = render_to_string('notification/emails/digest.txt', context)
+
+                email = EmailMultiAlternatives(
+                    subject=title,
+                    body=plain_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[user.email],
+                    connection=connection,
+                )
+                email.attach_alternative(html_message, 'text/html')
+                email.send()
+
+                notification.mark_email_sent()
+                logger.info(f"Digest of {len(pending)} notification(s) sent to {user.email}")
+
+            except Exception as e:
+                logger.error(f"Error sending digest email to {user.email}: {str(e)}")
+                if not fail_silently:
+                    raise
+
+        return notification
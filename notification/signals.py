@@ -4,6 +4,9 @@ Signals for automatic notifications
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from order.signals import order_placed, order_status_changed
+from ecommerce import tasks
+from .tasks import send_welcome_email
 from .services import NotificationService
 
 User = get_user_model()
@@ -17,6 +20,31 @@ User = get_user_model()
 #     Automatically send welcome email when a new user is created
 #     """
 #     if created and instance.email:
-#         # Send welcome email asynchronously (you can use Celery for this in production)
-#         NotificationService.send_welcome_email(instance)
+#         # Send welcome email in the background once the user row is committed
+#         tasks.dispatch_on_commit(send_welcome_email, instance.pk)
 
+
+# Order updates are coalesced per user (NOTIFICATION_COALESCE_WINDOWS), so an order
+# that moves quickly from placed to delivered produces a single digest email
+ORDER_STATUS_NOTIFICATIONS = {
+    'shipped': ('order_shipped', 'Order #{id} Shipped', 'Your order #{id} has been shipped.'),
+    'delivered': ('order_delivered', 'Order #{id} Delivered', 'Your order #{id} has been delivered.'),
+}
+
+
+@receiver(order_placed)
+def notify_order_placed(sender, order, **kwargs):
+    NotificationService.notify(
+        order.user,
+        'order_placed',
+        f'Order #{order.id} Placed',
+        f'Your order #{order.id} has been placed successfully.',
+    )
+
+
+@receiver(order_status_changed)
+def notify_order_status_changed(sender, order, previous_status, **kwargs):
+    if order.status not in ORDER_STATUS_NOTIFICATIONS:
+        return
+    notification_type, title, message = ORDER_STATUS_NOTIFICATIONS[order.status]
+    NotificationService.notify(order.user, notification_type, title.format(id=order.id), message.format(id=order.id))
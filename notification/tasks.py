@@ -0,0 +1,21 @@
+"""
+Background notification tasks, run through ecommerce.tasks
+"""
+import logging
+
+from django.contrib.auth import get_user_model
+
+from .services import NotificationService
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+
+def send_welcome_email(user_id):
+    """Send the welcome email for a newly registered user"""
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        logger.warning(f"Skipping welcome email, user {user_id} no longer exists")
+        return
+    # Raise on failure so the dispatcher stores the call for a retry
+    NotificationService.send_welcome_email(user, fail_silently=False)
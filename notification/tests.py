@@ -1,3 +1,262 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ecommerce import tasks
+from ecommerce.admin_search import EstimatedCountPaginator
+from .digests import flush_all_due
+from .models import ArchivedNotification, Notification, PendingNotification, PendingTask
+from .retention import JSONLSink, TableSink, archive_read_notifications, drop_archive_before
+from .services import NotificationService
+from .tasks import send_welcome_email
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    BACKGROUND_TASKS_EAGER=True,
+)
+class WelcomeEmailTaskTests(TestCase):
+    def register(self):
+        return APIClient().post(reverse('register'), {
+            'email': 'new@example.com', 'username': 'new', 'phone_number': '+15550001234',
+            'password': 'Str0ng!pass123', 'password_confirm': 'Str0ng!pass123',
+        }, format='json')
+
+    def test_response_is_sent_before_any_email_io(self):
+        with mock.patch('notification.services.send_mail') as send_mail, \
+                self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.register()
+            self.assertEqual(response.status_code, 201)
+            send_mail.assert_not_called()
+
+        self.assertEqual(len(mail.outbox), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+
+    def test_smtp_failure_is_stored_and_retried_without_duplicates(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.register()
+        user = User.objects.get(email='new@example.com')
+
+        with mock.patch('notification.services.send_mail', side_effect=OSError('SMTP down')):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(PendingTask.objects.count(), 1)
+        self.assertFalse(Notification.objects.get(user=user, notification_type='welcome').email_sent)
+
+        self.assertEqual(tasks.run_pending(), (1, 0))
+        self.assertEqual(PendingTask.objects.count(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        welcome = Notification.objects.filter(user=user, notification_type='welcome')
+        self.assertEqual(welcome.count(), 1)
+        self.assertTrue(welcome.get().email_sent)
+
+        # A second run of the task is a no-op
+        send_welcome_email(user.pk)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class NotificationAdminSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='staff@example.com', username='staff', phone_number='+15550009999', password='x',
+        )
+        cls.notifications = Notification.objects.bulk_create([
+            Notification(user=cls.user, notification_type='welcome', title=f'Title {n}', message=f'Body {n}')
+            for n in range(5)
+        ])
+
+    def setUp(self):
+        self.admin = site._registry[Notification]
+        self.request = RequestFactory().get('/')
+
+    def search(self, term):
+        queryset, _ = self.admin.get_search_results(self.request, Notification.objects.all(), term)
+        return queryset
+
+    @override_settings(ADMIN_SEARCH_MODE='indexed')
+    def test_pk_search_ignores_terms_that_cannot_be_a_pk(self):
+        pk = self.notifications[0].pk
+        self.assertEqual(list(self.search(str(pk))), [self.notifications[0]])
+        # Bigger than bigint, far beyond int() string limits, and non-ASCII digits
+        for term in ('9' * 19, '1' * 5000, '\u0661\u0662'):
+            self.assertEqual(list(self.search(term)), [])
+
+    @override_settings(ADMIN_SEARCH_MODE='trigram')
+    def test_trigram_mode_falls_back_to_indexed_lookups_off_postgresql(self):
+        self.assertEqual(self.search('staff@example.com').count(), 5)
+        self.assertEqual(self.search('Title 1').count(), 0)
+
+    def test_paginator_counts_exactly_off_postgresql(self):
+        paginator = EstimatedCountPaginator(Notification.objects.filter(read=False).order_by('pk'), 2)
+        paginator.exact_count_limit = 3
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+
+
+class NotificationArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='reader@example.com', username='reader', phone_number='+15550008888', password='x',
+        )
+        now = timezone.now()
+        cls.old_read = cls.create(title='old read', read=True, created_at=now - timedelta(days=100))
+        cls.old_unread = cls.create(title='old unread', read=False, created_at=now - timedelta(days=100))
+        cls.new_read = cls.create(title='new read', read=True, created_at=now - timedelta(days=1))
+
+    @classmethod
+    def create(cls, created_at, **kwargs):
+        notification = Notification.objects.create(user=cls.user, notification_type='welcome', message='m', **kwargs)
+        # created_at is auto_now_add, so backdate it with an update
+        Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        return notification
+
+    def test_moves_only_old_read_notifications_to_the_table(self):
+        progress = mock.Mock()
+        archived = archive_read_notifications(90, TableSink(), batch_size=1, progress=progress)
+
+        self.assertEqual(archived, 1)
+        progress.assert_called_once()
+        self.assertEqual(
+            set(Notification.objects.values_list('pk', flat=True)), {self.old_unread.pk, self.new_read.pk}
+        )
+        archive = ArchivedNotification.objects.get()
+        self.assertEqual((archive.pk, archive.title, archive.user_id), (self.old_read.pk, 'old read', self.user.pk))
+
+    def test_moves_rows_to_a_jsonl_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'archive.jsonl.gz')
+            self.assertEqual(archive_read_notifications(90, JSONLSink(path)), 1)
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                rows = [json.loads(line) for line in file]
+
+        self.assertEqual([(row['id'], row['title']) for row in rows], [(self.old_read.pk, 'old read')])
+        self.assertFalse(ArchivedNotification.objects.exists())
+        self.assertFalse(Notification.objects.filter(pk=self.old_read.pk).exists())
+
+    def test_drop_archive_before_returns_rows_removed(self):
+        now = timezone.now()
+        ArchivedNotification.objects.bulk_create([
+            ArchivedNotification(
+                id=1000 + n, user=self.user, notification_type='welcome', title='t', message='m',
+                created_at=now - timedelta(days=400 if n < 3 else 10),
+            )
+            for n in range(5)
+        ])
+        self.assertEqual(drop_archive_before(now - timedelta(days=365), batch_size=2), 3)
+        self.assertEqual(ArchivedNotification.objects.count(), 2)
+
+    def test_command_reports_archived_and_purged_rows(self):
+        out = StringIO()
+        call_command('archive_notifications', '--days=90', '--purge-archive-days=0', stdout=out)
+        self.assertIn('Archived 1 notification(s)', out.getvalue())
+        self.assertIn('(1 archived notification(s) removed)', out.getvalue())
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', NOTIFICATION_DIGEST_RETRY_SECONDS=300)
+class DigestDeliveryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='digest@example.com', username='digest', phone_number='+15550005555', password='x',
+        )
+        due_at = timezone.now() - timedelta(minutes=1)
+        PendingNotification.objects.bulk_create([
+            PendingNotification(user=cls.user, notification_type='promotion', title=f'Deal {n}', message='m', due_at=due_at)
+            for n in range(3)
+        ])
+
+    def test_failed_send_keeps_the_notifications_pending(self):
+        with mock.patch('notification.services.EmailMultiAlternatives.send', side_effect=OSError('SMTP down')):
+            self.assertEqual(flush_all_due(), (0, 0))
+
+        self.assertEqual(PendingNotification.objects.count(), 3)
+        self.assertFalse(Notification.objects.exists())
+        self.assertTrue(all(
+            due_at > timezone.now() + timedelta(seconds=250)
+            for due_at in PendingNotification.objects.values_list('due_at', flat=True)
+        ))
+
+        self.assertEqual(flush_all_due(timezone.now() + timedelta(seconds=301)), (1, 3))
+        self.assertFalse(PendingNotification.objects.exists())
+        notification = Notification.objects.get()
+        self.assertEqual((notification.group_size, notification.email_sent), (3, True))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    NOTIFICATION_COALESCE_WINDOWS={'order_shipped': 300, 'promotion': 300},
+)
+class CoalescingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = [
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name, phone_number=f'+1555000444{n}', password='x',
+            )
+            for n, name in enumerate(('alice', 'bob'))
+        ]
+        cls.start = timezone.now() - timedelta(hours=1)
+
+    def notify(self, user, notification_type, seconds):
+        pending = NotificationService.notify(user, notification_type, f'{notification_type} +{seconds}s', 'm')
+        # created_at is auto_now_add, so move the notification into the burst with an update
+        created_at = self.start + timedelta(seconds=seconds)
+        PendingNotification.objects.filter(pk=pending.pk).update(
+            created_at=created_at, due_at=created_at + timedelta(seconds=300),
+        )
+
+    def delivered(self):
+        return sorted(
+            Notification.objects.values_list('user__username', 'notification_type', 'group_size', 'email_sent')
+        )
+
+    def test_burst_gives_one_digest_per_user_and_type(self):
+        for seconds in (0, 10, 60):
+            self.notify(self.alice, 'order_shipped', seconds)
+        self.notify(self.alice, 'promotion', 5)
+        self.notify(self.bob, 'order_shipped', 20)
+        self.notify(self.bob, 'order_shipped', 30)
+
+        self.assertEqual(flush_all_due(self.start + timedelta(seconds=400)), (3, 6))
+        self.assertEqual(self.delivered(), [
+            ('alice', 'digest', 3, True),
+            ('alice', 'promotion', 1, True),
+            ('bob', 'digest', 2, True),
+        ])
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(PendingNotification.objects.exists())
+
+    def test_notifications_after_an_expired_window_start_a_new_digest(self):
+        self.notify(self.alice, 'order_shipped', 0)
+        self.notify(self.alice, 'order_shipped', 100)
+        # Created after the first window ended, but still pending when it is flushed
+        self.notify(self.alice, 'order_shipped', 300)
+
+        self.assertEqual(flush_all_due(self.start + timedelta(seconds=310)), (1, 2))
+        self.assertEqual(self.delivered(), [('alice', 'digest', 2, True)])
+        self.assertEqual(PendingNotification.objects.get().title, 'order_shipped +300s')
+
+        self.assertEqual(flush_all_due(self.start + timedelta(seconds=600)), (1, 1))
+        self.assertEqual(self.delivered(), [('alice', 'digest', 2, True), ('alice', 'order_shipped', 1, True)])
+        self.assertEqual(len(mail.outbox), 2)
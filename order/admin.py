@@ -1,3 +1,32 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DiscountRule, Order, OrderDiscount, OrderItem
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ('product',)
+
+
+class OrderDiscountInline(admin.TabularInline):
+    model = OrderDiscount
+    extra = 0
+    readonly_fields = ('rule', 'name', 'code', 'amount')
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'subtotal', 'discount_total', 'total', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+    inlines = [OrderItemInline, OrderDiscountInline]
+
+
+@admin.register(DiscountRule)
+class DiscountRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'kind', 'value', 'sku', 'category', 'stackable', 'times_used', 'usage_limit', 'is_active')
+    list_filter = ('kind', 'stackable', 'is_active')
+    search_fields = ('name', 'code', 'sku')
+    readonly_fields = ('times_used', 'updated_at')
@@ -0,0 +1,247 @@
+"""
+In-memory discount engine for checkout.
+
+Active DiscountRules are compiled into dicts keyed by SKU and category
+(automatic promotions) and by code (coupons), so evaluating a cart costs a
+few dict lookups per line regardless of how many rules exist. The index
+is rebuilt when rules change: immediately in the process that saved them,
+and within `check_interval` seconds everywhere else. Usage limits are
+enforced at redemption with conditional UPDATEs, never from the snapshot.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from product.pricing import category_descendants, to_cents
+from .models import DiscountRule, DiscountUsage, OrderDiscount
+
+logger = logging.getLogger(__name__)
+
+CartLine = namedtuple('CartLine', 'sku category_id unit_price quantity')
+AppliedDiscount = namedtuple('AppliedDiscount', 'rule_id name code amount')
+
+
+class DiscountUnavailable(Exception):
+    """A discount hit its usage limit between evaluation and redemption"""
+
+    def __init__(self, rule_id):
+        super().__init__(f"Discount rule {rule_id} is no longer available")
+        self.rule_id = rule_id
+
+
+class CompiledRule:
+    __slots__ = (
+        'id', 'name', 'code', 'percent', 'amount', 'sku', 'category_ids', 'min_subtotal',
+        'stackable', 'priority', 'usage_limit', 'times_used', 'per_user_limit', 'starts_at', 'ends_at',
+    )
+
+    def __init__(self, rule, category_ids):
+        self.id = rule.id
+        self.name = rule.name
+        self.code = rule.code.upper()
+        self.percent = rule.kind == DiscountRule.PERCENT
+        self.amount = to_cents(rule.value)  # basis points for percent, cents for fixed
+        self.sku = rule.sku
+        self.category_ids = category_ids
+        self.min_subtotal = to_cents(rule.min_subtotal) if rule.min_subtotal is not None else 0
+        self.stackable = rule.stackable
+        self.priority = rule.priority
+        self.usage_limit = rule.usage_limit
+        self.times_used = rule.times_used
+        self.per_user_limit = rule.per_user_limit
+        self.starts_at = rule.starts_at
+        self.ends_at = rule.ends_at
+
+    def available(self, now):
+        return (
+            (self.starts_at is None or self.starts_at <= now)
+            and (self.ends_at is None or self.ends_at >= now)
+            and (self.usage_limit is None or self.times_used < self.usage_limit)
+        )
+
+    def matches(self, line):
+        if self.sku:
+            return line.sku == self.sku
+        if self.category_ids is not None:
+            return line.category_id in self.category_ids
+        return True
+
+    def discount(self, base):
+        """Discount in cents on an eligible subtotal of `base` cents"""
+        if base < self.min_subtotal:
+            return 0
+        if self.percent:
+            return (base * self.amount + 5000) // 10000
+        return min(self.amount, base)
+
+
+class DiscountIndex:
+    """
+    Compiled view of the active discount rules, shared by all requests in a process
+    """
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._version = None
+        # (by_sku, by_category, cart_wide, by_code)
+        self._index = ({}, {}, [], {})
+
+    def invalidate(self):
+        self._checked_at = None
+
+    def refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            # updated_at changes on every edit, including queryset.update() (see
+            # DiscountRuleQuerySet; redemptions only bump times_used and leave it
+            # alone); the count catches deletions
+            version = DiscountRule.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+            version = (version['count'], version['updated'])
+            if version != self._version:
+                self._build()
+                self._version = version
+            self._checked_at = now
+
+    def _build(self):
+        started = time.perf_counter()
+        now = timezone.now()
+        rules = DiscountRule.objects.filter(is_active=True).exclude(ends_at__lt=now).order_by('priority', 'id')
+        descendants = None
+        by_sku, by_category, cart_wide, by_code = {}, {}, [], {}
+        for rule in rules:
+            category_ids = None
+            if rule.category_id is not None:
+                if descendants is None:
+                    descendants = category_descendants()
+                category_ids = frozenset(descendants.get(rule.category_id, [rule.category_id]))
+            compiled = CompiledRule(rule, category_ids)
+
+            if compiled.code:
+                by_code[compiled.code] = compiled
+            elif compiled.sku:
+                by_sku.setdefault(compiled.sku, []).append(compiled)
+            elif category_ids is not None:
+                for category_id in category_ids:
+                    by_category.setdefault(category_id, []).append(compiled)
+            else:
+                cart_wide.append(compiled)
+
+        self._index = (by_sku, by_category, cart_wide, by_code)
+        logger.info(
+            f"Compiled {len(by_code)} coupons and {sum(map(len, by_sku.values())) + len(cart_wide)} "
+            f"SKU/cart-wide promotions ({len(by_category)} categories) in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    def evaluate(self, lines, codes=(), exclude=(), now=None):
+        """
+        Return (subtotal, [AppliedDiscount]) for a cart of CartLines, amounts as Decimal.
+
+        Stackable rules apply together in priority order (their total capped
+        at the subtotal); the best non-stackable rule replaces them when it
+        gives a bigger discount on its own.
+        """
+        self.refresh()
+        by_sku, by_category, cart_wide, by_code = self._index
+        now = now or timezone.now()
+
+        coupons = [by_code[code] for code in {code.strip().upper() for code in codes} if code in by_code]
+        eligible = {}
+        subtotal = 0
+        for line in lines:
+            line_total = to_cents(line.unit_price) * line.quantity
+            subtotal += line_total
+            for rule in by_sku.get(line.sku, ()):
+                eligible[rule] = eligible.get(rule, 0) + line_total
+            for rule in by_category.get(line.category_id, ()):
+                eligible[rule] = eligible.get(rule, 0) + line_total
+            for rule in coupons:
+                if rule.matches(line):
+                    eligible[rule] = eligible.get(rule, 0) + line_total
+        for rule in cart_wide:
+            eligible[rule] = subtotal
+
+        stack = []
+        best = None
+        for rule, base in eligible.items():
+            if rule.id in exclude or not rule.available(now):
+                continue
+            amount = rule.discount(base)
+            if amount <= 0:
+                continue
+            if rule.stackable:
+                stack.append((rule, amount))
+            elif best is None or amount > best[1]:
+                best = (rule, amount)
+
+        applied = []
+        stacked = 0
+        for rule, amount in sorted(stack, key=lambda item: (item[0].priority, item[0].id)):
+            amount = min(amount, subtotal - stacked)
+            if amount <= 0:
+                break
+            applied.append((rule, amount))
+            stacked += amount
+        if best is not None and best[1] > stacked:
+            applied = [best]
+
+        return to_decimal(subtotal), [
+            AppliedDiscount(rule.id, rule.name, rule.code, to_decimal(amount)) for rule, amount in applied
+        ]
+
+
+def to_decimal(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def used_up(user):
+    """Ids of rules the user has already redeemed up to their per_user_limit"""
+    return set(
+        DiscountUsage.objects.filter(user=user, count__gte=F('rule__per_user_limit'))
+        .values_list('rule_id', flat=True)
+    )
+
+
+def redeem(order, user, applied):
+    """
+    Claim the applied discounts for an order, inside the caller's transaction.
+
+    Global and per-user limits are checked and incremented in single
+    conditional UPDATEs, so concurrent checkouts can't overshoot them.
+    Raises DiscountUnavailable for the first rule that is used up.
+    """
+    rule_ids = [discount.rule_id for discount in applied]
+    per_user_limits = dict(DiscountRule.objects.filter(pk__in=rule_ids).values_list('pk', 'per_user_limit'))
+    for discount in applied:
+        claimed = DiscountRule.objects.filter(
+            Q(usage_limit__isnull=True) | Q(times_used__lt=F('usage_limit')), pk=discount.rule_id,
+        ).update(times_used=F('times_used') + 1)
+        if not claimed:
+            raise DiscountUnavailable(discount.rule_id)
+
+        limit = per_user_limits.get(discount.rule_id)
+        if limit is not None:
+            DiscountUsage.objects.bulk_create([DiscountUsage(rule_id=discount.rule_id, user=user)], ignore_conflicts=True)
+            claimed = DiscountUsage.objects.filter(
+                rule_id=discount.rule_id, user=user, count__lt=limit,
+            ).update(count=F('count') + 1)
+            if not claimed:
+                raise DiscountUnavailable(discount.rule_id)
+
+    OrderDiscount.objects.bulk_create([
+        OrderDiscount(order=order, rule_id=discount.rule_id, name=discount.name, code=discount.code, amount=discount.amount)
+        for discount in applied
+    ])
+
+
+discount_index = DiscountIndex()
@@ -0,0 +1,132 @@
+"""
+Customer order history.
+
+Pages use keyset pagination on (created_at, id) over order_user_history_idx,
+so a deep page costs the same as the first one. Every page is three
+queries however many orders it holds: the orders (with their latest
+shipment status as a subquery), their items and their discounts.
+
+The first page is cached per user under a generation key that order and
+shipment writes replace on commit, so a page read before a write can never
+be served after it. That needs a cache shared by all workers; with a
+per-process cache (locmem) the first page is not cached at all.
+"""
+import base64
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Q, Subquery
+
+from tracking.models import Shipment
+from .models import Order, OrderDiscount, OrderItem
+
+
+def _generation_key(user_id):
+    return f'order-history:{user_id}:generation'
+
+
+def invalidate(user_id):
+    """Stop serving the user's cached first page once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(_generation_key(user_id), time.time_ns(), None))
+
+
+def encode_cursor(order):
+    raw = f"{order.created_at.isoformat()}|{order.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError:
+        raise ValueError('Invalid cursor') from None
+
+
+def serialize_order(order):
+    return {
+        'id': order.pk,
+        'status': order.status,
+        'subtotal': str(order.subtotal),
+        'discount_total': str(order.discount_total),
+        'total': str(order.total),
+        'created_at': order.created_at.isoformat(),
+        'tracking': {
+            'status': order.tracking_status,
+            'tracking_number': order.tracking_number,
+        } if order.tracking_status else None,
+        'items': [
+            {
+                'product': item.product_id,
+                'name': item.product_name,
+                'sku': item.sku,
+                'unit_price': str(item.unit_price),
+                'quantity': item.quantity,
+                'line_total': str(item.line_total),
+            }
+            for item in order.items.all()
+        ],
+        'discounts': [
+            {'name': discount.name, 'code': discount.code, 'amount': str(discount.amount)}
+            for discount in order.discounts.all()
+        ],
+    }
+
+
+def fetch_page(user_id, cursor=None, limit=None):
+    """Return {'results': [...], 'next': cursor or None} for one page of a user's orders"""
+    limit = limit or settings.ORDER_HISTORY_PAGE_SIZE
+    latest_shipment = Shipment.objects.filter(order=OuterRef('pk')).order_by('-status_updated_at', '-id')
+    orders = (
+        Order.objects.filter(user_id=user_id)
+        .only('id', 'status', 'subtotal', 'discount_total', 'total', 'created_at')
+        .annotate(
+            tracking_status=Subquery(latest_shipment.values('status')[:1]),
+            tracking_number=Subquery(latest_shipment.values('tracking_number')[:1]),
+        )
+        .prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.only(
+                'order', 'product', 'product_name', 'sku', 'unit_price', 'quantity',
+            ).order_by('id')),
+            Prefetch('discounts', queryset=OrderDiscount.objects.only(
+                'order', 'name', 'code', 'amount',
+            ).order_by('id')),
+        )
+        .order_by('-created_at', '-id')
+    )
+    if cursor is not None:
+        created_at, pk = decode_cursor(cursor)
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    orders = list(orders[:limit + 1])
+    has_next = len(orders) > limit
+    orders = orders[:limit]
+    return {
+        'results': [serialize_order(order) for order in orders],
+        'next': encode_cursor(orders[-1]) if has_next else None,
+    }
+
+
+def cache_is_shared():
+    """False for per-process caches, which would miss invalidations made by other workers"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def first_page(user_id):
+    """The default-size first page, served from the cache when the user's orders haven't changed"""
+    if not cache_is_shared():
+        return fetch_page(user_id)
+    generation = cache.get_or_set(_generation_key(user_id), time.time_ns, None)
+    key = f'order-history:{user_id}:{generation}'
+    page = cache.get(key)
+    if page is None:
+        page = fetch_page(user_id)
+        cache.set(key, page, settings.ORDER_HISTORY_CACHE_SECONDS)
+    return page
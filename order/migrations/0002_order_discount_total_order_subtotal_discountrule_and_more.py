@@ -0,0 +1,87 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_subtotal(apps, schema_editor):
+    # Orders placed before discounts existed: subtotal == total
+    Order = apps.get_model('order', 'Order')
+    Order.objects.update(subtotal=models.F('total'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0001_initial'),
+        ('order', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='discount_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name='DiscountRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('code', models.CharField(blank=True, help_text='Coupon code; leave empty for an automatic promotion', max_length=50)),
+                ('kind', models.CharField(choices=[('percent', 'Percentage off'), ('fixed', 'Fixed amount off')], max_length=10)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('sku', models.CharField(blank=True, max_length=64)),
+                ('min_subtotal', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('stackable', models.BooleanField(default=True)),
+                ('priority', models.PositiveIntegerField(default=0)),
+                ('usage_limit', models.PositiveIntegerField(blank=True, null=True)),
+                ('per_user_limit', models.PositiveIntegerField(blank=True, null=True)),
+                ('times_used', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='discount_rules', to='category.category')),
+            ],
+            options={
+                'ordering': ['priority', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DiscountUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('rule', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='usages', to='order.discountrule')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discount_usages', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OrderDiscount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('code', models.CharField(blank=True, max_length=50)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discounts', to='order.order')),
+                ('rule', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='order.discountrule')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='discountrule',
+            constraint=models.UniqueConstraint(condition=models.Q(('code', ''), _negated=True), fields=('code',), name='discount_rule_code_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='discountusage',
+            constraint=models.UniqueConstraint(fields=('rule', 'user'), name='discount_usage_unique'),
+        ),
+        migrations.RunPython(backfill_subtotal, migrations.RunPython.noop),
+    ]
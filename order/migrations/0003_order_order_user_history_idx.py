@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0002_order_discount_total_order_subtotal_discountrule_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='order_user_history_idx'),
+        ),
+    ]
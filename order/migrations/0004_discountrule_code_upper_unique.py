@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:03
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0001_initial'),
+        ('order', '0003_order_order_user_history_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='discountrule',
+            name='discount_rule_code_unique',
+        ),
+        migrations.AddConstraint(
+            model_name='discountrule',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Upper('code'), condition=models.Q(('code', ''), _negated=True), name='discount_rule_code_upper_unique', violation_error_message='A discount rule with this code already exists.'),
+        ),
+    ]
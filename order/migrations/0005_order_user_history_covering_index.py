@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# On PostgreSQL, rebuild order_user_history_idx as a covering index so history
+# pages are index-only scans. Other databases keep the plain index from 0003.
+# The new index is built CONCURRENTLY under a temporary name and swapped in, so
+# the table stays writable and the model's index name is unchanged; that can't
+# run inside a transaction, hence atomic = False.
+COLUMNS = 'user_id, created_at DESC, id DESC'
+INCLUDE = 'status, subtotal, discount_total, total'
+
+
+def _swap_index(schema_editor, include):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    suffix = f' INCLUDE ({include})' if include else ''
+    # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS order_user_history_new')
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY order_user_history_new ON order_order ({COLUMNS}){suffix}'
+    )
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS order_user_history_idx')
+    schema_editor.execute('ALTER INDEX order_user_history_new RENAME TO order_user_history_idx')
+
+
+def add_covering_index(apps, schema_editor):
+    _swap_index(schema_editor, INCLUDE)
+
+
+def remove_covering_index(apps, schema_editor):
+    _swap_index(schema_editor, None)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('order', '0004_discountrule_code_upper_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_covering_index, remove_covering_index),
+    ]
@@ -1,3 +1,164 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
-# Create your models here.
+
+class Order(models.Model):
+    """
+    Customer order
+    """
+    PLACED = 'placed'
+    PAID = 'paid'
+    SHIPPED = 'shipped'
+    DELIVERED = 'delivered'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (PLACED, 'Placed'),
+        (PAID, 'Paid'),
+        (SHIPPED, 'Shipped'),
+        (DELIVERED, 'Delivered'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    # No separate FK index: order_user_history_idx below starts with user
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders', db_index=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PLACED)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Order history keyset pagination. On PostgreSQL migration 0005 rebuilds it
+            # as a covering index (INCLUDE status and amounts) for index-only scans.
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_history_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.pk} ({self.status})"
+
+
+class OrderItem(models.Model):
+    """
+    Order line. Name, SKU and price are copied from the product when the order is placed.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey('product.Product', on_delete=models.SET_NULL, null=True, related_name='order_items')
+    product_name = models.CharField(max_length=255)
+    sku = models.CharField(max_length=64)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
+
+class DiscountRuleQuerySet(models.QuerySet):
+    # Bumped on redemption without changing how the rule is compiled
+    counter_fields = frozenset({'times_used'})
+
+    def update(self, **kwargs):
+        """
+        Stamp updated_at on bulk edits too, so every process's DiscountIndex
+        sees the change (it versions rules by Max(updated_at))
+        """
+        if self.counter_fields.issuperset(kwargs):
+            return super().update(**kwargs)
+        kwargs.setdefault('updated_at', timezone.now())
+        updated = super().update(**kwargs)
+        from .discounts import discount_index
+
+        discount_index.invalidate()
+        return updated
+
+
+class DiscountRule(models.Model):
+    """
+    Checkout discount: an automatic promotion, or a coupon when `code` is set.
+
+    Scope is a SKU, a category (including subcategories) or, with neither
+    set, the whole cart. Stackable rules combine with each other; a
+    non-stackable rule only applies on its own, when it beats the stack.
+    Evaluated in memory by order.discounts.
+    """
+    PERCENT = 'percent'
+    FIXED = 'fixed'
+    KIND_CHOICES = [
+        (PERCENT, 'Percentage off'),
+        (FIXED, 'Fixed amount off'),
+    ]
+
+    name = models.CharField(max_length=255)
+    code = models.CharField(max_length=50, blank=True, help_text='Coupon code; leave empty for an automatic promotion')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Percent (e.g. 15.00) or currency amount off the eligible subtotal, depending on kind
+    value = models.DecimalField(max_digits=10, decimal_places=2)
+    sku = models.CharField(max_length=64, blank=True)
+    category = models.ForeignKey(
+        'category.Category', on_delete=models.CASCADE, null=True, blank=True, related_name='discount_rules',
+    )
+    min_subtotal = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    stackable = models.BooleanField(default=True)
+    priority = models.PositiveIntegerField(default=0)
+    usage_limit = models.PositiveIntegerField(null=True, blank=True)
+    per_user_limit = models.PositiveIntegerField(null=True, blank=True)
+    # Incremented atomically on redemption, never above usage_limit
+    times_used = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DiscountRuleQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['priority', 'id']
+        constraints = [
+            # Codes are matched case-insensitively, so 'SAVE10' and 'save10' are the same coupon
+            models.UniqueConstraint(
+                Upper('code'), condition=~models.Q(code=''), name='discount_rule_code_upper_unique',
+                violation_error_message='A discount rule with this code already exists.',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.code})" if self.code else self.name
+
+
+class DiscountUsage(models.Model):
+    """
+    Per-user redemption counter for rules with a per_user_limit
+    """
+    rule = models.ForeignKey(DiscountRule, on_delete=models.CASCADE, related_name='usages', db_index=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='discount_usages')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['rule', 'user'], name='discount_usage_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.rule_id} / {self.user_id}: {self.count}"
+
+
+class OrderDiscount(models.Model):
+    """
+    Discount applied to an order
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='discounts')
+    rule = models.ForeignKey(DiscountRule, on_delete=models.SET_NULL, null=True, related_name='+')
+    name = models.CharField(max_length=255)
+    code = models.CharField(max_length=50, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.name}: -{self.amount}"
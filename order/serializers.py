@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+
+class CartItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=1000)
+
+
+class CartQuoteSerializer(serializers.Serializer):
+    items = serializers.ListField(child=CartItemSerializer(), allow_empty=False, max_length=200)
+    codes = serializers.ListField(child=serializers.CharField(max_length=50), required=False, default=list, max_length=10)
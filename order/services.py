@@ -0,0 +1,80 @@
+"""
+Order placement
+"""
+import logging
+
+from django.db import transaction
+
+from .discounts import CartLine, DiscountUnavailable, discount_index, redeem, used_up
+from .models import Order, OrderItem
+from .signals import order_placed, order_status_changed
+
+logger = logging.getLogger(__name__)
+
+
+class OrderService:
+    """
+    Service class for creating orders and moving them through their statuses
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def place_order(user, lines, codes=()):
+        """
+        Create an order from (product, quantity) pairs at the products' current prices,
+        applying automatic promotions and any coupon `codes`
+        """
+        lines = list(lines)
+        cart = [
+            CartLine(product.sku, product.category_id, product.current_price, quantity)
+            for product, quantity in lines
+        ]
+        unavailable = used_up(user)
+        while True:
+            subtotal, discounts = discount_index.evaluate(cart, codes, exclude=unavailable)
+            try:
+                # Savepoint, so a discount that ran out can be dropped and the order retried
+                with transaction.atomic():
+                    order, items = OrderService._create_order(user, lines, subtotal, discounts)
+                break
+            except DiscountUnavailable as e:
+                logger.info(f"Discount {e.rule_id} ran out during checkout for user {user.pk}, retrying without it")
+                unavailable.add(e.rule_id)
+
+        logger.info(f"Order {order.pk} placed by user {user.pk} ({len(lines)} items)")
+        order_placed.send(sender=Order, order=order, items=items)
+        return order
+
+    @staticmethod
+    def _create_order(user, lines, subtotal, discounts):
+        discount_total = sum((discount.amount for discount in discounts), 0)
+        order = Order.objects.create(
+            user=user, subtotal=subtotal, discount_total=discount_total, total=subtotal - discount_total,
+        )
+        items = [
+            OrderItem(
+                order=order,
+                product=product,
+                product_name=product.name,
+                sku=product.sku,
+                unit_price=product.current_price,
+                quantity=quantity,
+            )
+            for product, quantity in lines
+        ]
+        OrderItem.objects.bulk_create(items)
+        if discounts:
+            redeem(order, user, discounts)
+        return order, items
+
+    @staticmethod
+    @transaction.atomic
+    def set_status(order, status):
+        previous_status = order.status
+        if status == previous_status:
+            return order
+        order.status = status
+        order.save(update_fields=['status', 'updated_at'])
+        logger.info(f"Order {order.pk}: {previous_status} -> {status}")
+        order_status_changed.send(sender=Order, order=order, previous_status=previous_status)
+        return order
@@ -0,0 +1,27 @@
+"""
+Order lifecycle signals
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+# Sent once an order and its items are saved; receivers get `order` and `items`.
+# Sent inside the placing transaction, so use transaction.on_commit for side effects.
+order_placed = Signal()
+
+# Sent when an order's status changes; receivers get `order` and `previous_status`.
+order_status_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender='order.DiscountRule')
+def invalidate_discount_index(sender, **kwargs):
+    """Recompile discount rules on the next evaluation in this process"""
+    from .discounts import discount_index
+
+    discount_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender='order.Order')
+def invalidate_order_history(sender, instance, **kwargs):
+    from .history import invalidate
+
+    invalidate(instance.user_id)
@@ -1,3 +1,113 @@
-from django.test import TestCase
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+
+from tracking.models import Shipment
+from . import history
+from .discounts import CartLine, DiscountIndex
+from .models import DiscountRule, Order, OrderDiscount, OrderItem
+
+User = get_user_model()
+
+CART = [CartLine('SKU-1', None, Decimal('50.00'), 2)]
+
+
+class DiscountIndexTests(TestCase):
+    def setUp(self):
+        self.rule = DiscountRule.objects.create(
+            name='Ten off', code='SAVE10', kind=DiscountRule.FIXED, value=Decimal('10.00'),
+        )
+        # check_interval=0: compare the version on every evaluation, as another
+        # process would once its interval has passed
+        self.index = DiscountIndex(check_interval=0)
+
+    def codes(self):
+        return [discount.code for discount in self.index.evaluate(CART, ['save10'])[1]]
+
+    def test_queryset_update_reaches_other_processes(self):
+        self.assertEqual(self.codes(), ['SAVE10'])
+        DiscountRule.objects.filter(pk=self.rule.pk).update(is_active=False)
+        self.assertEqual(self.codes(), [])
+
+    def test_redemption_counter_does_not_touch_the_version(self):
+        updated_at = self.rule.updated_at
+        DiscountRule.objects.filter(pk=self.rule.pk).update(times_used=5)
+        self.rule.refresh_from_db()
+        self.assertEqual(self.rule.updated_at, updated_at)
+
+    def test_codes_are_unique_ignoring_case(self):
+        duplicate = DiscountRule(name='Dup', code='save10', kind=DiscountRule.FIXED, value=Decimal('1.00'))
+        with self.assertRaises(ValidationError):
+            duplicate.validate_constraints()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            duplicate.save()
+        # Automatic promotions have no code and are not constrained
+        for n in range(2):
+            DiscountRule.objects.create(name=f'Promo {n}', kind=DiscountRule.PERCENT, value=Decimal('5.00'))
+
+
+class OrderHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='buyer@example.com', username='buyer', phone_number='+15550005555', password='x',
+        )
+
+    def place_orders(self, count):
+        orders = Order.objects.bulk_create([
+            Order(user=self.user, subtotal='20.00', discount_total='2.00', total='18.00') for _ in range(count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_name=f'Item {n}', sku=f'SKU-{n}', unit_price='10.00', quantity=1)
+            for order in orders for n in range(2)
+        ])
+        OrderDiscount.objects.bulk_create([OrderDiscount(order=order, name='Two off', amount='2.00') for order in orders])
+        Shipment.objects.bulk_create([Shipment(order=order, tracking_number=f'T{order.pk}') for order in orders])
+        return orders
+
+    def test_page_is_three_queries_however_many_orders(self):
+        for count in (1, 100):
+            Order.objects.all().delete()
+            self.place_orders(count)
+            with self.assertNumQueries(3):
+                page = history.fetch_page(self.user.pk, limit=100)
+            self.assertEqual(len(page['results']), count)
+            self.assertEqual(len(page['results'][0]['items']), 2)
+            self.assertEqual(page['results'][0]['tracking']['status'], Shipment.PENDING)
+
+    def test_cursor_walks_every_order_once(self):
+        ids = {order.pk for order in self.place_orders(25)}
+        seen, cursor = [], None
+        while True:
+            page = history.fetch_page(self.user.pk, cursor=cursor, limit=10)
+            seen += [order['id'] for order in page['results']]
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual(sorted(seen), sorted(ids))
+
+    def test_first_page_is_not_cached_in_a_per_process_cache(self):
+        self.place_orders(1)
+        history.first_page(self.user.pk)
+        with self.assertNumQueries(3):
+            history.first_page(self.user.pk)
+
+    def test_first_page_cache_is_dropped_on_commit(self):
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location.name}}
+        with override_settings(CACHES=shared):
+            self.addCleanup(caches['default'].clear)
+            self.place_orders(1)
+            history.first_page(self.user.pk)
+            with self.assertNumQueries(0):
+                history.first_page(self.user.pk)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Order.objects.create(user=self.user)
+            self.assertEqual(len(history.first_page(self.user.pk)['results']), 2)
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.OrderHistoryView.as_view(), name='order-history'),
+    path('quote/', views.DiscountQuoteView.as_view(), name='order-quote'),
+]
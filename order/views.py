@@ -1,3 +1,78 @@
-from django.shortcuts import render
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
-# Create your views here.
+from product.models import Product
+from . import history
+from .discounts import CartLine, discount_index, to_decimal, used_up
+from .serializers import CartQuoteSerializer
+
+
+class DiscountQuoteView(APIView):
+    """
+    Price a cart with automatic promotions and coupon codes, without placing an order
+    """
+
+    def post(self, request):
+        serializer = CartQuoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['items']
+
+        products = Product.objects.filter(is_active=True).only(
+            'sku', 'category_id', 'price', 'sale_price',
+        ).in_bulk([item['product'] for item in items])
+        missing = [item['product'] for item in items if item['product'] not in products]
+        if missing:
+            raise ValidationError({'items': f'Unknown products: {missing}'})
+
+        cart = [
+            CartLine(products[item['product']].sku, products[item['product']].category_id,
+                     products[item['product']].current_price, item['quantity'])
+            for item in items
+        ]
+        subtotal, discounts = discount_index.evaluate(
+            cart, serializer.validated_data['codes'], exclude=used_up(request.user),
+        )
+        discount_total = sum((discount.amount for discount in discounts), to_decimal(0))
+        return Response({
+            'subtotal': str(subtotal),
+            'discounts': [
+                {'name': discount.name, 'code': discount.code, 'amount': str(discount.amount)}
+                for discount in discounts
+            ],
+            'discount_total': str(discount_total),
+            'total': str(subtotal - discount_total),
+        })
+
+
+class OrderHistoryView(APIView):
+    """
+    The current user's orders, newest first, with items, discounts and tracking status.
+
+    Paginated by an opaque `cursor`; `limit` sets the page size (max 100).
+    """
+    max_limit = 100
+
+    def get(self, request):
+        cursor = request.query_params.get('cursor')
+        limit = request.query_params.get('limit')
+        try:
+            limit = min(int(limit), self.max_limit) if limit else None
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer'})
+        if limit is not None and limit < 1:
+            raise ValidationError({'limit': 'Must be at least 1'})
+
+        if cursor is None and limit is None:
+            page = history.first_page(request.user.pk)
+        else:
+            try:
+                page = history.fetch_page(request.user.pk, cursor, limit)
+            except ValueError as e:
+                raise ValidationError({'cursor': str(e)})
+
+        next_url = None
+        if page['next']:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', page['next'])
+        return Response({'next': next_url, 'results': page['results']})
@@ -1,3 +1,35 @@
 from django.contrib import admin
 
-# Register your models here.
+from ecommerce.admin_exports import StreamingExportMixin
+from ecommerce.admin_search import LargeTableAdminMixin
+from .models import Payment, SettlementDiscrepancy, SettlementRun
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'provider', 'order', 'amount', 'currency', 'status', 'created_at')
+    list_filter = ('status', 'provider')
+    search_fields = ('reference',)
+    raw_id_fields = ('order',)
+
+
+@admin.register(SettlementRun)
+class SettlementRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'provider', 'file_name', 'status', 'lines', 'matched', 'discrepancies', 'rows_per_second', 'started_at')
+    list_filter = ('status', 'provider')
+    readonly_fields = [field.name for field in SettlementRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SettlementDiscrepancy)
+class SettlementDiscrepancyAdmin(LargeTableAdminMixin, StreamingExportMixin, admin.ModelAdmin):
+    list_display = ('reference', 'kind', 'run', 'line', 'expected', 'actual')
+    list_filter = ('kind',)
+    indexed_search_fields = {'reference': 'exact'}
+    raw_id_fields = ('run', 'payment')
+    export_fields = ('run_id', 'kind', 'reference', 'payment_id', 'line', 'expected', 'actual')
+
+    def has_add_permission(self, request):
+        return False
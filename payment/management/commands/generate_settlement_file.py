@@ -0,0 +1,95 @@
+import csv
+import json
+import random
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from order.models import Order
+from payment.models import Payment, SettlementDiscrepancy
+
+
+class Command(BaseCommand):
+    help = (
+        'Create N test payments and a shuffled settlement CSV for them with known discrepancies, '
+        'for benchmarking and checking reconcile_settlement. Development databases only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Settlement CSV to write')
+        parser.add_argument('--payments', type=int, default=100000, help='Number of payments to create')
+        parser.add_argument('--provider', default='fixture', help='Provider name for the payments')
+        parser.add_argument('--prefix', default='fx_', help='Reference prefix, so repeated runs do not collide')
+        parser.add_argument('--seed', type=int, default=7, help='Random seed for the line order')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Payments inserted per query')
+        parser.add_argument('--expected', help='Also write the expected discrepancy counts to this JSON file')
+
+    def handle(self, *args, **options):
+        count, prefix = options['payments'], options['prefix']
+        user, _ = get_user_model().objects.get_or_create(
+            username='settlement-fixture',
+            defaults={'email': 'settlement-fixture@example.com', 'phone_number': '+19990000000'},
+        )
+        order = Order.objects.create(user=user)
+
+        started = time.perf_counter()
+        batch = []
+        for i in range(count):
+            batch.append(Payment(
+                order=order, provider=options['provider'], reference=f'{prefix}{i:09d}',
+                amount=self.amount(i), currency='USD', status=self.status(i),
+            ))
+            if len(batch) >= options['batch_size']:
+                Payment.objects.bulk_create(batch)
+                batch = []
+        Payment.objects.bulk_create(batch)
+        self.stdout.write(f"Created {count} payments in {time.perf_counter() - started:.1f}s")
+
+        # Every 1000th payment is left out of the file, every 777th has the wrong
+        # amount, failed payments are reported as settled, every 20000th line is
+        # repeated and 500 lines have no payment at all
+        expected = Counter()
+        positions = list(range(count))
+        random.Random(options['seed']).shuffle(positions)
+        with open(options['path'], 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['reference', 'amount', 'currency', 'status'])
+            for i in positions:
+                status = self.status(i)
+                if i % 1000 == 7:
+                    if status != Payment.FAILED:
+                        expected[SettlementDiscrepancy.MISSING_SETTLEMENT] += 1
+                    continue
+                amount = self.amount(i)
+                if i % 777 == 0 and amount != '1.00':
+                    amount = '1.00'
+                    expected[SettlementDiscrepancy.AMOUNT_MISMATCH] += 1
+                if status == Payment.FAILED:
+                    expected[SettlementDiscrepancy.STATUS_MISMATCH] += 1
+                row = [f'{prefix}{i:09d}', amount, 'usd', 'refunded' if status == Payment.REFUNDED else 'settled']
+                writer.writerow(row)
+                if i % 20000 == 3:
+                    writer.writerow(row)
+                    expected[SettlementDiscrepancy.DUPLICATE_SETTLEMENT] += 1
+            for j in range(500):
+                writer.writerow([f'{prefix}unknown_{j}', '5.00', 'USD', 'settled'])
+                expected[SettlementDiscrepancy.MISSING_PAYMENT] += 1
+
+        if options['expected']:
+            with open(options['expected'], 'w', encoding='utf-8') as fh:
+                json.dump(expected, fh, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['path']}; expected discrepancies: {json.dumps(expected, sort_keys=True)}"
+        ))
+
+    @staticmethod
+    def status(i):
+        if i % 50:
+            return Payment.SUCCEEDED
+        return Payment.REFUNDED if i % 100 else Payment.FAILED
+
+    @staticmethod
+    def amount(i):
+        return f'{(i % 9000 + 100) / 100:.2f}'
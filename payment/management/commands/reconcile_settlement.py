@@ -0,0 +1,56 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payment.reconciliation import reconcile
+
+
+def parse_date(value):
+    try:
+        return timezone.make_aware(datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), time.min))
+    except ValueError:
+        raise CommandError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = 'Reconcile a provider settlement file (CSV or JSONL, optionally .gz) against payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Settlement file with reference, amount, currency and status columns')
+        parser.add_argument('--provider', required=True, help='Payment provider the file comes from')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='File format (default: from the extension)')
+        parser.add_argument('--since', help='Report payments created on or after this date missing from the file')
+        parser.add_argument('--until', help='... and before this date (exclusive)')
+        parser.add_argument('--date', help='Shortcut for --since DATE --until DATE+1')
+        parser.add_argument('--presorted', action='store_true', help='File is already sorted by reference; skip the external sort')
+        parser.add_argument('--chunk-size', type=int, default=200000, help='Lines sorted in memory per run')
+
+    def handle(self, *args, **options):
+        since = parse_date(options['since']) if options['since'] else None
+        until = parse_date(options['until']) if options['until'] else None
+        if options['date']:
+            since = parse_date(options['date'])
+            until = since + timedelta(days=1)
+
+        def progress(run, elapsed):
+            self.stdout.write(f"  {run.lines} lines, {run.discrepancies} discrepancies ({run.lines / elapsed:.0f} lines/s)")
+
+        try:
+            run = reconcile(
+                options['path'],
+                options['provider'],
+                since=since,
+                until=until,
+                fmt=options['format'],
+                presorted=options['presorted'],
+                chunk_size=options['chunk_size'],
+                progress=progress if options['verbosity'] > 1 else None,
+            )
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Run {run.pk}: {run.lines} lines, {run.payments_checked} payments checked, {run.matched} matched, "
+            f"{run.discrepancies} discrepancies ({run.rows_per_second:.0f} lines/s)"
+        ))
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SettlementRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=50)),
+                ('file_name', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('finished', 'Finished'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('lines', models.PositiveIntegerField(default=0)),
+                ('payments_checked', models.PositiveIntegerField(default=0)),
+                ('matched', models.PositiveIntegerField(default=0)),
+                ('discrepancies', models.PositiveIntegerField(default=0)),
+                ('rows_per_second', models.FloatField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SettlementDiscrepancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('missing_payment', 'Missing payment'), ('missing_settlement', 'Missing settlement'), ('duplicate_settlement', 'Duplicate settlement'), ('amount_mismatch', 'Amount mismatch'), ('currency_mismatch', 'Currency mismatch'), ('status_mismatch', 'Status mismatch'), ('invalid_line', 'Invalid line')], max_length=30)),
+                ('reference', models.CharField(max_length=100)),
+                ('line', models.PositiveIntegerField(blank=True, null=True)),
+                ('expected', models.CharField(blank=True, max_length=100)),
+                ('actual', models.CharField(blank=True, max_length=100)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='payment.payment')),
+                ('run', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='discrepancy_rows', to='payment.settlementrun')),
+            ],
+            options={
+                'verbose_name_plural': 'settlement discrepancies',
+                'ordering': ['run', 'id'],
+                'indexes': [models.Index(fields=['run', 'kind'], name='settlement_disc_run_kind')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# Reconciliation pages through payments ordered by reference COLLATE "C" (byte
+# order, matching Python's string comparison). PostgreSQL only; SQLite already
+# compares bytes.
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS payment_provider_reference_c '
+        'ON payment_payment (provider, reference COLLATE "C")'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS payment_provider_reference_c')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_settlementrun_settlementdiscrepancy'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
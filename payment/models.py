@@ -1,3 +1,108 @@
 from django.db import models
 
-# Create your models here.
+
+class Payment(models.Model):
+    """
+    Payment attempt for an order, identified by the provider's transaction reference
+    """
+    PENDING = 'pending'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    REFUNDED = 'refunded'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (REFUNDED, 'Refunded'),
+    ]
+
+    order = models.ForeignKey('order.Order', on_delete=models.CASCADE, related_name='payments')
+    provider = models.CharField(max_length=50)
+    reference = models.CharField(max_length=100)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = models.CharField(max_length=3, default='USD')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'reference'], name='payment_provider_reference'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.reference} ({self.status})"
+
+
+class SettlementRun(models.Model):
+    """
+    One reconciliation of a provider settlement file against our payments
+    """
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (RUNNING, 'Running'),
+        (FINISHED, 'Finished'),
+        (FAILED, 'Failed'),
+    ]
+
+    provider = models.CharField(max_length=50)
+    file_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=RUNNING)
+    lines = models.PositiveIntegerField(default=0)
+    payments_checked = models.PositiveIntegerField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    discrepancies = models.PositiveIntegerField(default=0)
+    rows_per_second = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.provider} {self.file_name} ({self.status})"
+
+
+class SettlementDiscrepancy(models.Model):
+    """
+    Difference between a settlement file line and our payment records
+    """
+    MISSING_PAYMENT = 'missing_payment'          # settled, but no such payment here
+    MISSING_SETTLEMENT = 'missing_settlement'    # payment succeeded/refunded, not in the file
+    DUPLICATE_SETTLEMENT = 'duplicate_settlement'
+    AMOUNT_MISMATCH = 'amount_mismatch'
+    CURRENCY_MISMATCH = 'currency_mismatch'
+    STATUS_MISMATCH = 'status_mismatch'
+    INVALID_LINE = 'invalid_line'
+    KIND_CHOICES = [
+        (MISSING_PAYMENT, 'Missing payment'),
+        (MISSING_SETTLEMENT, 'Missing settlement'),
+        (DUPLICATE_SETTLEMENT, 'Duplicate settlement'),
+        (AMOUNT_MISMATCH, 'Amount mismatch'),
+        (CURRENCY_MISMATCH, 'Currency mismatch'),
+        (STATUS_MISMATCH, 'Status mismatch'),
+        (INVALID_LINE, 'Invalid line'),
+    ]
+
+    run = models.ForeignKey(SettlementRun, on_delete=models.CASCADE, related_name='discrepancy_rows', db_index=False)
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    reference = models.CharField(max_length=100)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    line = models.PositiveIntegerField(null=True, blank=True)
+    # Our value and the settlement file's value, for mismatches
+    expected = models.CharField(max_length=100, blank=True)
+    actual = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        ordering = ['run', 'id']
+        verbose_name_plural = 'settlement discrepancies'
+        indexes = [
+            models.Index(fields=['run', 'kind'], name='settlement_disc_run_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.reference}"
@@ -0,0 +1,260 @@
+"""
+Streaming reconciliation of provider settlement files against Payment rows.
+
+Both sides are streamed in reference order and merge-joined, so memory
+stays bounded whatever the file size: the file is externally sorted into
+on-disk runs of `chunk_size` lines (unless it is declared presorted),
+and payments are read in keyset-paginated chunks ordered by reference.
+"""
+import csv
+import gzip
+import heapq
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from .models import Payment, SettlementDiscrepancy, SettlementRun
+
+logger = logging.getLogger(__name__)
+
+SETTLED = 'settled'
+REFUNDED = 'refunded'
+# Settlement file status -> the Payment status we expect for it
+EXPECTED_STATUS = {
+    SETTLED: Payment.SUCCEEDED,
+    REFUNDED: Payment.REFUNDED,
+}
+# Payments in these statuses should appear in the provider's settlement
+SETTLING_STATUSES = (Payment.SUCCEEDED, Payment.REFUNDED)
+
+Settlement = namedtuple('Settlement', 'reference amount currency status line')
+PaymentRow = namedtuple('PaymentRow', 'id reference amount currency status')
+
+
+def read_settlements(path, fmt=None):
+    """Yield Settlement tuples from a CSV or JSONL file (optionally gzipped)"""
+    name = path[:-3] if path.endswith('.gz') else path
+    fmt = fmt or ('jsonl' if name.endswith(('.jsonl', '.ndjson')) else 'csv')
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', newline='', encoding='utf-8') as fh:
+        rows = csv.DictReader(fh) if fmt == 'csv' else (json.loads(text) for text in fh if text.strip())
+        for line, row in enumerate(rows, 1):
+            yield Settlement(
+                str(row.get('reference') or ''),
+                str(row.get('amount') or ''),
+                str(row.get('currency') or '').upper(),
+                str(row.get('status') or SETTLED).lower(),
+                line,
+            )
+
+
+def sort_settlements(settlements, chunk_size=200000, tmp_dir=None):
+    """
+    Yield settlements ordered by reference using an external merge sort.
+
+    Holds at most `chunk_size` lines in memory; larger inputs are written
+    as sorted runs to a temporary directory and merged with heapq.merge.
+    """
+    chunk = []
+    runs = []
+    with tempfile.TemporaryDirectory(dir=tmp_dir, prefix='settlement-') as workdir:
+        for settlement in settlements:
+            chunk.append(settlement)
+            if len(chunk) >= chunk_size:
+                runs.append(_write_run(workdir, len(runs), chunk))
+                chunk = []
+
+        if not runs:
+            yield from sorted(chunk, key=lambda s: s.reference)
+            return
+        if chunk:
+            runs.append(_write_run(workdir, len(runs), chunk))
+        yield from heapq.merge(*(_read_run(path) for path in runs), key=lambda s: s.reference)
+
+
+def check_sorted(settlements):
+    """Pass through settlements from a file that claims to be sorted, failing if it isn't"""
+    last = None
+    for settlement in settlements:
+        if last is not None and settlement.reference < last:
+            raise ValueError(f"Settlement file is not sorted by reference at line {settlement.line}")
+        last = settlement.reference
+        yield settlement
+
+
+def _write_run(workdir, index, chunk):
+    chunk.sort(key=lambda s: s.reference)
+    path = os.path.join(workdir, f'run-{index}.csv')
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        csv.writer(fh).writerows(chunk)
+    return path
+
+
+def _read_run(path):
+    with open(path, newline='', encoding='utf-8') as fh:
+        for reference, amount, currency, status, line in csv.reader(fh):
+            yield Settlement(reference, amount, currency, status, int(line))
+
+
+def stream_payments(provider, since=None, until=None, chunk_size=10000):
+    """
+    Yield PaymentRow tuples for a provider in reference order, by keyset pagination.
+
+    Ordering uses the "C" collation on PostgreSQL so it matches Python's
+    string comparison (see the payment_provider_reference_c index).
+    """
+    queryset = Payment.objects.filter(provider=provider)
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+    if connection.vendor == 'postgresql':
+        queryset = queryset.alias(sort_reference=Collate('reference', 'C'))
+        key = 'sort_reference'
+    else:
+        key = 'reference'
+
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(**{f'{key}__gt': last})
+        rows = list(
+            page.order_by(key).values_list('id', 'reference', 'amount', 'currency', 'status')[:chunk_size]
+        )
+        if not rows:
+            return
+        for row in rows:
+            yield PaymentRow(*row)
+        last = rows[-1][1]
+
+
+class DiscrepancyWriter:
+    """Buffer discrepancies and write them with bulk_create"""
+
+    def __init__(self, run, batch_size=5000):
+        self.run = run
+        self.batch_size = batch_size
+        self.buffer = []
+        self.count = 0
+
+    def add(self, kind, reference, payment_id=None, line=None, expected='', actual=''):
+        self.buffer.append(SettlementDiscrepancy(
+            run=self.run, kind=kind, reference=reference[:100], payment_id=payment_id, line=line,
+            expected=str(expected)[:100], actual=str(actual)[:100],
+        ))
+        self.count += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            SettlementDiscrepancy.objects.bulk_create(self.buffer)
+            self.buffer = []
+
+
+def compare(settlement, payment, writer):
+    """Record mismatches between a settlement line and its payment; returns True if they agree"""
+    try:
+        amount = Decimal(settlement.amount)
+    except InvalidOperation:
+        writer.add(SettlementDiscrepancy.INVALID_LINE, settlement.reference, payment.id, settlement.line,
+                   actual=settlement.amount)
+        return False
+
+    agree = True
+    if amount != payment.amount:
+        writer.add(SettlementDiscrepancy.AMOUNT_MISMATCH, settlement.reference, payment.id, settlement.line,
+                   payment.amount, settlement.amount)
+        agree = False
+    if settlement.currency and settlement.currency != payment.currency:
+        writer.add(SettlementDiscrepancy.CURRENCY_MISMATCH, settlement.reference, payment.id, settlement.line,
+                   payment.currency, settlement.currency)
+        agree = False
+    if EXPECTED_STATUS.get(settlement.status) != payment.status:
+        writer.add(SettlementDiscrepancy.STATUS_MISMATCH, settlement.reference, payment.id, settlement.line,
+                   payment.status, settlement.status)
+        agree = False
+    return agree
+
+
+def reconcile(path, provider, since=None, until=None, fmt=None, presorted=False, chunk_size=200000,
+              payment_chunk_size=10000, batch_size=5000, progress=None, progress_every=500000):
+    """
+    Reconcile a settlement file and return the finished SettlementRun.
+
+    Payments missing from the file are only reported when a created_at
+    window (since/until) says which payments the file should cover.
+    `progress(run, elapsed)` is called every `progress_every` lines.
+    """
+    run = SettlementRun.objects.create(provider=provider, file_name=os.path.basename(path))
+    writer = DiscrepancyWriter(run, batch_size)
+    report_missing = since is not None or until is not None
+    started = time.perf_counter()
+
+    try:
+        settlements = read_settlements(path, fmt)
+        settlements = check_sorted(settlements) if presorted else sort_settlements(settlements, chunk_size)
+        payments = stream_payments(provider, since, until, payment_chunk_size)
+        settlement = next(settlements, None)
+        payment = next(payments, None)
+        previous_reference = None
+        reported_lines = 0
+
+        while settlement is not None or payment is not None:
+            if payment is None or (settlement is not None and settlement.reference < payment.reference):
+                kind = (
+                    SettlementDiscrepancy.DUPLICATE_SETTLEMENT if settlement.reference == previous_reference
+                    else SettlementDiscrepancy.MISSING_PAYMENT
+                )
+                writer.add(kind, settlement.reference, line=settlement.line, actual=settlement.amount)
+                previous_reference = settlement.reference
+                settlement = next(settlements, None)
+                run.lines += 1
+            elif settlement is None or payment.reference < settlement.reference:
+                if report_missing and payment.status in SETTLING_STATUSES:
+                    writer.add(SettlementDiscrepancy.MISSING_SETTLEMENT, payment.reference, payment.id,
+                               expected=payment.amount)
+                payment = next(payments, None)
+                run.payments_checked += 1
+            else:
+                if compare(settlement, payment, writer):
+                    run.matched += 1
+                previous_reference = settlement.reference
+                settlement = next(settlements, None)
+                payment = next(payments, None)
+                run.lines += 1
+                run.payments_checked += 1
+
+            # Only when run.lines has just moved on, not on payment-only steps
+            if progress and run.lines != reported_lines and run.lines % progress_every == 0:
+                reported_lines = run.lines
+                run.discrepancies = writer.count
+                progress(run, time.perf_counter() - started)
+
+        writer.flush()
+        run.status = SettlementRun.FINISHED
+    except Exception as e:
+        writer.flush()
+        run.status = SettlementRun.FAILED
+        run.error = str(e)
+        logger.error(f"Settlement reconciliation {run.pk} failed: {str(e)}")
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        run.discrepancies = writer.count
+        run.rows_per_second = run.lines / elapsed if elapsed else None
+        run.finished_at = timezone.now()
+        run.save()
+
+    logger.info(
+        f"Reconciled {run.lines} settlement lines for {provider}: {run.matched} matched, "
+        f"{run.discrepancies} discrepancies ({run.rows_per_second:.0f} lines/s)"
+    )
+    return run
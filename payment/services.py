@@ -0,0 +1,39 @@
+"""
+Recording payments and their status changes
+"""
+import logging
+
+from django.db import transaction
+
+from .models import Payment
+from .signals import payment_status_changed
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentService:
+    """
+    Service class for payments
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def record_payment(order, provider, reference, amount, status=Payment.PENDING, currency='USD'):
+        payment = Payment.objects.create(
+            order=order, provider=provider, reference=reference, amount=amount, status=status, currency=currency,
+        )
+        logger.info(f"Payment {provider}/{reference} recorded for order {order.pk} ({status})")
+        payment_status_changed.send(sender=Payment, payment=payment, previous_status=None)
+        return payment
+
+    @staticmethod
+    @transaction.atomic
+    def set_status(payment, status):
+        previous_status = payment.status
+        if status == previous_status:
+            return payment
+        payment.status = status
+        payment.save(update_fields=['status', 'updated_at'])
+        logger.info(f"Payment {payment.provider}/{payment.reference}: {previous_status} -> {status}")
+        payment_status_changed.send(sender=Payment, payment=payment, previous_status=previous_status)
+        return payment
@@ -0,0 +1,8 @@
+"""
+Payment lifecycle signals
+"""
+from django.dispatch import Signal
+
+# Sent when a payment is recorded or changes status; receivers get `payment` and
+# `previous_status` (None for a new payment). Sent inside the writing transaction.
+payment_status_changed = Signal()
@@ -1,3 +1,80 @@
+import csv
+import json
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from order.models import Order
+from .models import Payment, SettlementDiscrepancy, SettlementRun
+from .reconciliation import reconcile
+
+User = get_user_model()
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_csv(self, rows, name='settlement.csv'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['reference', 'amount', 'currency', 'status'])
+            writer.writerows(rows)
+        return path
+
+    def kinds(self, run):
+        return Counter(SettlementDiscrepancy.objects.filter(run=run).values_list('kind', flat=True))
+
+    def test_generated_file_finds_every_injected_discrepancy(self):
+        path = os.path.join(self.directory, 'generated.csv')
+        expected_path = os.path.join(self.directory, 'expected.json')
+        call_command(
+            'generate_settlement_file', path, payments=3000, expected=expected_path, stdout=StringIO(),
+        )
+        with open(expected_path, encoding='utf-8') as fh:
+            expected = json.load(fh)
+
+        # A small chunk size forces the external sort to merge several runs
+        run = reconcile(path, 'fixture', since=timezone.now() - timedelta(days=1), chunk_size=500)
+
+        self.assertEqual(run.status, SettlementRun.FINISHED)
+        self.assertEqual(dict(self.kinds(run)), expected)
+        self.assertEqual(run.discrepancies, sum(expected.values()))
+
+    def test_progress_fires_once_per_interval_of_lines(self):
+        user = User.objects.create_user(
+            email='payer@example.com', username='payer', phone_number='+15550004444', password='x',
+        )
+        order = Order.objects.create(user=user)
+        # Payments missing from the file between the matched lines advance the
+        # payment side only
+        Payment.objects.bulk_create([
+            Payment(order=order, provider='stub', reference=f'ch_{i:03d}', amount='1.00', status=Payment.SUCCEEDED)
+            for i in range(50)
+        ])
+        path = self.write_csv([[f'ch_{i:03d}', '1.00', 'USD', 'settled'] for i in (0, 1, 40, 41)])
+
+        calls = []
+        run = reconcile(path, 'stub', since=timezone.now() - timedelta(days=1),
+                        progress=lambda run, elapsed: calls.append(run.lines), progress_every=2)
+
+        self.assertEqual(calls, [2, 4])
+        self.assertEqual((run.lines, run.matched, run.payments_checked), (4, 4, 50))
+        self.assertEqual(self.kinds(run), {SettlementDiscrepancy.MISSING_SETTLEMENT: 46})
 
-# Create your tests here.
+    def test_presorted_file_out_of_order_fails_the_run(self):
+        path = self.write_csv([['b', '1.00', 'USD', 'settled'], ['a', '1.00', 'USD', 'settled']])
+        with self.assertRaisesMessage(ValueError, 'not sorted by reference at line 2'):
+            reconcile(path, 'stub', presorted=True)
+        run = SettlementRun.objects.get()
+        self.assertEqual(run.status, SettlementRun.FAILED)
@@ -1,3 +1,33 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PriceRule, Product, ProductImage, ProductStats
+
+
+class ProductImageInline(admin.TabularInline):
+    model = ProductImage
+    extra = 1
+    fields = ('image', 'alt_text', 'position', 'width', 'height', 'processed_at')
+    readonly_fields = ('width', 'height', 'processed_at')
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('name', 'sku', 'category', 'price', 'sale_price', 'is_active', 'updated_at')
+    list_filter = ('is_active', 'category')
+    search_fields = ('name', 'sku')
+    inlines = [ProductImageInline]
+
+
+@admin.register(PriceRule)
+class PriceRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'kind', 'value', 'category', 'min_price', 'priority', 'is_active', 'starts_at', 'ends_at')
+    list_filter = ('kind', 'is_active', 'category')
+    search_fields = ('name',)
+
+
+@admin.register(ProductStats)
+class ProductStatsAdmin(admin.ModelAdmin):
+    list_display = ('product', 'views', 'last_viewed_at')
+    ordering = ('-popularity',)
+    raw_id_fields = ('product',)
+    readonly_fields = ('views', 'popularity', 'last_viewed_at')
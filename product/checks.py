@@ -0,0 +1,13 @@
+from django.core.checks import Error, register
+from django.core.exceptions import ImproperlyConfigured
+
+
+@register()
+def check_popularity_half_life(app_configs, **kwargs):
+    from .counters import half_life_hours
+
+    try:
+        half_life_hours()
+    except (ImproperlyConfigured, TypeError) as e:
+        return [Error(str(e), id='product.E001')]
+    return []
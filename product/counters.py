@@ -0,0 +1,192 @@
+"""
+Write-behind product view counters and popularity ranking.
+
+Views are counted in process memory and flushed every
+PRODUCT_VIEW_FLUSH_SECONDS by a background thread (and at exit) as a batch
+of `UPDATE ... SET views = views + n` statements, so a busy product page
+costs one row write per process per interval instead of one per view.
+
+Popularity uses forward decay: a view at time t adds
+2 ** ((t - epoch) / half_life), so every flush is a plain atomic addition
+and the ordering always matches the decayed score. Weights double every
+half-life, so once the epoch is REBASE_AFTER_HALF_LIVES behind, the next
+flush (or `manage.py rebase_popularity`) divides every score by the current
+weight and moves the epoch (a PopularityEpoch row) to now. Flushes and
+rebases lock that row, so no flush adds weights on the old scale.
+"""
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PopularityEpoch, Product, ProductStats
+
+logger = logging.getLogger(__name__)
+
+# Weights reach 2 ** 32 before a rebase, far below the float limit of 2 ** 1024
+REBASE_AFTER_HALF_LIVES = 32
+
+TOP_ORDERINGS = {
+    'trending': '-popularity',
+    'most_viewed': '-views',
+}
+
+
+def half_life_hours():
+    half_life = settings.PRODUCT_POPULARITY_HALF_LIFE_HOURS
+    if not math.isfinite(half_life) or half_life < 1:
+        raise ImproperlyConfigured(
+            f"PRODUCT_POPULARITY_HALF_LIFE_HOURS must be a number of hours >= 1, got {half_life!r}"
+        )
+    return half_life
+
+
+def half_lives_since(epoch, when):
+    return (when - epoch.epoch).total_seconds() / (epoch.half_life_hours * 3600)
+
+
+def popularity_weight(epoch, when):
+    return 2.0 ** half_lives_since(epoch, when)
+
+
+def decay_factor(epoch, when):
+    """1 / popularity_weight(), which underflows to 0 instead of overflowing after a long gap"""
+    return 2.0 ** -half_lives_since(epoch, when)
+
+
+def current_epoch(lock=False):
+    queryset = PopularityEpoch.objects.select_for_update() if lock else PopularityEpoch.objects
+    epoch, _ = queryset.get_or_create(pk=1, defaults={'epoch': timezone.now(), 'half_life_hours': half_life_hours()})
+    return epoch
+
+
+def decayed_popularity(stats, now=None):
+    """A product's popularity in "views as of now" units"""
+    return stats.popularity * decay_factor(current_epoch(), now or timezone.now())
+
+
+def _rebase(epoch, now):
+    """Rescale every score to an epoch of `now`; the caller holds the epoch row lock"""
+    factor = decay_factor(epoch, now)
+    rows = ProductStats.objects.exclude(popularity=0).update(popularity=F('popularity') * factor)
+    previous = epoch.epoch
+    epoch.epoch, epoch.half_life_hours = now, half_life_hours()
+    epoch.save(update_fields=['epoch', 'half_life_hours'])
+    logger.info(f"Rebased popularity of {rows} products from {previous.isoformat()} to {now.isoformat()}")
+    return rows
+
+
+def rebase_popularity(now=None):
+    """Move the popularity epoch to now; returns the number of rescaled products"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        return _rebase(current_epoch(lock=True), now)
+
+
+def write_views(counts, now=None):
+    """Add {product_id: views} to ProductStats in one batched UPDATE"""
+    now = now or timezone.now()
+    missing = Product.objects.filter(pk__in=list(counts), stats__isnull=True).values_list('pk', flat=True)
+    # Products deleted since they were viewed get no row, so their UPDATEs match nothing
+    ProductStats.objects.bulk_create([ProductStats(product_id=pk) for pk in missing], ignore_conflicts=True)
+
+    quote = connection.ops.quote_name
+    field = ProductStats._meta.get_field
+    views, popularity, last_viewed_at, product = (
+        quote(field(name).column) for name in ('views', 'popularity', 'last_viewed_at', 'product')
+    )
+    update = (
+        f"UPDATE {quote(ProductStats._meta.db_table)} SET {views} = {views} + %s, "
+        f"{popularity} = {popularity} + %s, {last_viewed_at} = %s WHERE {product} = %s"
+    )
+    last_viewed_at = connection.ops.adapt_datetimefield_value(now)
+    with transaction.atomic():
+        epoch = current_epoch(lock=True)
+        # A changed half-life also needs a rebase: scores so far decay at the old
+        # rate up to now and at the new one after it
+        if half_lives_since(epoch, now) >= REBASE_AFTER_HALF_LIVES or epoch.half_life_hours != half_life_hours():
+            _rebase(epoch, now)
+        weight = popularity_weight(epoch, now)
+        with connection.cursor() as cursor:
+            # Sorted, so concurrent flushes from several workers lock rows in the same order
+            cursor.executemany(update, [
+                (count, count * weight, last_viewed_at, product_id) for product_id, count in sorted(counts.items())
+            ])
+
+
+class ViewCounter:
+    """
+    In-process buffer of product views with a periodic background flush
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def incr(self, product_id, count=1):
+        if self._pid != os.getpid():
+            self._start()
+        with self._lock:
+            self._pending[product_id] = self._pending.get(product_id, 0) + count
+
+    def _start(self):
+        # Started lazily, and again after a fork: the flush thread doesn't survive
+        # fork, and counts inherited from the parent are the parent's to flush
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._pending = {}
+        threading.Thread(target=self._run, name='product-view-counter', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        """Write buffered views to the database; returns the number of views written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            write_views(pending)
+        except Exception as e:
+            logger.error(f"Could not flush {len(pending)} product view counters: {str(e)}")
+            with self._lock:
+                for product_id, count in pending.items():
+                    self._pending[product_id] = self._pending.get(product_id, 0) + count
+            return 0
+        return sum(pending.values())
+
+
+view_counter = ViewCounter(interval=getattr(settings, 'PRODUCT_VIEW_FLUSH_SECONDS', 10))
+atexit.register(view_counter.flush)
+
+
+def record_view(product_id):
+    view_counter.incr(product_id)
+
+
+def top_product_ids(kind):
+    """Ids of the top PRODUCT_TOP_SIZE active products for a TOP_ORDERINGS kind, cached briefly"""
+    def fetch():
+        return list(
+            ProductStats.objects.filter(product__is_active=True)
+            .order_by(TOP_ORDERINGS[kind], 'product_id')
+            .values_list('product_id', flat=True)[:settings.PRODUCT_TOP_SIZE]
+        )
+
+    return cache.get_or_set(f'product-top:{kind}', fetch, settings.PRODUCT_TOP_CACHE_SECONDS)
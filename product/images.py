@@ -0,0 +1,201 @@
+"""
+Product image pipeline: content-addressed originals and resized JPEG/WebP variants
+"""
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from ecommerce import tasks
+from .models import ProductImage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {'thumb': 150, 'small': 320, 'medium': 640, 'large': 1280}
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def get_sizes():
+    return getattr(settings, 'PRODUCT_IMAGE_SIZES', DEFAULT_SIZES)
+
+
+def variant_dir(content_hash):
+    return f"products/variants/{content_hash[:2]}/{content_hash}"
+
+
+def store_original(image):
+    """
+    Hash an uploaded file and point the ProductImage at its content-addressed path.
+
+    If the same content was uploaded before, the existing file is reused
+    instead of storing another copy.
+    """
+    digest = hashlib.sha256()
+    upload = image.image.file
+    for chunk in upload.chunks() if hasattr(upload, 'chunks') else iter(lambda: upload.read(65536), b''):
+        digest.update(chunk)
+    upload.seek(0)
+    image.content_hash = digest.hexdigest()
+
+    name = image.image.field.generate_filename(image, image.image.name)
+    if default_storage.exists(name):
+        # Assigning the name marks the file as already stored
+        image.image = name
+
+
+def generate_variants(original_path, media_root, content_hash, sizes, force=False):
+    """
+    Write every size as JPEG and WebP and return the variants mapping.
+
+    Runs in worker processes, so it only touches the filesystem. Existing
+    files are left alone unless `force` is set; variants of identical
+    uploads are shared.
+    """
+    from PIL import Image, ImageOps
+
+    rel_dir = variant_dir(content_hash)
+    out_dir = os.path.join(media_root, rel_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    variants = {}
+    with Image.open(original_path) as source:
+        largest = max(sizes.values())
+        # For JPEGs, decode at a reduced scale when the original is much larger
+        source.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Largest first, each size resized from the previous one
+        for name, max_width in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+            width = min(max_width, image.width)
+            height = max(1, round(image.height * width / image.width))
+            if (width, height) != image.size:
+                image = image.resize((width, height), Image.LANCZOS)
+
+            entry = {'width': width, 'height': height}
+            for fmt, ext, options in (
+                ('jpeg', 'jpg', {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}),
+                ('webp', 'webp', {'quality': WEBP_QUALITY, 'method': 4}),
+            ):
+                rel_path = f"{rel_dir}/{name}.{ext}"
+                full_path = os.path.join(media_root, rel_path)
+                if force or not os.path.exists(full_path):
+                    tmp_path = f"{full_path}.{os.getpid()}.tmp"
+                    image.save(tmp_path, format=fmt.upper(), **options)
+                    os.replace(tmp_path, full_path)
+                entry[fmt] = rel_path
+            variants[name] = entry
+    return variants
+
+
+def _generate_job(job):
+    pk, original_path, media_root, content_hash, sizes, force = job
+    try:
+        return content_hash, generate_variants(original_path, media_root, content_hash, sizes, force), None
+    except Exception as e:
+        return content_hash, None, f"image {pk}: {e}"
+
+
+class UploadPool:
+    """
+    Process pool for variants of freshly uploaded images.
+
+    Resizing is CPU-bound and holds the GIL, so it runs in separate
+    processes instead of on the web worker's task threads; the task thread
+    only waits for the result and writes it to the database. Created
+    lazily, so each forked app server worker gets its own pool. With
+    `processes` set to 0 variants are generated in the calling thread.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def run(self, func, *args):
+        if not self.processes:
+            return func(*args)
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.processes)
+        return self._executor.submit(func, *args).result()
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+upload_pool = UploadPool(getattr(settings, 'PRODUCT_IMAGE_UPLOAD_PROCESSES', 2))
+atexit.register(upload_pool.shutdown)
+
+
+def process_image(image_id):
+    """Generate variants for one uploaded image in the upload process pool"""
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is None:
+        return
+    variants = upload_pool.run(
+        generate_variants, image.image.path, str(settings.MEDIA_ROOT), image.content_hash, get_sizes(),
+    )
+    ProductImage.objects.filter(content_hash=image.content_hash).update(
+        variants=variants, processed_at=timezone.now(),
+    )
+
+
+def schedule_variants(image):
+    """Reuse variants of an identical upload, or generate them in the background after commit"""
+    done = (
+        ProductImage.objects.filter(content_hash=image.content_hash, processed_at__isnull=False)
+        .exclude(pk=image.pk).values_list('variants', flat=True).first()
+    )
+    if done:
+        ProductImage.objects.filter(pk=image.pk).update(variants=done, processed_at=timezone.now())
+        return
+
+    tasks.dispatch_on_commit(process_image, image.pk)
+
+
+def backfill(queryset, workers=None, progress=None, force=False):
+    """
+    Generate variants for every distinct original in queryset using a process pool.
+
+    With `force`, existing variant files are overwritten. Returns
+    (processed, failed, elapsed seconds).
+    """
+    media_root = str(settings.MEDIA_ROOT)
+    sizes = get_sizes()
+    jobs = {}
+    for pk, name, content_hash in queryset.values_list('pk', 'image', 'content_hash').iterator():
+        jobs.setdefault(content_hash, (pk, default_storage.path(name), media_root, content_hash, sizes, force))
+
+    processed = failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for content_hash, variants, error in executor.map(_generate_job, jobs.values(), chunksize=4):
+            if error:
+                failed += 1
+                logger.error(f"Variant generation failed for {error}")
+                continue
+            ProductImage.objects.filter(content_hash=content_hash).update(
+                variants=variants, processed_at=timezone.now(),
+            )
+            processed += 1
+            if progress:
+                progress(processed, time.perf_counter() - started)
+    return processed, failed, time.perf_counter() - started
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from product.recommendations import export_table, rebuild_pairs
+
+
+class Command(BaseCommand):
+    help = 'Export the "frequently bought together" table (optionally recounting it from all orders first)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recount the co-occurrence matrix from all order lines')
+        parser.add_argument('--top-k', type=int, help='Related products kept per product (default: RECOMMENDATIONS_TOP_K)')
+        parser.add_argument('--path', help='Output file (default: RECOMMENDATIONS_FILE)')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            pairs = rebuild_pairs(chunk_size=options['chunk_size'])
+            self.stdout.write(f"Counted {pairs} product pairs")
+        products = export_table(path=options['path'], k=options['top_k'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Exported recommendations for {products} products"))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from product.images import backfill
+from product.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Generate resized JPEG/WebP variants for product images using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--all', action='store_true', help='Regenerate variants for already processed images too')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Overwrite existing variant files, e.g. after changing sizes or quality (implies --all)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = ProductImage.objects.all()
+        if not (options['all'] or options['force']):
+            queryset = queryset.filter(processed_at__isnull=True)
+
+        def progress(count, elapsed):
+            if options['verbosity'] > 1 and count % 100 == 0:
+                self.stdout.write(f"  {count} images ({count / elapsed:.1f}/s)")
+
+        processed, failed, elapsed = backfill(
+            queryset, workers=options['workers'], progress=progress, force=options['force'],
+        )
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} distinct image(s), {failed} failed, in {elapsed:.1f}s ({rate:.1f} images/s)"
+        ))
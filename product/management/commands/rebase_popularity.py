@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from product.counters import rebase_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        'Rescale product popularity scores to an epoch of now. View flushes do this on their '
+        'own when the epoch gets old; run it after importing scores or to rebase right away.'
+    )
+
+    def handle(self, *args, **options):
+        rows = rebase_popularity()
+        self.stdout.write(self.style.SUCCESS(f"Rebased popularity of {rows} products"))
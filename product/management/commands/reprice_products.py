@@ -0,0 +1,51 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from product.pricing import NO_SALE, ROUND_CENT, ROUNDING_MODES, reprice
+
+
+class Command(BaseCommand):
+    help = 'Apply the active price rules to the whole catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounding', choices=ROUNDING_MODES, default=ROUND_CENT, help='Price rounding')
+        parser.add_argument('--chunk-size', type=int, default=50000, help='Products processed per chunk')
+        parser.add_argument('--dry-run', action='store_true', help='Report changes without writing them')
+        parser.add_argument('--diff-file', help='Write changed prices as CSV (product_id,old_sale_price,new_sale_price)')
+
+    def handle(self, *args, **options):
+        diff_file = open(options['diff_file'], 'w', newline='') if options['diff_file'] else None
+        writer = None
+        if diff_file:
+            writer = csv.writer(diff_file)
+            writer.writerow(['product_id', 'old_sale_price', 'new_sale_price'])
+
+        def on_diff(diff):
+            if writer:
+                format_cents = lambda cents: '' if cents == NO_SALE else f"{cents / 100:.2f}"
+                writer.writerows(
+                    (pk, format_cents(old), format_cents(new))
+                    for pk, old, new in zip(diff.product_ids.tolist(), diff.old_cents.tolist(), diff.new_cents.tolist())
+                )
+
+        def progress(scanned, changed, elapsed):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {scanned} scanned, {changed} changed ({scanned / elapsed:.0f} products/s)")
+
+        try:
+            scanned, changed, elapsed = reprice(
+                rounding=options['rounding'],
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+                on_diff=on_diff,
+                progress=progress,
+            )
+        finally:
+            if diff_file:
+                diff_file.close()
+
+        action = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} product(s), {action} {changed} in {elapsed:.1f}s"
+        ))
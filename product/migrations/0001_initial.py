@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:53
+
+import django.db.models.deletion
+import product.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('sku', models.CharField(max_length=64, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.ImageField(height_field='height', upload_to=product.models.product_image_path, width_field='width')),
+                ('content_hash', models.CharField(db_index=True, editable=False, max_length=64)),
+                ('width', models.PositiveIntegerField(editable=False, null=True)),
+                ('height', models.PositiveIntegerField(editable=False, null=True)),
+                ('alt_text', models.CharField(blank=True, max_length=255)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('variants', models.JSONField(blank=True, default=dict, editable=False)),
+                ('processed_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='product.product')),
+            ],
+            options={
+                'ordering': ['product', 'position', 'id'],
+            },
+        ),
+    ]
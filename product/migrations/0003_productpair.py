@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0002_product_category_product_sale_price_pricerule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product')),
+                ('related', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', '-count'], name='product_pair_top')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'related'), name='product_pair_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0003_productpair'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='product.product')),
+                ('views', models.BigIntegerField(default=0)),
+                ('popularity', models.FloatField(default=0)),
+                ('last_viewed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'product stats',
+                'indexes': [models.Index(fields=['-popularity'], name='product_stats_popularity_idx'), models.Index(fields=['-views'], name='product_stats_views_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:07
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_epoch(apps, schema_editor):
+    """Existing scores were weighted from the fixed epoch product.counters used before"""
+    PopularityEpoch = apps.get_model('product', 'PopularityEpoch')
+    PopularityEpoch.objects.create(
+        pk=1, epoch=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        half_life_hours=settings.PRODUCT_POPULARITY_HALF_LIFE_HOURS,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_productstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField()),
+                ('half_life_hours', models.FloatField()),
+            ],
+        ),
+        migrations.RunPython(create_epoch, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,167 @@
+import os
+
 from django.db import models
 
-# Create your models here.
+
+class Product(models.Model):
+    """
+    Catalog product
+    """
+    name = models.CharField(max_length=255)
+    sku = models.CharField(max_length=64, unique=True)
+    description = models.TextField(blank=True)
+    category = models.ForeignKey(
+        'category.Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='products',
+    )
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Promotional price written by product.pricing; None means the list price applies
+    sale_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.sku})"
+
+    @property
+    def current_price(self):
+        return self.sale_price if self.sale_price is not None else self.price
+
+
+class PriceRule(models.Model):
+    """
+    Promotion rule applied across the catalog by `python manage.py reprice_products`.
+
+    Active rules are applied in priority order (lowest first) and stack.
+    A rule without a category applies to every product.
+    """
+    PERCENT = 'percent'
+    FIXED = 'fixed'
+    KIND_CHOICES = [
+        (PERCENT, 'Percentage off'),
+        (FIXED, 'Fixed amount off'),
+    ]
+
+    name = models.CharField(max_length=255)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Percent (e.g. 15.00) or currency amount, depending on kind
+    value = models.DecimalField(max_digits=10, decimal_places=2)
+    category = models.ForeignKey(
+        'category.Category', on_delete=models.CASCADE, null=True, blank=True, related_name='price_rules',
+    )
+    # The rule never takes a price below this
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    priority = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['priority', 'id']
+
+    def __str__(self):
+        return self.name
+
+
+class ProductStats(models.Model):
+    """
+    View counters for a product, written in batches by product.counters.
+
+    `popularity` is a forward-decayed score: each view adds a weight that
+    doubles every PRODUCT_POPULARITY_HALF_LIFE_HOURS after PopularityEpoch,
+    so ordering by it ranks recent views above old ones without rewriting
+    old rows (until the epoch is moved forward).
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    views = models.BigIntegerField(default=0)
+    popularity = models.FloatField(default=0)
+    last_viewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'product stats'
+        indexes = [
+            models.Index(fields=['-popularity'], name='product_stats_popularity_idx'),
+            models.Index(fields=['-views'], name='product_stats_views_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.views} views"
+
+
+class PopularityEpoch(models.Model):
+    """
+    Single row holding the time and half-life ProductStats.popularity is scaled to.
+    Moved forward by product.counters.rebase_popularity.
+    """
+    epoch = models.DateTimeField()
+    half_life_hours = models.FloatField()
+
+    def __str__(self):
+        return f"{self.epoch.isoformat()} (half-life {self.half_life_hours:g} h)"
+
+
+def product_image_path(instance, filename):
+    """Content-addressed path, so identical uploads share one file"""
+    ext = os.path.splitext(filename)[1].lower()
+    return f"products/originals/{instance.content_hash[:2]}/{instance.content_hash}{ext}"
+
+
+class ProductImage(models.Model):
+    """
+    Product photo plus the resized JPEG/WebP variants generated from it.
+
+    `variants` maps a size name from settings.PRODUCT_IMAGE_SIZES to
+    {'width', 'height', 'jpeg', 'webp'} with storage-relative paths; it is
+    filled in by product.images after upload or by the backfill command.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
+    image = models.ImageField(upload_to=product_image_path, width_field='width', height_field='height')
+    content_hash = models.CharField(max_length=64, db_index=True, editable=False)
+    width = models.PositiveIntegerField(null=True, editable=False)
+    height = models.PositiveIntegerField(null=True, editable=False)
+    alt_text = models.CharField(max_length=255, blank=True)
+    position = models.PositiveIntegerField(default=0)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    processed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['product', 'position', 'id']
+
+    def __str__(self):
+        return f"Image {self.position} of {self.product_id}"
+
+    def save(self, *args, **kwargs):
+        from .images import store_original
+        is_upload = bool(self.image) and not self.image._committed
+        if is_upload:
+            store_original(self)
+        super().save(*args, **kwargs)
+        if is_upload:
+            from .images import schedule_variants
+            schedule_variants(self)
+
+
+class ProductPair(models.Model):
+    """
+    One cell of the item-item co-occurrence matrix: how many orders contained both products.
+
+    Stored in both directions so each product's row is a single index range
+    scan. Maintained by product.recommendations.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', db_index=False)
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', db_index=False)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related'], name='product_pair_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-count'], name='product_pair_top'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.related_id}: {self.count}"
@@ -0,0 +1,259 @@
+"""
+"Frequently bought together" recommendations from order co-occurrence.
+
+The sparse item-item matrix lives in ProductPair (rebuilt in full from
+order lines, or incremented as orders are placed). Top-K related products
+per item are exported to a flat, memory-mapped .npy table so a lookup is
+a binary search plus a K-element slice, with no queries or computation.
+Placed orders re-export the table at most every
+RECOMMENDATIONS_EXPORT_INTERVAL seconds; until a table exists, lookups
+read ProductPair directly.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from array import array
+from itertools import combinations, groupby, islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from order.models import Order, OrderItem
+from .models import ProductPair
+
+logger = logging.getLogger(__name__)
+
+# Pair keys pack (product, related) into one int64 for vectorized counting
+KEY_SHIFT = 32
+KEY_MASK = (1 << KEY_SHIFT) - 1
+
+
+def basket_pairs(product_ids):
+    """Unordered product pairs in a basket, or none for oversized baskets"""
+    ids = sorted({pk for pk in product_ids if pk is not None})
+    if len(ids) > settings.RECOMMENDATIONS_MAX_BASKET:
+        return []
+    return combinations(ids, 2)
+
+
+def merge_counts(keys, counts, new_keys):
+    """Add occurrences of new_keys to the sorted (keys, counts) totals"""
+    new_keys, new_counts = np.unique(np.asarray(new_keys, dtype=np.int64), return_counts=True)
+    merged, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate([counts, new_counts]), minlength=len(merged))
+    return merged, totals.astype(np.int64)
+
+
+def count_pairs(chunk_size=10000, buffer_size=1_000_000):
+    """
+    Stream order lines grouped by order and count co-occurring pairs.
+
+    Memory is bounded by the number of distinct pairs plus a buffer of
+    `buffer_size` pair keys. Returns sorted (keys, counts) arrays.
+    """
+    lines = (
+        OrderItem.objects.exclude(order__status=Order.CANCELLED)
+        .filter(product__isnull=False)
+        .order_by('order_id')
+        .values_list('order_id', 'product_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    keys = np.empty(0, dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    buffer = array('q')
+    for _, basket in groupby(lines, key=lambda line: line[0]):
+        buffer.extend(a << KEY_SHIFT | b for a, b in basket_pairs(line[1] for line in basket))
+        if len(buffer) >= buffer_size:
+            keys, counts = merge_counts(keys, counts, buffer)
+            buffer = array('q')
+    if buffer:
+        keys, counts = merge_counts(keys, counts, buffer)
+    return keys, counts
+
+
+def rebuild_pairs(batch_size=5000, **kwargs):
+    """Recount the whole co-occurrence matrix from order lines and replace ProductPair"""
+    started = time.perf_counter()
+    keys, counts = count_pairs(**kwargs)
+    products, related = keys >> KEY_SHIFT, keys & KEY_MASK
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(ProductPair._meta.get_field(name).column) for name in ('product', 'related', 'count'))
+    insert = f"INSERT INTO {quote(ProductPair._meta.db_table)} ({columns}) VALUES (%s, %s, %s)"
+    with transaction.atomic(), connection.cursor() as cursor:
+        ProductPair.objects.all().delete()
+        for start in range(0, len(keys), batch_size):
+            batch = list(zip(
+                products[start:start + batch_size].tolist(),
+                related[start:start + batch_size].tolist(),
+                counts[start:start + batch_size].tolist(),
+            ))
+            # Plain executemany: no model instances for what can be millions of rows
+            cursor.executemany(insert, batch + [(b, a, count) for a, b, count in batch])
+    logger.info(f"Rebuilt {len(keys)} product pairs in {time.perf_counter() - started:.1f}s")
+    return len(keys)
+
+
+def record_order(order_id, batch_size=200):
+    """Increment the matrix for one newly placed order"""
+    product_ids = OrderItem.objects.filter(order_id=order_id).values_list('product_id', flat=True)
+    pairs = [cell for a, b in basket_pairs(product_ids) for cell in ((a, b), (b, a))]
+    # All batches commit together: a failure part-way rolls back every increment,
+    # so the retried task counts the order exactly once
+    with transaction.atomic():
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            # Create missing cells at zero, then increment all of them in one UPDATE
+            ProductPair.objects.bulk_create(
+                [ProductPair(product_id=a, related_id=b) for a, b in batch], ignore_conflicts=True,
+            )
+            condition = Q()
+            for a, b in batch:
+                condition |= Q(product_id=a, related_id=b)
+            ProductPair.objects.filter(condition).update(count=F('count') + 1)
+
+    if pairs:
+        # The increments are committed at this point; a failed export must not
+        # fail the task, or its retry would count the order twice
+        try:
+            export_if_due()
+        except Exception as e:
+            logger.error(f"Could not export recommendations after order {order_id}: {str(e)}")
+
+
+def export_if_due(interval=None):
+    """Re-export the table if it is older than RECOMMENDATIONS_EXPORT_INTERVAL; returns True if exported"""
+    interval = settings.RECOMMENDATIONS_EXPORT_INTERVAL if interval is None else interval
+    try:
+        age = time.time() - os.stat(settings.RECOMMENDATIONS_FILE).st_mtime
+    except FileNotFoundError:
+        age = None
+    if age is not None and age < interval:
+        return False
+    # One export per interval across the processes sharing the cache
+    if interval and not cache.add('recommendations:export', True, interval):
+        return False
+    export_table()
+    return True
+
+
+def related_ids_from_pairs(product_id, limit=None):
+    """Same ranking as the exported table, read straight from ProductPair (one indexed query)"""
+    k = min(limit or settings.RECOMMENDATIONS_TOP_K, settings.RECOMMENDATIONS_TOP_K)
+    return list(
+        ProductPair.objects.filter(product_id=product_id, count__gt=0)
+        .order_by('-count', 'related_id')
+        .values_list('related_id', flat=True)[:k]
+    )
+
+
+def export_table(path=None, k=None, chunk_size=10000):
+    """
+    Write the top-K related products per product to a memory-mappable file.
+
+    Layout of the flat .npy array: [n, K, keys (n, sorted), related (n*K, 0-padded)].
+    The file is replaced atomically, so readers never see a partial table.
+    """
+    path = path or settings.RECOMMENDATIONS_FILE
+    k = k or settings.RECOMMENDATIONS_TOP_K
+    started = time.perf_counter()
+
+    cells = (
+        ProductPair.objects.order_by('product_id', '-count', 'related_id')
+        .values_list('product_id', 'related_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    keys = array('q')
+    related = array('q')
+    for product_id, row in groupby(cells, key=lambda cell: cell[0]):
+        top = [related_id for _, related_id in islice(row, k)]
+        keys.append(product_id)
+        related.extend(top + [0] * (k - len(top)))
+
+    n = len(keys)
+    largest = max(max(keys, default=0), max(related, default=0), n, k)
+    dtype = np.int32 if largest < 2 ** 31 else np.int64
+    table = np.empty(2 + n + n * k, dtype=dtype)
+    table[0], table[1] = n, k
+    table[2:2 + n] = keys
+    table[2 + n:] = related
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # A unique temporary name in the same directory: concurrent exports from other
+    # threads or processes never write to the same file, and the rename stays atomic
+    tmp = tempfile.NamedTemporaryFile(dir=directory, prefix=f"{os.path.basename(path)}.", suffix='.tmp', delete=False)
+    try:
+        with tmp:
+            np.save(tmp, table)
+        # NamedTemporaryFile creates the file private to its owner
+        os.chmod(tmp.name, 0o644)
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    logger.info(
+        f"Exported top-{k} recommendations for {n} products to {path} "
+        f"({table.nbytes / 1024:.0f} KiB) in {time.perf_counter() - started:.1f}s"
+    )
+    return n
+
+
+class RecommendationTable:
+    """
+    Read side of the exported table, memory-mapped and shared across requests.
+
+    The file's mtime is checked at most every `check_interval` seconds and
+    the table is re-mapped when a new export has replaced it.
+    """
+
+    def __init__(self, path=None, check_interval=30):
+        self._path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._mtime = None
+        self._keys = None
+        self._related = None
+
+    @property
+    def path(self):
+        return self._path or settings.RECOMMENDATIONS_FILE
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                self._mtime = self._keys = self._related = None
+                return
+            if mtime == self._mtime:
+                return
+            table = np.load(self.path, mmap_mode='r')
+            n, k = int(table[0]), int(table[1])
+            self._keys = table[2:2 + n]
+            self._related = table[2 + n:].reshape(n, k)
+            self._mtime = mtime
+            logger.info(f"Loaded recommendation table for {n} products from {self.path}")
+
+    def related_ids(self, product_id, limit=None):
+        """Ids of products most often bought with product_id, best first; None if there is no table"""
+        self._maybe_reload()
+        keys, related = self._keys, self._related
+        if keys is None:
+            return None
+        i = int(np.searchsorted(keys, product_id))
+        if i == len(keys) or keys[i] != product_id:
+            return []
+        return [pk for pk in related[i, :limit].tolist() if pk]
+
+
+recommendation_table = RecommendationTable()
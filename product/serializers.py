@@ -0,0 +1,51 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from .models import Product, ProductImage
+
+
+class ProductImageSerializer(serializers.ModelSerializer):
+    """
+    Product image with its resized variants.
+
+    `src` is the variant named by the `image_size` serializer context
+    (default 'medium'), as WebP when the request's Accept header allows it.
+    """
+    url = serializers.SerializerMethodField()
+    src = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductImage
+        fields = ['id', 'url', 'src', 'width', 'height', 'alt_text', 'position', 'variants']
+
+    def get_url(self, obj):
+        return obj.image.url
+
+    def get_variants(self, obj):
+        return {
+            name: {
+                'width': entry['width'],
+                'height': entry['height'],
+                'jpeg': default_storage.url(entry['jpeg']),
+                'webp': default_storage.url(entry['webp']),
+            }
+            for name, entry in (obj.variants or {}).items()
+        }
+
+    def get_src(self, obj):
+        variants = obj.variants or {}
+        entry = variants.get(self.context.get('image_size', 'medium'))
+        if entry is None:
+            return obj.image.url
+        request = self.context.get('request')
+        accepts_webp = request is not None and 'image/webp' in request.META.get('HTTP_ACCEPT', '')
+        return default_storage.url(entry['webp' if accepts_webp else 'jpeg'])
+
+
+class ProductSerializer(serializers.ModelSerializer):
+    images = ProductImageSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'sku', 'description', 'price', 'is_active', 'images']
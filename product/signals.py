@@ -0,0 +1,14 @@
+"""
+Keep recommendations up to date as orders are placed
+"""
+from django.dispatch import receiver
+
+from ecommerce import tasks
+from order.signals import order_placed
+
+
+@receiver(order_placed)
+def record_order_for_recommendations(sender, order, **kwargs):
+    from .recommendations import record_order
+
+    tasks.dispatch_on_commit(record_order, order.pk)
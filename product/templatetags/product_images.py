@@ -0,0 +1,38 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def variant_srcset(variants, fmt):
+    return ', '.join(
+        f"{default_storage.url(entry[fmt])} {entry['width']}w"
+        for entry in sorted(variants.values(), key=lambda entry: entry['width'])
+    )
+
+
+@register.simple_tag
+def product_picture(image, size='medium', sizes='100vw', css_class=''):
+    """
+    Render a <picture> for a ProductImage: WebP srcset with a JPEG fallback.
+
+    `size` picks the default <img> variant; browsers choose from the full
+    srcset using `sizes`. Falls back to the original until variants exist.
+    """
+    variants = image.variants or {}
+    if not variants:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">', image.image.url, image.alt_text, css_class,
+        )
+
+    default = variants.get(size) or max(variants.values(), key=lambda entry: entry['width'])
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="lazy">'
+        '</picture>',
+        variant_srcset(variants, 'webp'), sizes,
+        default_storage.url(default['jpeg']), variant_srcset(variants, 'jpeg'), sizes,
+        default['width'], default['height'], image.alt_text, css_class,
+    )
@@ -1,3 +1,376 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from category.models import Category
+from order.models import Order, OrderItem
+from .checks import check_popularity_half_life
+from .counters import REBASE_AFTER_HALF_LIVES, current_epoch, decayed_popularity, half_life_hours, write_views
+from .images import UploadPool, generate_variants, upload_pool
+from .models import PriceRule, Product, ProductImage, ProductPair, ProductStats
+from .pricing import ROUND_NICKEL, ROUND_NINETY_NINE, CompiledRule, apply_rules, category_descendants
+from .recommendations import RecommendationTable, export_if_due, export_table, record_order
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='buyer@example.com', username='buyer', phone_number='+15550007777', password='x',
+        )
+        cls.products = [
+            Product.objects.create(name=f'Product {n}', sku=f'SKU-{n}', price=Decimal('10.00'))
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'recommendations.npy')
+        settings_override = override_settings(RECOMMENDATIONS_FILE=self.path, RECOMMENDATIONS_EXPORT_INTERVAL=300)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.delete('recommendations:export')
+
+    def place_order(self, *products):
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, product_name=product.name, sku=product.sku, unit_price=product.price)
+            for product in products
+        ])
+        return order
+
+    def test_placed_orders_reach_the_exported_table(self):
+        a, b, c = self.products
+        record_order(self.place_order(a, b).pk)
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(RecommendationTable(path=self.path).related_ids(a.pk), [b.pk])
+
+        # Within the interval the counts are updated but the table is not rewritten
+        record_order(self.place_order(a, c).pk)
+        self.assertEqual(ProductPair.objects.get(product=a, related=c).count, 1)
+        self.assertEqual(RecommendationTable(path=self.path).related_ids(a.pk), [b.pk])
+
+        # The next export after the interval picks up the new pair
+        cache.delete('recommendations:export')
+        self.assertTrue(export_if_due(interval=0))
+        self.assertEqual(RecommendationTable(path=self.path).related_ids(a.pk), [b.pk, c.pk])
+
+    def test_export_failure_does_not_fail_the_order_task(self):
+        a, b, _ = self.products
+        with mock.patch('product.recommendations.export_table', side_effect=OSError('disk full')):
+            record_order(self.place_order(a, b).pk)
+        self.assertEqual(ProductPair.objects.get(product=a, related=b).count, 1)
+
+    def test_failed_batch_rolls_back_the_whole_order(self):
+        order = self.place_order(*self.products)
+        bulk_create = ProductPair.objects.bulk_create
+        calls = []
+
+        def fail_second_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OSError('connection lost')
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(ProductPair.objects, 'bulk_create', side_effect=fail_second_batch), \
+                self.assertRaises(OSError):
+            record_order(order.pk, batch_size=4)
+        self.assertFalse(ProductPair.objects.exists())
+
+        # The retried task counts the order once
+        record_order(order.pk, batch_size=4)
+        self.assertEqual(set(ProductPair.objects.values_list('count', flat=True)), {1})
+        self.assertEqual(ProductPair.objects.count(), 6)
+
+    def test_failed_export_leaves_the_previous_table_and_no_temporary_files(self):
+        a, b, _ = self.products
+        record_order(self.place_order(a, b).pk)
+        with open(self.path, 'rb') as file:
+            exported = file.read()
+
+        with mock.patch('product.recommendations.np.save', side_effect=OSError('disk full')), \
+                self.assertRaises(OSError):
+            export_table(self.path)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['recommendations.npy'])
+        with open(self.path, 'rb') as file:
+            self.assertEqual(file.read(), exported)
+
+    def test_related_view_reads_pairs_without_a_table(self):
+        a, b, c = self.products
+        ProductPair.objects.bulk_create([
+            ProductPair(product=a, related=b, count=1),
+            ProductPair(product=a, related=c, count=3),
+        ])
+        with mock.patch('product.views.recommendation_table', RecommendationTable(path=self.path)):
+            response = APIClient().get(reverse('product-related', args=[a.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()], [c.pk, b.pk])
+
+
+@override_settings(PRODUCT_POPULARITY_HALF_LIFE_HOURS=72)
+class PopularityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.old, cls.new = [
+            Product.objects.create(name=f'Product {n}', sku=f'POP-{n}', price=Decimal('10.00')) for n in range(2)
+        ]
+
+    def setUp(self):
+        epoch = current_epoch()
+        epoch.epoch, epoch.half_life_hours = datetime(2026, 1, 1, tzinfo=dt_timezone.utc), 72
+        epoch.save()
+
+    def decayed(self, product, now):
+        return decayed_popularity(ProductStats.objects.get(product=product), now)
+
+    def test_scores_are_rebased_before_weights_overflow(self):
+        start = current_epoch().epoch
+        write_views({self.old.pk: 100}, now=start)
+        # 3000 half-lives on, 2 ** 3000 would overflow a float
+        later = start + timedelta(hours=72 * 3000)
+        write_views({self.new.pk: 1}, now=later)
+
+        self.assertEqual(current_epoch().epoch, later)
+        self.assertEqual(self.decayed(self.new, later), 1)
+        self.assertLess(self.decayed(self.old, later), self.decayed(self.new, later))
+
+    def test_rebase_keeps_decayed_scores(self):
+        start = current_epoch().epoch
+        write_views({self.old.pk: 64}, now=start)
+        write_views({self.new.pk: 1}, now=start + timedelta(hours=72 * 3))
+        self.assertAlmostEqual(self.decayed(self.old, start + timedelta(hours=72 * 6)), 1)
+
+        later = start + timedelta(hours=72 * (REBASE_AFTER_HALF_LIVES + 1))
+        before = self.decayed(self.old, later), self.decayed(self.new, later)
+        write_views({}, now=later)
+        self.assertEqual(current_epoch().epoch, later)
+        after = self.decayed(self.old, later), self.decayed(self.new, later)
+        for expected, actual in zip(before, after):
+            self.assertAlmostEqual(expected / actual, 1)
+
+    def test_half_life_change_rebases(self):
+        start = current_epoch().epoch
+        write_views({self.old.pk: 8}, now=start)
+        later = start + timedelta(hours=72)
+        with self.settings(PRODUCT_POPULARITY_HALF_LIFE_HOURS=24):
+            write_views({}, now=later)
+            self.assertEqual(current_epoch().half_life_hours, 24)
+            self.assertAlmostEqual(self.decayed(self.old, later), 4)
+            self.assertAlmostEqual(self.decayed(self.old, later + timedelta(hours=24)), 2)
+
+    def test_half_life_is_validated(self):
+        for value in (0, -1, float('inf'), float('nan')):
+            with self.settings(PRODUCT_POPULARITY_HALF_LIFE_HOURS=value):
+                with self.assertRaises(ImproperlyConfigured):
+                    half_life_hours()
+                self.assertEqual([error.id for error in check_popularity_half_life(None)], ['product.E001'])
+
+
+def image_upload(color='red', size=(800, 600), name='photo.png'):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(PRODUCT_IMAGE_SIZES={'thumb': 100, 'large': 400}, BACKGROUND_TASKS_EAGER=True)
+class ProductImageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Camera', sku='IMG-1', price=Decimal('10.00'))
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = directory.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Resize in the test process; UploadPool is tested on its own
+        patcher = mock.patch.object(upload_pool, 'processes', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = ProductImage.objects.create(product=self.product, image=image_upload(**kwargs), alt_text='Camera')
+        image.refresh_from_db()
+        return image
+
+    def test_upload_generates_content_addressed_variants(self):
+        image = self.upload()
+        self.assertTrue(image.image.name.startswith(f'products/originals/{image.content_hash[:2]}/'))
+        self.assertIsNotNone(image.processed_at)
+        self.assertEqual(
+            {name: (entry['width'], entry['height']) for name, entry in image.variants.items()},
+            {'thumb': (100, 75), 'large': (400, 300)},
+        )
+        for entry in image.variants.values():
+            for fmt in ('jpeg', 'webp'):
+                self.assertTrue(os.path.exists(os.path.join(self.media_root, entry[fmt])))
+
+        # The same content is stored once and reuses the variants without resizing again
+        with mock.patch('product.images.generate_variants') as generate:
+            duplicate = self.upload(name='copy.png')
+        generate.assert_not_called()
+        self.assertEqual((duplicate.image.name, duplicate.variants), (image.image.name, image.variants))
+
+    def test_existing_variants_are_kept_unless_forced(self):
+        image = self.upload()
+        path = os.path.join(self.media_root, image.variants['thumb']['jpeg'])
+        with open(path, 'wb') as file:
+            file.write(b'corrupt')
+
+        sizes = {'thumb': 100, 'large': 400}
+        generate_variants(image.image.path, self.media_root, image.content_hash, sizes)
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(), b'corrupt')
+
+        generate_variants(image.image.path, self.media_root, image.content_hash, sizes, force=True)
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(3), b'\xff\xd8\xff')
+
+    def test_command_processes_pending_images_and_rewrites_with_force(self):
+        with mock.patch('product.images.schedule_variants'):
+            image = ProductImage.objects.create(product=self.product, image=image_upload())
+        out = io.StringIO()
+        call_command('generate_product_images', '--workers=1', stdout=out)
+        self.assertIn('Processed 1 distinct image(s), 0 failed', out.getvalue())
+        image.refresh_from_db()
+        self.assertEqual(set(image.variants), {'thumb', 'large'})
+
+        path = os.path.join(self.media_root, image.variants['large']['webp'])
+        with open(path, 'wb') as file:
+            file.write(b'stale')
+        # Already processed: skipped without --all, regenerated in place with --force
+        call_command('generate_product_images', '--workers=1', stdout=out)
+        self.assertIn('Processed 0 distinct image(s)', out.getvalue())
+        call_command('generate_product_images', '--workers=1', '--force', stdout=out)
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(4), b'RIFF')
+
+    def test_template_tag_renders_webp_srcset_with_jpeg_fallback(self):
+        template = Template('{% load product_images %}{% product_picture image size="thumb" sizes="50vw" %}')
+        with mock.patch('product.images.schedule_variants'):
+            pending = ProductImage.objects.create(product=self.product, image=image_upload(), alt_text='Camera')
+        self.assertHTMLEqual(
+            template.render(Context({'image': pending})),
+            f'<img src="{pending.image.url}" alt="Camera" class="" loading="lazy">',
+        )
+
+        image = self.upload(color='blue')
+        thumb, large = image.variants['thumb'], image.variants['large']
+        self.assertHTMLEqual(
+            template.render(Context({'image': image})),
+            '<picture>'
+            f'<source type="image/webp" srcset="/media/{thumb["webp"]} 100w, /media/{large["webp"]} 400w" sizes="50vw">'
+            f'<img src="/media/{thumb["jpeg"]}" srcset="/media/{thumb["jpeg"]} 100w, /media/{large["jpeg"]} 400w" '
+            'sizes="50vw" width="100" height="75" alt="Camera" class="" loading="lazy">'
+            '</picture>',
+        )
+
+    def test_upload_pool_resizes_in_another_process(self):
+        pool = UploadPool(1)
+        self.addCleanup(pool.shutdown)
+        self.assertNotEqual(pool.run(os.getpid), os.getpid())
+        self.assertEqual(UploadPool(0).run(os.getpid), os.getpid())
+
+
+class PricingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = Category.objects.create(name='Cameras', slug='cameras')
+        cls.child = Category.objects.create(name='Lenses', slug='lenses', parent=cls.parent)
+        cls.other = Category.objects.create(name='Books', slug='books')
+
+    def cents(self, *values):
+        return np.array(values, dtype=np.int64)
+
+    def rule(self, kind, amount, category_ids=None, floor=None):
+        if category_ids is not None:
+            category_ids = self.cents(*category_ids)
+        return CompiledRule('rule', kind, amount, category_ids, floor)
+
+    def test_category_descendants_survives_cycles(self):
+        self.assertEqual(set(category_descendants()[self.parent.pk]), {self.parent.pk, self.child.pk})
+        # The admin can save a parent cycle; walking it must terminate
+        Category.objects.filter(pk=self.parent.pk).update(parent=self.child)
+        descendants = category_descendants()
+        self.assertEqual(sorted(descendants[self.parent.pk]), sorted([self.parent.pk, self.child.pk]))
+        self.assertEqual(sorted(descendants[self.child.pk]), sorted([self.parent.pk, self.child.pk]))
+
+    def test_rules_stack_in_order_and_respect_categories(self):
+        price = self.cents(1000, 2000, 999)
+        categories = self.cents(1, 2, 0)
+        rules = [
+            self.rule(PriceRule.PERCENT, 1000),                        # 10% off everything
+            self.rule(PriceRule.FIXED, 300, category_ids=[1]),         # then 3.00 off category 1
+        ]
+        self.assertEqual(apply_rules(price, categories, rules).tolist(), [600, 1800, 899])
+        # Percentages round half up to the cent, and prices never go below zero
+        percent = [self.rule(PriceRule.PERCENT, 1000)]
+        self.assertEqual(apply_rules(self.cents(5, 100), self.cents(0, 0), percent).tolist(), [5, 90])
+        fixed = [self.rule(PriceRule.FIXED, 500)]
+        self.assertEqual(apply_rules(self.cents(100), self.cents(0), fixed).tolist(), [0])
+
+    def test_floors_limit_discounts_but_never_raise_prices(self):
+        price = self.cents(1000, 500)
+        categories = self.cents(1, 1)
+        rules = [self.rule(PriceRule.FIXED, 300, floor=800)]
+        self.assertEqual(apply_rules(price, categories, rules).tolist(), [800, 500])
+
+    def test_rounding_goes_down_but_not_below_floors(self):
+        price = self.cents(1234, 50, 1000)
+        categories = self.cents(0, 0, 0)
+        self.assertEqual(apply_rules(price, categories, [], ROUND_NICKEL).tolist(), [1230, 50, 1000])
+        self.assertEqual(apply_rules(price, categories, [], ROUND_NINETY_NINE).tolist(), [1199, 50, 999])
+
+        rules = [self.rule(PriceRule.PERCENT, 1000, floor=950)]
+        self.assertEqual(apply_rules(price, categories, rules, ROUND_NINETY_NINE).tolist(), [1099, 50, 950])
+
+    def test_reprice_command_writes_sale_prices_and_diff(self):
+        camera = Product.objects.create(name='Camera', sku='P-1', price=Decimal('100.00'), category=self.parent)
+        lens = Product.objects.create(name='Lens', sku='P-2', price=Decimal('40.00'), category=self.child)
+        book = Product.objects.create(name='Book', sku='P-3', price=Decimal('20.00'), category=self.other,
+                                      sale_price=Decimal('15.00'))
+        PriceRule.objects.create(name='Camera week', kind=PriceRule.PERCENT, value=Decimal('25.00'), category=self.parent)
+        PriceRule.objects.create(name='Expired', kind=PriceRule.FIXED, value=Decimal('5.00'),
+                                 ends_at=datetime(2020, 1, 1, tzinfo=dt_timezone.utc))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'diff.csv')
+            out = io.StringIO()
+            call_command('reprice_products', '--dry-run', f'--diff-file={path}', '--chunk-size=2', stdout=out)
+            self.assertIn('Scanned 3 product(s), would change 3', out.getvalue())
+            self.assertFalse(Product.objects.filter(pk=camera.pk, sale_price__isnull=False).exists())
+            with open(path) as file:
+                self.assertEqual(file.read().splitlines(), [
+                    'product_id,old_sale_price,new_sale_price',
+                    f'{camera.pk},,75.00',
+                    f'{lens.pk},,30.00',
+                    f'{book.pk},15.00,',
+                ])
+
+        call_command('reprice_products', stdout=out)
+        self.assertEqual(
+            list(Product.objects.order_by('pk').values_list('sale_price', flat=True)),
+            [Decimal('75.00'), Decimal('30.00'), None],
+        )
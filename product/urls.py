@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('trending/', views.TopProductsView.as_view(kind='trending'), name='product-trending'),
+    path('most-viewed/', views.TopProductsView.as_view(kind='most_viewed'), name='product-most-viewed'),
+    path('<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
+    path('<int:pk>/related/', views.RelatedProductsView.as_view(), name='product-related'),
+]
@@ -1,3 +1,60 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from .counters import record_view, top_product_ids
+from .models import Product
+from .recommendations import recommendation_table, related_ids_from_pairs
+from .serializers import ProductSerializer
+
+
+class ProductDetailView(APIView):
+    """
+    A single active product; counts as a view for popularity ranking
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        product = get_object_or_404(Product.objects.prefetch_related('images'), pk=pk, is_active=True)
+        record_view(product.pk)
+        return Response(ProductSerializer(product, context={'request': request}).data)
+
+
+class TopProductsView(APIView):
+    """
+    Top products by `kind` (see product.counters.TOP_ORDERINGS), at most PRODUCT_TOP_SIZE
+    """
+    permission_classes = [permissions.AllowAny]
+    kind = None
+
+    def get(self, request):
+        limit = request.query_params.get('limit')
+        try:
+            limit = min(int(limit), settings.PRODUCT_TOP_SIZE) if limit else settings.PRODUCT_TOP_SIZE
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer'})
+
+        ids = top_product_ids(self.kind)[:max(limit, 0)]
+        products = Product.objects.filter(pk__in=ids, is_active=True).prefetch_related('images').in_bulk()
+        ranked = [products[pk] for pk in ids if pk in products]
+        return Response(ProductSerializer(ranked, many=True, context={'request': request}).data)
+
+
+class RelatedProductsView(APIView):
+    """
+    Products frequently bought together with the given product
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        ids = recommendation_table.related_ids(pk)
+        if ids is None:
+            # No exported table yet (fresh deploy or failed export)
+            ids = related_ids_from_pairs(pk)
+        products = Product.objects.filter(pk__in=ids, is_active=True).prefetch_related('images').in_bulk()
+        # Keep the table's ranking
+        ranked = [products[pk] for pk in ids if pk in products]
+        return Response(ProductSerializer(ranked, many=True, context={'request': request}).data)
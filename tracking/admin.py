@@ -1,3 +1,43 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from .models import Carrier, Shipment, ShippingRate, ShippingZone
+from .rates import sync_rates
+
+
+@admin.register(Carrier)
+class CarrierAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'currency', 'is_active', 'rates_synced_at')
+    list_filter = ('is_active',)
+    readonly_fields = ('rates_synced_at',)
+    actions = ['sync_rate_cards']
+
+    @admin.action(description='Sync rate cards from the carriers')
+    def sync_rate_cards(self, request, queryset):
+        for carrier in queryset:
+            try:
+                count = sync_rates(carrier)
+            except Exception as e:
+                self.message_user(request, f"{carrier}: {e}", messages.ERROR)
+            else:
+                self.message_user(request, f"{carrier}: {count} rates synced")
+
+
+@admin.register(ShippingZone)
+class ShippingZoneAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code', 'countries')
+    search_fields = ('name', 'code', 'countries')
+
+
+@admin.register(ShippingRate)
+class ShippingRateAdmin(admin.ModelAdmin):
+    list_display = ('carrier', 'zone', 'service', 'max_weight', 'price', 'transit_days')
+    list_filter = ('carrier', 'zone', 'service')
+    list_select_related = ('carrier', 'zone')
+
+
+@admin.register(Shipment)
+class ShipmentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'carrier', 'tracking_number', 'status', 'status_updated_at')
+    list_filter = ('status', 'carrier')
+    search_fields = ('tracking_number',)
+    raw_id_fields = ('order',)
@@ -0,0 +1,51 @@
+"""
+Carrier rate card backends.
+
+A backend fetches a carrier's full rate card; tracking.rates.sync_rates
+stores it in ShippingRate, so quotes never call the carrier at request
+time. Backends are configured per carrier code in SHIPPING_CARRIER_BACKENDS.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class CarrierBackend:
+    def __init__(self, carrier):
+        self.carrier = carrier
+
+    def fetch_rates(self, zones):
+        """Return (zone, service, max_weight, price, transit_days) tuples for the given zones"""
+        raise NotImplementedError
+
+
+class StubCarrier(CarrierBackend):
+    """
+    Deterministic local rate card for development and offline testing.
+
+    Prices rise with the weight band and with the zone's position in
+    `zones`, so every zone and band gets a distinct, predictable price.
+    """
+    bands = [250, 500, 1000, 2000, 5000, 10000, 20000, 30000]
+    services = {
+        # service: (base price, per-band step, transit days)
+        'standard': (Decimal('4.99'), Decimal('1.50'), 5),
+        'express': (Decimal('12.99'), Decimal('3.00'), 2),
+    }
+
+    def fetch_rates(self, zones):
+        for zone_index, zone in enumerate(zones):
+            zone_factor = 1 + Decimal('0.25') * zone_index
+            for service, (base, step, transit_days) in self.services.items():
+                for band_index, max_weight in enumerate(self.bands):
+                    price = ((base + step * band_index) * zone_factor).quantize(Decimal('0.01'))
+                    yield zone, service, max_weight, price, transit_days + zone_index
+
+
+def get_backend(carrier):
+    path = settings.SHIPPING_CARRIER_BACKENDS.get(carrier.code)
+    if path is None:
+        raise ImproperlyConfigured(f"No rate card backend configured for carrier '{carrier.code}'")
+    return import_string(path)(carrier)
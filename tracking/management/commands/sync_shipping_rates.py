@@ -0,0 +1,27 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from tracking.models import Carrier
+from tracking.rates import sync_rates
+
+
+class Command(BaseCommand):
+    help = "Replace stored shipping rates with the carriers' current rate cards"
+
+    def add_arguments(self, parser):
+        parser.add_argument('carriers', nargs='*', help='Carrier codes (default: all active carriers)')
+
+    def handle(self, *args, **options):
+        carriers = Carrier.objects.filter(is_active=True)
+        if options['carriers']:
+            carriers = Carrier.objects.filter(code__in=options['carriers'])
+            missing = set(options['carriers']) - set(carriers.values_list('code', flat=True))
+            if missing:
+                raise CommandError(f"Unknown carriers: {', '.join(sorted(missing))}")
+
+        for carrier in carriers:
+            try:
+                count = sync_rates(carrier)
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"{carrier.code}: {count} rates"))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Carrier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('is_active', models.BooleanField(default=True)),
+                ('rates_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShippingZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('countries', models.CharField(help_text='Comma-separated ISO 3166 alpha-2 codes, e.g. "US,CA"', max_length=1000)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShippingRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.CharField(default='standard', max_length=50)),
+                ('max_weight', models.PositiveIntegerField(help_text='Upper bound of the weight band, in grams')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('transit_days', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('carrier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='tracking.carrier')),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='tracking.shippingzone')),
+            ],
+            options={
+                'ordering': ['carrier', 'zone', 'service', 'max_weight'],
+                'constraints': [models.UniqueConstraint(fields=('carrier', 'zone', 'service', 'max_weight'), name='shipping_rate_band_unique')],
+            },
+        ),
+    ]
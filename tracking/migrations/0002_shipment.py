@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0003_order_order_user_history_idx'),
+        ('tracking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shipment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.CharField(blank=True, max_length=50)),
+                ('tracking_number', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_transit', 'In transit'), ('out_for_delivery', 'Out for delivery'), ('delivered', 'Delivered'), ('exception', 'Exception')], default='pending', max_length=20)),
+                ('status_updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('carrier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shipments', to='tracking.carrier')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shipments', to='order.order')),
+            ],
+            options={
+                'ordering': ['-status_updated_at'],
+                'indexes': [models.Index(fields=['order', '-status_updated_at', '-id'], name='shipment_order_latest_idx')],
+            },
+        ),
+    ]
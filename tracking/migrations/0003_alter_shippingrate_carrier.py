@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracking', '0002_shipment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shippingrate',
+            name='carrier',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='tracking.carrier'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0006_alter_order_user'),
+        ('tracking', '0003_alter_shippingrate_carrier'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shipment',
+            name='order',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shipments', to='order.order'),
+        ),
+    ]
@@ -1,3 +1,115 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Carrier(models.Model):
+    """
+    Shipping carrier. Its rate card is synced into ShippingRate by the
+    backend configured under `code` in SHIPPING_CARRIER_BACKENDS.
+    """
+    code = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    currency = models.CharField(max_length=3, default='USD')
+    is_active = models.BooleanField(default=True)
+    rates_synced_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class ShippingZone(models.Model):
+    """
+    Destination zone: a set of countries priced alike
+    """
+    code = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    countries = models.CharField(max_length=1000, help_text='Comma-separated ISO 3166 alpha-2 codes, e.g. "US,CA"')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['code']
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def country_codes(self):
+        return [code.strip().upper() for code in self.countries.split(',') if code.strip()]
+
+    def clean(self):
+        # A country in two zones would make its price depend on which zone wins
+        codes = set(self.country_codes)
+        overlaps = []
+        for zone in ShippingZone.objects.exclude(pk=self.pk).only('code', 'countries'):
+            overlaps.extend(f"{country} ({zone.code})" for country in sorted(codes.intersection(zone.country_codes)))
+        if overlaps:
+            raise ValidationError({'countries': f"Already in another zone: {', '.join(overlaps)}"})
+
+
+class ShippingRate(models.Model):
+    """
+    Price for parcels up to `max_weight` grams (and above the next lower
+    band of the same carrier, zone and service). Quoted from memory by
+    tracking.rates, never per request.
+    """
+    # No separate FK index: shipping_rate_band_unique starts with carrier
+    carrier = models.ForeignKey(Carrier, on_delete=models.CASCADE, related_name='rates', db_index=False)
+    zone = models.ForeignKey(ShippingZone, on_delete=models.CASCADE, related_name='rates')
+    service = models.CharField(max_length=50, default='standard')
+    max_weight = models.PositiveIntegerField(help_text='Upper bound of the weight band, in grams')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    transit_days = models.PositiveSmallIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['carrier', 'zone', 'service', 'max_weight']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['carrier', 'zone', 'service', 'max_weight'], name='shipping_rate_band_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.carrier_id}/{self.zone_id}/{self.service} <= {self.max_weight} g: {self.price}"
+
+
+class Shipment(models.Model):
+    """
+    Parcel sent for an order. `status` is the latest tracking status reported by the carrier.
+    """
+    PENDING = 'pending'
+    IN_TRANSIT = 'in_transit'
+    OUT_FOR_DELIVERY = 'out_for_delivery'
+    DELIVERED = 'delivered'
+    EXCEPTION = 'exception'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (IN_TRANSIT, 'In transit'),
+        (OUT_FOR_DELIVERY, 'Out for delivery'),
+        (DELIVERED, 'Delivered'),
+        (EXCEPTION, 'Exception'),
+    ]
+
+    # No separate FK index: shipment_order_latest_idx below starts with order
+    order = models.ForeignKey('order.Order', on_delete=models.CASCADE, related_name='shipments', db_index=False)
+    carrier = models.ForeignKey(Carrier, on_delete=models.SET_NULL, null=True, blank=True, related_name='shipments')
+    service = models.CharField(max_length=50, blank=True)
+    tracking_number = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    status_updated_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-status_updated_at']
+        indexes = [
+            # Latest status per order (order history)
+            models.Index(fields=['order', '-status_updated_at', '-id'], name='shipment_order_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tracking_number or self.pk} ({self.status})"
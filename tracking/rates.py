@@ -0,0 +1,173 @@
+"""
+In-memory shipping rate tables.
+
+Rates are grouped into lanes (zone, carrier, service), each holding its
+weight band upper bounds as a sorted array with prices alongside,
+so a quote is a dict lookup plus a bisect per lane. The table is rebuilt
+when rates, zones or carriers change: immediately in the process that
+saved them, and within `check_interval` seconds everywhere else.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from hashlib import blake2b
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .carriers import get_backend
+from .models import Carrier, ShippingRate, ShippingZone
+
+logger = logging.getLogger(__name__)
+
+Quote = namedtuple('Quote', 'carrier service price currency transit_days')
+
+
+class Lane:
+    __slots__ = ('carrier', 'currency', 'service', 'bounds', 'prices', 'transit_days')
+
+    def __init__(self, carrier, currency, service):
+        self.carrier = carrier
+        self.currency = currency
+        self.service = service
+        self.bounds = array('l')
+        self.prices = []
+        self.transit_days = []
+
+    def quote(self, weight):
+        """Quote for a parcel of `weight` grams, or None if it's heavier than every band"""
+        i = bisect_left(self.bounds, weight)
+        if i == len(self.bounds):
+            return None
+        return Quote(self.carrier, self.service, self.prices[i], self.currency, self.transit_days[i])
+
+
+class RateTable:
+    """
+    Compiled view of all active carriers' rates, shared by all requests in a process
+    """
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._version = None
+        self.version = ''
+        # (country -> zone id, zone id -> [Lane])
+        self._index = ({}, {})
+
+    def invalidate(self):
+        self._checked_at = None
+
+    def refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return
+            # The rate count catches deletions; updated_at catches edits
+            rates = ShippingRate.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+            version = (
+                rates['count'], rates['updated'],
+                ShippingZone.objects.aggregate(updated=Max('updated_at'))['updated'],
+                Carrier.objects.aggregate(updated=Max('updated_at'))['updated'],
+            )
+            if version != self._version:
+                self._build()
+                self._version = version
+                # Stable across processes, so clients can cache quotes per version
+                self.version = blake2b(repr(version).encode(), digest_size=8).hexdigest()
+            self._checked_at = now
+
+    def _build(self):
+        started = time.perf_counter()
+        zones = {}
+        overlaps = set()
+        # ShippingZone.clean() rejects overlaps; rows written around it resolve
+        # deterministically to the oldest zone
+        for zone_id, countries in ShippingZone.objects.order_by('id').values_list('id', 'countries'):
+            for country in countries.split(','):
+                country = country.strip().upper()
+                if country and zones.setdefault(country, zone_id) != zone_id:
+                    overlaps.add(country)
+        if overlaps:
+            logger.error(
+                f"Countries in more than one shipping zone, quoted from the oldest: {', '.join(sorted(overlaps))}"
+            )
+
+        lanes = {}
+        lane = lane_key = None
+        rates = (
+            ShippingRate.objects.filter(carrier__is_active=True)
+            .order_by('zone_id', 'carrier__code', 'service', 'max_weight')
+            .values_list('zone_id', 'carrier__code', 'carrier__currency', 'service', 'max_weight', 'price', 'transit_days')
+        )
+        count = 0
+        for zone_id, carrier, currency, service, max_weight, price, transit_days in rates.iterator(chunk_size=10000):
+            if (zone_id, carrier, service) != lane_key:
+                lane = Lane(carrier, currency, service)
+                lanes.setdefault(zone_id, []).append(lane)
+                lane_key = (zone_id, carrier, service)
+            lane.bounds.append(max_weight)
+            lane.prices.append(price)
+            lane.transit_days.append(transit_days)
+            count += 1
+
+        self._index = (zones, lanes)
+        logger.info(
+            f"Loaded {count} shipping rates in {sum(map(len, lanes.values()))} lanes for {len(zones)} countries "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    def quote(self, country, weight, carrier=None, service=None):
+        """Quotes for one parcel (weight in grams), cheapest first; empty if none applies"""
+        self.refresh()
+        return self._quote(country, weight, carrier, service)
+
+    def quote_many(self, parcels):
+        """Quotes for many (country, weight, carrier, service) parcels, against one version of the table"""
+        self.refresh()
+        return [self._quote(*parcel) for parcel in parcels]
+
+    def _quote(self, country, weight, carrier=None, service=None):
+        zones, lanes = self._index
+        zone_id = zones.get(country.upper())
+        if zone_id is None:
+            return []
+        quotes = []
+        for lane in lanes.get(zone_id, ()):
+            if (carrier is None or lane.carrier == carrier) and (service is None or lane.service == service):
+                quote = lane.quote(weight)
+                if quote is not None:
+                    quotes.append(quote)
+        quotes.sort(key=lambda quote: quote.price)
+        return quotes
+
+
+rate_table = RateTable()
+
+
+def sync_rates(carrier):
+    """Replace a carrier's stored rates with its backend's current rate card"""
+    backend = get_backend(carrier)
+    zones = list(ShippingZone.objects.all())
+    rates = [
+        ShippingRate(
+            carrier=carrier, zone=zone, service=service, max_weight=max_weight,
+            price=price, transit_days=transit_days,
+        )
+        for zone, service, max_weight, price, transit_days in backend.fetch_rates(zones)
+    ]
+    with transaction.atomic():
+        ShippingRate.objects.filter(carrier=carrier).delete()
+        ShippingRate.objects.bulk_create(rates, batch_size=1000)
+        carrier.rates_synced_at = timezone.now()
+        carrier.save(update_fields=['rates_synced_at', 'updated_at'])
+    rate_table.invalidate()
+    logger.info(f"Synced {len(rates)} shipping rates for carrier {carrier.code}")
+    return len(rates)
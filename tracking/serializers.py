@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+
+class ParcelSerializer(serializers.Serializer):
+    country = serializers.CharField(min_length=2, max_length=2)
+    weight = serializers.IntegerField(min_value=1, help_text='Grams')
+    carrier = serializers.CharField(max_length=50, required=False, default=None)
+    service = serializers.CharField(max_length=50, required=False, default=None)
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    parcels = serializers.ListField(child=ParcelSerializer(), allow_empty=False, max_length=500)
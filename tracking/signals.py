@@ -0,0 +1,26 @@
+"""
+Shipping rate table and order history invalidation
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver([post_save, post_delete], sender='tracking.Carrier')
+@receiver([post_save, post_delete], sender='tracking.ShippingZone')
+@receiver([post_save, post_delete], sender='tracking.ShippingRate')
+def invalidate_rate_table(sender, **kwargs):
+    """Reload shipping rates on the next quote in this process"""
+    from .rates import rate_table
+
+    rate_table.invalidate()
+
+
+@receiver([post_save, post_delete], sender='tracking.Shipment')
+def invalidate_order_history(sender, instance, **kwargs):
+    """Order history shows the latest shipment status"""
+    from order.history import invalidate
+    from order.models import Order
+
+    user_id = Order.objects.filter(pk=instance.order_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate(user_id)
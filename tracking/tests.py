@@ -1,3 +1,63 @@
-from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import Carrier, ShippingZone
+from .rates import RateTable, rate_table, sync_rates
+
+
+@override_settings(SHIPPING_CARRIER_BACKENDS={'stub': 'tracking.carriers.StubCarrier'})
+class ShippingQuoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The stub prices zones by their position in code order: domestic, then europe
+        ShippingZone.objects.create(code='domestic', name='Domestic', countries='US, CA')
+        ShippingZone.objects.create(code='europe', name='Europe', countries='DE,FR')
+        cls.carrier = Carrier.objects.create(code='stub', name='Stub')
+        sync_rates(cls.carrier)
+
+    def setUp(self):
+        rate_table.invalidate()
+
+    def test_batch_quote(self):
+        response = APIClient().post(reverse('shipping-quote'), {'parcels': [
+            {'country': 'us', 'weight': 250},
+            {'country': 'DE', 'weight': 300, 'service': 'express'},
+            {'country': 'JP', 'weight': 100},
+            {'country': 'US', 'weight': 40000},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], rate_table.version)
+        self.assertEqual(response.json()['quotes'], [
+            [
+                {'carrier': 'stub', 'service': 'standard', 'price': '4.99', 'currency': 'USD', 'transit_days': 5},
+                {'carrier': 'stub', 'service': 'express', 'price': '12.99', 'currency': 'USD', 'transit_days': 2},
+            ],
+            [{'carrier': 'stub', 'service': 'express', 'price': '19.99', 'currency': 'USD', 'transit_days': 3}],
+            [],
+            [],
+        ])
+
+    def test_batch_quote_checks_the_version_once(self):
+        table = RateTable()
+        # Version check (3) and build (2) once for the whole batch
+        with self.assertNumQueries(5):
+            results = table.quote_many([('US', 100, None, None)] * 50)
+        self.assertEqual(len(results), 50)
+        with self.assertNumQueries(0):
+            table.quote_many([('DE', 100, None, None)] * 50)
+
+    def test_overlapping_zone_is_rejected(self):
+        zone = ShippingZone(code='north-america', name='North America', countries='MX,us')
+        with self.assertRaisesMessage(ValidationError, 'Already in another zone: US (domestic)'):
+            zone.full_clean()
+
+    def test_overlap_saved_anyway_resolves_to_the_oldest_zone(self):
+        ShippingZone.objects.create(code='a-zone', name='First by code', countries='US')
+        table = RateTable()
+        with self.assertLogs('tracking.rates', 'ERROR'):
+            quotes = table.quote('US', 250)
+        # Still priced by 'domestic', not by the newer zone with no rates
+        self.assertEqual([str(quote.price) for quote in quotes], ['4.99', '12.99'])
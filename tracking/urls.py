@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('quote/', views.ShippingQuoteView.as_view(), name='shipping-quote'),
+]
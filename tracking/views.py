@@ -1,3 +1,38 @@
-from django.shortcuts import render
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from .rates import rate_table
+from .serializers import QuoteRequestSerializer
+
+
+class ShippingQuoteView(APIView):
+    """
+    Shipping quotes for a batch of parcels, cheapest first per parcel
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = QuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        parcels = serializer.validated_data['parcels']
+
+        results = rate_table.quote_many(
+            (parcel['country'], parcel['weight'], parcel['carrier'], parcel['service']) for parcel in parcels
+        )
+        return Response({
+            'version': rate_table.version,
+            'quotes': [
+                [
+                    {
+                        'carrier': quote.carrier,
+                        'service': quote.service,
+                        'price': str(quote.price),
+                        'currency': quote.currency,
+                        'transit_days': quote.transit_days,
+                    }
+                    for quote in quotes
+                ]
+                for quotes in results
+            ],
+        })
@@ -0,0 +1,164 @@
+"""
+Buffered audit log.
+
+record() puts an event on a bounded in-process queue and returns; a
+background thread writes events with bulk_create once `batch_size` have
+queued or `interval` seconds after the first one arrived. The queue is
+drained at interpreter exit. If the queue is full the caller writes a
+batch itself instead, so a slow database costs latency, never audit
+records. With ACTIVITY_LOG_EAGER every event is written by the caller
+(the test runner turns it on, so events land in the test's transaction).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def client_ip(request):
+    if request is None:
+        return None
+    return request.META.get('REMOTE_ADDR') or None
+
+
+class ActivityBuffer:
+    def __init__(self, max_queued, batch_size, interval):
+        self.max_queued = max_queued
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def put(self, event):
+        if getattr(settings, 'ACTIVITY_LOG_EAGER', False):
+            self.write([event])
+            return
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # The writer is behind: help it by writing a batch from this thread
+            logger.warning('Activity log queue full, writing a batch synchronously')
+            self.write(self._take(self.batch_size - 1) + [event])
+
+    def _start(self):
+        # Started lazily, and again after a fork: the writer thread doesn't survive fork
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queued)
+            self._thread = threading.Thread(target=self._run, name='activity-log', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                close_old_connections()
+                self.write(batch)
+            if stop:
+                return
+
+    def write(self, events):
+        try:
+            ActivityLog.objects.bulk_create([ActivityLog(**event) for event in events], batch_size=self.batch_size)
+        except Exception as e:
+            # Keep the trail in the logs rather than losing it
+            logger.error(f"Could not write {len(events)} activity events: {str(e)}")
+            for event in events:
+                logger.error(f"Activity event: {json.dumps(event, default=str)}")
+
+    def _take(self, limit=None):
+        """Remove up to `limit` queued events without waiting"""
+        events = []
+        while limit is None or len(events) < limit:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is _STOP:
+                self._queue.put(_STOP)
+                break
+            events.append(event)
+        return events
+
+    def flush(self):
+        """Write everything queued so far from the calling thread"""
+        if self._pid != os.getpid():
+            return
+        events = self._take()
+        if events:
+            self.write(events)
+
+    def shutdown(self, timeout=10):
+        """Drain the queue and stop the writer thread (called at interpreter exit)"""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._pid = None
+
+
+buffer = ActivityBuffer(
+    max_queued=getattr(settings, 'ACTIVITY_LOG_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 500),
+    interval=getattr(settings, 'ACTIVITY_LOG_FLUSH_SECONDS', 2.0),
+)
+atexit.register(buffer.shutdown)
+
+
+def record(action, user=None, actor=None, request=None, object_id='', **details):
+    """Queue an audit event; `user` and `actor` may be users or user ids"""
+    buffer.put({
+        'action': action,
+        'user_id': getattr(user, 'pk', user),
+        'actor_id': getattr(actor, 'pk', actor),
+        'object_id': str(object_id),
+        'ip_address': client_ip(request),
+        'details': details,
+        'created_at': timezone.now(),
+    })
+
+
+def for_user(user_id, since=None, until=None):
+    """A user's events, newest first (served by activity_user_created_idx)"""
+    events = ActivityLog.objects.filter(user_id=user_id)
+    if since is not None:
+        events = events.filter(created_at__gte=since)
+    if until is not None:
+        events = events.filter(created_at__lt=until)
+    return events.order_by('-created_at', '-id')
+
+
+def between(since, until, action=None):
+    """All events in [since, until), newest first (served by activity_created_idx)"""
+    events = ActivityLog.objects.filter(created_at__gte=since, created_at__lt=until)
+    if action is not None:
+        events = events.filter(action=action)
+    return events.order_by('-created_at', '-id')
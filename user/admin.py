@@ -1,9 +1,16 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.text import capfirst
+from ecommerce.admin_exports import StreamingExportMixin
+from ecommerce.admin_search import LargeTableAdminMixin
+from . import activity
+from .deletion import dependent_counts, protected_objects, start_job
+from .models import ActivityLog, CustomUser, UserRemovalJob
 
 @admin.register(CustomUser)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, StreamingExportMixin, UserAdmin):
     model = CustomUser
     list_display = ("id", "email", "phone_number", "username", "is_staff", "is_active",)
     list_filter = ("is_staff", "is_active",)
@@ -18,4 +25,101 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
     search_fields = ("email", "phone_number", "username")
+    indexed_search_fields = {"email": "exact", "phone_number": "exact", "username": "startswith"}
+    trigram_search_fields = ("email", "username")
     ordering = ("email",)
+    actions = ["delete_in_background", "anonymize_in_background"]
+    export_fields = (
+        "id", "uuid", "username", "email", "phone_number", "first_name", "last_name",
+        "is_staff", "is_active", "date_joined", "last_login",
+    )
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Field names only: values may be password hashes or personal data
+        activity.record(
+            ActivityLog.ADMIN_CHANGE if change else ActivityLog.ADMIN_ADD, obj, actor=request.user,
+            request=request, fields=sorted(form.changed_data),
+        )
+
+    # Deletion goes through user.deletion: dependent rows are removed in chunks
+    # instead of being loaded into memory by the collector, by a background job
+    # that starts once delete_view's transaction commits
+
+    def get_deleted_objects(self, objs, request):
+        # The default walks and lists every dependent row; summarize with counts instead,
+        # checking delete permission per model rather than per row
+        user_ids = [obj.pk for obj in objs]
+        deleted_objects = [str(obj) for obj in objs]
+        model_count = {}
+        perms_needed = set()
+        for model, count in {CustomUser: len(user_ids), **dependent_counts(user_ids)}.items():
+            model_count[model._meta.verbose_name_plural] = count
+            model_admin = self.admin_site._registry.get(model)
+            if model_admin is not None and not model_admin.has_delete_permission(request):
+                perms_needed.add(model._meta.verbose_name)
+        protected = [f"{capfirst(obj._meta.verbose_name)}: {obj}" for obj in protected_objects(user_ids)]
+        return deleted_objects, model_count, perms_needed, protected
+
+    def delete_model(self, request, obj):
+        self._start_deletion_job(request, [obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self._start_deletion_job(request, list(queryset.values_list('pk', flat=True)))
+
+    def _start_deletion_job(self, request, user_ids):
+        # The job records the ADMIN_DELETE activity once the users are gone
+        job = start_job(UserRemovalJob.DELETE, user_ids, requested_by=request.user)
+        url = reverse('admin:user_userremovaljob_change', args=[job.pk])
+        self.message_user(request, format_html(
+            'Removal runs in the background as <a href="{}">job {}</a>.', url, job.pk,
+        ), messages.INFO)
+
+    def _start_removal_job(self, request, queryset, mode):
+        user_ids = list(queryset.exclude(pk=request.user.pk).values_list('pk', flat=True))
+        if not user_ids:
+            self.message_user(request, "Nothing to do (you can't remove your own account).", messages.WARNING)
+            return
+        job = start_job(mode, user_ids, requested_by=request.user)
+        url = reverse('admin:user_userremovaljob_change', args=[job.pk])
+        self.message_user(request, format_html(
+            'Started <a href="{}">job {}</a> for {} users; it runs in the background.', url, job.pk, len(user_ids),
+        ))
+
+    @admin.action(description='Delete selected users in the background', permissions=['delete'])
+    def delete_in_background(self, request, queryset):
+        self._start_removal_job(request, queryset, UserRemovalJob.DELETE)
+
+    @admin.action(description='Anonymize selected users in the background', permissions=['change'])
+    def anonymize_in_background(self, request, queryset):
+        self._start_removal_job(request, queryset, UserRemovalJob.ANONYMIZE)
+
+
+@admin.register(ActivityLog)
+class ActivityLogAdmin(LargeTableAdminMixin, StreamingExportMixin, admin.ModelAdmin):
+    list_display = ("created_at", "action", "user", "actor", "object_id", "ip_address")
+    list_filter = ("action", "created_at")
+    raw_id_fields = ("user", "actor")
+    search_fields = ("user__email", "object_id")
+    indexed_search_fields = {"user__email": "exact"}
+    export_fields = ("id", "created_at", "action", "user_id", "actor_id", "object_id", "ip_address", "details")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(UserRemovalJob)
+class UserRemovalJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "mode", "user_count", "status", "progress", "requested_by", "created_at", "finished_at")
+    list_filter = ("mode", "status")
+    readonly_fields = [field.name for field in UserRemovalJob._meta.fields]
+
+    @admin.display(description="Users")
+    def user_count(self, obj):
+        return len(obj.user_ids)
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,261 @@
+"""
+Bulk-efficient user deletion and anonymization.
+
+Django's delete() loads every dependent row into Python before deleting
+anything (orders have delete signals, so they and all their children
+become model instances), then removes them in one long transaction. Here
+the large dependent tables are emptied first with chunked raw
+DELETE ... WHERE ... IN (...) statements, each chunk in its own short
+transaction, so memory use and lock time are bounded by the chunk size.
+Django's delete() then only has a small remainder left (group
+memberships, admin log entries, ...), which keeps relations this module
+doesn't know about correct.
+
+Anonymization keeps orders and payments for bookkeeping, deletes the
+user's notifications and overwrites their personal data in place.
+"""
+import logging
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import PROTECT, RESTRICT, CharField, ProtectedError, Value
+from django.db.models.functions import Cast, Concat, LPad
+from django.utils import timezone
+
+from ecommerce import tasks
+
+from notification.models import ArchivedNotification, Notification, PendingNotification
+from order import history
+from order.models import DiscountUsage, Order, OrderDiscount, OrderItem
+from payment.models import Payment, SettlementDiscrepancy
+from tracking.models import Shipment
+from . import activity
+from .models import ActivityLog, UserRemovalJob
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# Users handled per pass, to keep IN (...) lists bounded
+USER_BATCH_SIZE = 500
+
+# Models Remover.delete() empties with raw statements, with the lookup from each to its user
+DELETED_MODELS = {
+    Notification: 'user',
+    PendingNotification: 'user',
+    ArchivedNotification: 'user',
+    DiscountUsage: 'user',
+    Order: 'user',
+    OrderItem: 'order__user',
+    OrderDiscount: 'order__user',
+    Shipment: 'order__user',
+    Payment: 'order__user',
+}
+
+
+def _execute(cursor, sql, model, column, ids):
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(sql.format(table=quote(model._meta.db_table), column=quote(column)) + f" IN ({placeholders})", ids)
+    return cursor.rowcount
+
+
+def _delete_where_in(cursor, model, column, ids):
+    return _execute(cursor, "DELETE FROM {table} WHERE {column}", model, column, ids)
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class Remover:
+    """
+    Runs the chunked statements for a set of users, counting rows per model
+    and reporting the running totals to `progress` after every chunk.
+    """
+
+    def __init__(self, chunk_size=1000, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.counts = Counter()
+
+    def _done(self, model, rows):
+        self.counts[model._meta.label] += rows
+        if self.progress:
+            self.progress(dict(self.counts))
+
+    def delete_user_rows(self, model, user_ids):
+        """Delete a model's rows belonging to user_ids, chunk_size rows per transaction"""
+        rows = model.objects.filter(user_id__in=user_ids).order_by()
+        while True:
+            ids = list(rows.values_list('pk', flat=True)[:self.chunk_size])
+            if not ids:
+                return
+            with transaction.atomic(), connection.cursor() as cursor:
+                self._done(model, _delete_where_in(cursor, model, model._meta.pk.column, ids))
+
+    def delete_orders(self, user_ids):
+        """Delete the users' orders with their items, discounts, shipments and payments"""
+        orders = Order.objects.filter(user_id__in=user_ids).order_by()
+        while True:
+            rows = list(orders.values_list('pk', 'user_id')[:self.chunk_size])
+            if not rows:
+                return
+            order_ids = [pk for pk, _ in rows]
+            with transaction.atomic(), connection.cursor() as cursor:
+                # The raw DELETEs skip Order's post_delete receiver, which drops cached history pages
+                for user_id in {user_id for _, user_id in rows}:
+                    history.invalidate(user_id)
+                for model in (OrderItem, OrderDiscount, Shipment):
+                    self._done(model, _delete_where_in(cursor, model, 'order_id', order_ids))
+                payment_ids = list(Payment.objects.filter(order_id__in=order_ids).values_list('pk', flat=True))
+                if payment_ids:
+                    # Settlement discrepancies are kept as a record of what the provider reported
+                    _execute(cursor, "UPDATE {table} SET payment_id = NULL WHERE {column}",
+                             SettlementDiscrepancy, 'payment_id', payment_ids)
+                    self._done(Payment, _delete_where_in(cursor, Payment, 'id', payment_ids))
+                self._done(Order, _delete_where_in(cursor, Order, 'id', order_ids))
+
+    def scrub_activity(self, user_ids):
+        """Remove IP addresses and details from the users' audit trail"""
+        entries = ActivityLog.objects.filter(user_id__in=user_ids).order_by('pk')
+        last_pk = 0
+        while True:
+            ids = list(entries.filter(pk__gt=last_pk).values_list('pk', flat=True)[:self.chunk_size])
+            if not ids:
+                return
+            self._done(ActivityLog, ActivityLog.objects.filter(pk__in=ids).update(ip_address=None, details={}))
+            last_pk = ids[-1]
+
+    def delete(self, user_ids):
+        # The raw statements bypass on_delete, so check what the collector would have refused
+        protected = protected_objects(user_ids)
+        if protected:
+            raise ProtectedError(
+                f"Cannot delete users {sorted(user_ids)}: referenced through protected foreign keys", set(protected),
+            )
+        for batch in _chunks(list(user_ids), USER_BATCH_SIZE):
+            for model in (Notification, PendingNotification, ArchivedNotification, DiscountUsage):
+                self.delete_user_rows(model, batch)
+            self.delete_orders(batch)
+            self.scrub_activity(batch)
+            # Only small relations are left for the collector now
+            with transaction.atomic():
+                self._done(User, User.objects.filter(pk__in=batch).delete()[1].get(User._meta.label, 0))
+        return dict(self.counts)
+
+    def anonymize(self, user_ids):
+        password = make_password(None)
+        user_id = Cast('pk', CharField())
+        for batch in _chunks(list(user_ids), USER_BATCH_SIZE):
+            for model in (Notification, PendingNotification, ArchivedNotification):
+                self.delete_user_rows(model, batch)
+            self.scrub_activity(batch)
+            # Placeholders stay unique per user; "+0..." is never a valid E.164 number
+            self._done(User, User.objects.filter(pk__in=batch).update(
+                email=Concat(Value('deleted-'), user_id, Value('@anonymized.invalid')),
+                username=Concat(Value('deleted-'), user_id),
+                phone_number=Concat(Value('+0'), LPad(user_id, 14, Value('0'))),
+                first_name='',
+                last_name='',
+                password=password,
+                is_active=False,
+                is_staff=False,
+                is_superuser=False,
+                last_login=None,
+            ))
+        return dict(self.counts)
+
+
+def dependent_counts(user_ids):
+    """Rows delete_users() would remove besides the users, by model (one COUNT each)"""
+    counts = {
+        model: model.objects.filter(**{f'{path}__in': user_ids}).count() for model, path in DELETED_MODELS.items()
+    }
+    return {model: count for model, count in counts.items() if count}
+
+
+def protected_objects(user_ids, limit=100):
+    """
+    Up to `limit` rows per relation whose PROTECT or RESTRICT foreign key to
+    the users, or to a row delete_users() removes, would block the deletion
+    """
+    protected = []
+    for model, path in [(User, 'pk'), *DELETED_MODELS.items()]:
+        for rel in model._meta.get_fields(include_hidden=True):
+            if not (rel.auto_created and not rel.concrete and (rel.one_to_many or rel.one_to_one)):
+                continue
+            if rel.on_delete not in (PROTECT, RESTRICT):
+                continue
+            if rel.on_delete is RESTRICT and rel.related_model in DELETED_MODELS:
+                # Allowed, like the collector does, when the referencing rows go too
+                continue
+            lookup = f'{rel.field.name}__in' if path == 'pk' else f'{rel.field.name}__{path}__in'
+            protected += rel.related_model._base_manager.filter(**{lookup: user_ids})[:limit]
+    return protected
+
+
+def delete_users(user_ids, chunk_size=1000, progress=None):
+    """Delete users and everything depending on them; returns rows deleted per model"""
+    return Remover(chunk_size, progress).delete(user_ids)
+
+
+def anonymize_users(user_ids, chunk_size=1000, progress=None):
+    """Scrub users' personal data, keeping their orders; returns rows changed per model"""
+    return Remover(chunk_size, progress).anonymize(user_ids)
+
+
+def start_job(mode, user_ids, requested_by=None, background=True):
+    """Create a UserRemovalJob and run it, in the background task pool by default"""
+    job = UserRemovalJob.objects.create(mode=mode, user_ids=list(user_ids), requested_by=requested_by)
+    if background:
+        tasks.dispatch_on_commit(run_job, job.pk)
+    else:
+        run_job(job.pk)
+        job.refresh_from_db()
+    return job
+
+
+def run_job(job_id, chunk_size=1000):
+    """Run a removal job, saving its progress after every chunk. Safe to re-run after a failure."""
+    job = UserRemovalJob.objects.get(pk=job_id)
+    if job.status == UserRemovalJob.DONE:
+        return
+    job.status = UserRemovalJob.RUNNING
+    job.started_at = timezone.now()
+    job.error = ''
+    job.save(update_fields=['status', 'started_at', 'error'])
+
+    def progress(counts):
+        UserRemovalJob.objects.filter(pk=job_id).update(progress=counts)
+
+    def fail(error):
+        logger.error(f"User removal job {job_id} failed: {str(error)}")
+        UserRemovalJob.objects.filter(pk=job_id).update(
+            status=UserRemovalJob.FAILED, error=str(error), progress=dict(remover.counts),
+        )
+
+    remover = Remover(chunk_size, progress)
+    try:
+        if job.mode == UserRemovalJob.ANONYMIZE:
+            counts = remover.anonymize(job.user_ids)
+        else:
+            counts = remover.delete(job.user_ids)
+    except ProtectedError as e:
+        # Retrying can't succeed until someone removes the protected rows, so the
+        # job stays failed instead of being stored as a pending task
+        fail(e)
+        return
+    except Exception as e:
+        fail(e)
+        raise
+
+    UserRemovalJob.objects.filter(pk=job_id).update(
+        status=UserRemovalJob.DONE, progress=counts, finished_at=timezone.now(),
+    )
+    action = ActivityLog.ANONYMIZED if job.mode == UserRemovalJob.ANONYMIZE else ActivityLog.ADMIN_DELETE
+    for user_id in job.user_ids:
+        activity.record(action, user_id, actor=job.requested_by_id, object_id=job_id)
+    logger.info(f"User removal job {job_id} ({job.mode}, {len(job.user_ids)} users) done: {counts}")
@@ -0,0 +1,89 @@
+"""
+Phone number field that stores numbers in canonical E.164 form (+<country code><number>)
+"""
+import re
+
+from django import forms
+from django.conf import settings
+from django.core.validators import RegexValidator
+from django.db import models
+from rest_framework import serializers
+
+# Compiled once; normalization runs on every write and every exact lookup
+PHONE_FORMATTING_RE = re.compile(r'[\s\-\(\)\.]')
+PHONE_INPUT_RE = re.compile(r'^[\d\s\-\(\)\.\+]+$')
+E164_RE = re.compile(r'^\+[1-9]\d{9,14}$')
+
+# E.164 allows at most 15 digits plus the leading "+"
+E164_MAX_LENGTH = 16
+
+validate_e164 = RegexValidator(
+    E164_RE,
+    message="Invalid phone number format. Use international format: +1234567890",
+    code='invalid_phone_number',
+)
+
+
+def normalize_phone_number(value):
+    """
+    Strip formatting and return the number as +<digits>; does not validate.
+
+    International numbers need a '+' or '00' prefix. National numbers only
+    get one when PHONE_DEFAULT_COUNTRY_CODE is set; otherwise they are
+    returned without '+' rather than read as a country code.
+    """
+    if not isinstance(value, str):
+        return value
+    phone = PHONE_FORMATTING_RE.sub('', value)
+    if phone.startswith('00'):
+        phone = '+' + phone[2:]
+    elif phone and not phone.startswith('+'):
+        country_code = settings.PHONE_DEFAULT_COUNTRY_CODE
+        if country_code:
+            phone = f"+{country_code}{phone[1:] if phone.startswith('0') else phone}"
+    return phone
+
+
+def looks_like_phone_number(value):
+    return bool(value) and PHONE_INPUT_RE.match(value) is not None
+
+
+class PhoneNumberFormField(forms.CharField):
+    def to_python(self, value):
+        return normalize_phone_number(super().to_python(value))
+
+
+class PhoneNumberSerializerField(serializers.CharField):
+    # Normalized before validators run, so max_length applies to the canonical form
+    def to_internal_value(self, data):
+        return normalize_phone_number(super().to_internal_value(data))
+
+
+class PhoneNumberField(models.CharField):
+    """
+    CharField that canonicalizes phone numbers on every write path.
+
+    Values are normalized in model validation, in save() and
+    QuerySet.update(), and in exact/in lookups, so the unique index only
+    ever holds one spelling of a number.
+    """
+    default_validators = [validate_e164]
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', E164_MAX_LENGTH)
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        return normalize_phone_number(super().to_python(value))
+
+    def get_prep_value(self, value):
+        return normalize_phone_number(super().get_prep_value(value))
+
+    def pre_save(self, model_instance, add):
+        # Keep the in-memory instance in sync with what is written
+        value = normalize_phone_number(getattr(model_instance, self.attname))
+        setattr(model_instance, self.attname, value)
+        return value
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': PhoneNumberFormField, **kwargs})
@@ -0,0 +1,67 @@
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from notification.models import Notification
+from order.models import Order, OrderItem
+from payment.models import Payment
+from tracking.models import Shipment
+from user.deletion import delete_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create two users with N notifications and M orders each, then delete one with Django's "
+        "delete() and the other with user.deletion.delete_users, reporting time and peak memory. "
+        "Development databases only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notifications', type=int, default=50000, help='Notifications per user')
+        parser.add_argument('--orders', type=int, default=5000, help='Orders per user (3 items, a shipment and a payment each)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per statement for delete_users')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per query')
+
+    def handle(self, *args, **options):
+        django_user = self.create_user('bench-django', '+19990000001', options)
+        chunked_user = self.create_user('bench-chunked', '+19990000002', options)
+        self.measure("Django delete()", lambda: User.objects.get(pk=django_user.pk).delete())
+        self.measure(
+            f"delete_users (chunk size {options['chunk_size']})",
+            lambda: delete_users([chunked_user.pk], chunk_size=options['chunk_size']),
+        )
+
+    def create_user(self, username, phone_number, options):
+        # Left over from an interrupted run
+        delete_users(list(User.objects.filter(username=username).values_list('pk', flat=True)))
+        user = User.objects.create_user(username=username, email=f'{username}@example.com', phone_number=phone_number)
+        batch_size = options['batch_size']
+        Notification.objects.bulk_create([
+            Notification(user=user, notification_type='system', title='Benchmark', message='x' * 200)
+            for _ in range(options['notifications'])
+        ], batch_size=batch_size)
+        orders = Order.objects.bulk_create([Order(user=user, total=10) for _ in range(options['orders'])], batch_size=batch_size)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_name='Benchmark', sku='BENCH', unit_price=1) for order in orders for _ in range(3)
+        ], batch_size=batch_size)
+        Shipment.objects.bulk_create([Shipment(order=order) for order in orders], batch_size=batch_size)
+        Payment.objects.bulk_create([
+            Payment(order=order, provider='benchmark', reference=f'{username}-{order.pk}', amount=10) for order in orders
+        ], batch_size=batch_size)
+        self.stdout.write(f"Created {username} with {options['notifications']} notifications and {len(orders)} orders")
+        return user
+
+    def measure(self, label, func):
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            func()
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.stdout.write(self.style.SUCCESS(f"{label}: {elapsed:.2f}s, peak memory {peak / 1e6:.1f} MB"))
@@ -0,0 +1,102 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Report duplicate, prefix-covered and unused indexes for the project models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('app_labels', nargs='*', help='Only inspect these apps (default: all installed apps)')
+        parser.add_argument('--database', default='default', help='Database alias to inspect')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        models = self.get_models(options['app_labels'])
+        findings = 0
+
+        with connection.cursor() as cursor:
+            tables = set(connection.introspection.table_names(cursor))
+            for model in models:
+                table = model._meta.db_table
+                if table not in tables:
+                    continue
+                constraints = connection.introspection.get_constraints(cursor, table)
+                for message in self.declared_redundancy(model) + self.schema_redundancy(table, constraints):
+                    self.stdout.write(self.style.WARNING(message))
+                    findings += 1
+
+            if connection.vendor == 'postgresql':
+                tables_of_interest = {model._meta.db_table for model in models}
+                for message in self.unused_indexes(cursor, tables_of_interest):
+                    self.stdout.write(self.style.WARNING(message))
+                    findings += 1
+
+        if findings:
+            self.stdout.write(f"{findings} finding(s)")
+        else:
+            self.stdout.write(self.style.SUCCESS('No redundant indexes found'))
+
+    def get_models(self, app_labels):
+        if app_labels:
+            return [model for label in app_labels for model in apps.get_app_config(label).get_models()]
+        return list(apps.get_models())
+
+    def declared_redundancy(self, model):
+        """Indexes declared in the model that a unique constraint already provides"""
+        messages = []
+        label = model._meta.label
+        unique_columns = {(field.column,) for field in model._meta.concrete_fields if field.unique}
+        for field in model._meta.concrete_fields:
+            if field.unique and field.db_index and not field.primary_key:
+                messages.append(f"{label}.{field.name}: db_index=True is redundant with unique=True")
+        for index in model._meta.indexes:
+            columns = tuple(model._meta.get_field(name.lstrip('-')).column for name in index.fields)
+            if columns in unique_columns and not index.condition and not index.opclasses:
+                messages.append(f"{label}: Meta index {index.name} duplicates the unique index on {columns[0]}")
+        return messages
+
+    def schema_redundancy(self, table, constraints):
+        """Live indexes on `table` that are duplicated or covered by a longer index"""
+        indexes = {
+            name: info for name, info in constraints.items()
+            # Unique and primary key constraints are always backed by an index.
+            # PostgreSQL *_like indexes use pattern ops for LIKE 'x%' and are not duplicates.
+            if (info['index'] or info['unique'] or info['primary_key'])
+            and info['columns'] and not name.endswith('_like')
+            and info.get('type', 'btree') in ('btree', 'idx')
+        }
+        messages = []
+        for name, info in sorted(indexes.items()):
+            # Indexes enforcing uniqueness can't be dropped without losing the constraint
+            if info['unique'] or info['primary_key']:
+                continue
+            columns = tuple(info['columns'])
+            for other_name, other in sorted(indexes.items()):
+                if other_name == name:
+                    continue
+                other_columns = tuple(other['columns'])
+                if other_columns == columns:
+                    messages.append(f"{table}: index {name} duplicates {other_name} on ({', '.join(columns)})")
+                    break
+                if other_columns[:len(columns)] == columns:
+                    messages.append(
+                        f"{table}: index {name} on ({', '.join(columns)}) is a prefix of "
+                        f"{other_name} on ({', '.join(other_columns)})"
+                    )
+                    break
+        return messages
+
+    def unused_indexes(self, cursor, tables):
+        """Non-unique indexes never scanned since the statistics were last reset (PostgreSQL)"""
+        cursor.execute(
+            "SELECT s.relname, s.indexrelname, pg_relation_size(s.indexrelid) "
+            "FROM pg_stat_user_indexes s JOIN pg_index i ON i.indexrelid = s.indexrelid "
+            "WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary "
+            "ORDER BY pg_relation_size(s.indexrelid) DESC"
+        )
+        return [
+            f"{table}: index {index} has never been used ({size // 1024} kB)"
+            for table, index, size in cursor.fetchall()
+            if table in tables
+        ]
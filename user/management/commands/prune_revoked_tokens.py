@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from user.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked refresh token ids whose tokens have expired anyway'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(
+                RevokedToken.objects.filter(expires_at__lt=now)
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            deleted += RevokedToken.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} expired revoked token(s)"))
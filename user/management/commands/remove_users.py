@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from user.deletion import anonymize_users, delete_users
+from user.models import UserRemovalJob
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Delete or anonymize users, removing dependent rows in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('users', nargs='+', help='User ids or email addresses')
+        parser.add_argument('--anonymize', action='store_true', help='Scrub personal data and keep orders instead of deleting')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per statement and transaction')
+
+    def handle(self, *args, **options):
+        ids = {int(value) for value in options['users'] if value.isdigit()}
+        emails = [value for value in options['users'] if not value.isdigit()]
+        users = dict(User.objects.filter(pk__in=ids).values_list('pk', 'email'))
+        users.update(User.objects.filter(email__in=emails).values_list('pk', 'email'))
+        missing = (ids - set(users)) | (set(emails) - set(users.values()))
+        if missing:
+            raise CommandError(f"Unknown users: {', '.join(map(str, sorted(missing, key=str)))}")
+
+        mode = UserRemovalJob.ANONYMIZE if options['anonymize'] else UserRemovalJob.DELETE
+        def progress(counts):
+            self.stdout.write('\r' + ', '.join(f"{label}: {rows}" for label, rows in counts.items()), ending='')
+            self.stdout.flush()
+
+        remove = anonymize_users if options['anonymize'] else delete_users
+        counts = remove(sorted(users), chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f"{mode.capitalize()}d {len(users)} users: {counts}"))
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+from ecommerce.trigram_indexes import trigram_indexes_operation
+
+# GIN trigram indexes used by ADMIN_SEARCH_MODE='trigram' (see ecommerce.trigram_indexes)
+INDEXES = {
+    'user_customuser_email_trgm': 'email',
+    'user_customuser_username_trgm': 'username',
+}
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('user', '0007_alter_customuser_options_alter_customuser_email_and_more'),
+    ]
+
+    operations = [
+        trigram_indexes_operation('user_customuser', INDEXES),
+    ]
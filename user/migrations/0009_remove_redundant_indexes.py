@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:43
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_customuser_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='customuser',
+            name='user_custom_email_695f8b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customuser',
+            name='user_custom_phone_n_77a49d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customuser',
+            name='user_custom_uuid_120db2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customuser',
+            name='user_custom_usernam_db683f_idx',
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='phone_number',
+            field=models.CharField(max_length=15, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:45
+
+import logging
+
+import user.fields
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+
+
+def check_national_numbers(CustomUser):
+    """
+    Numbers used to be accepted without a '+' (e.g. "5551234567"). Without
+    PHONE_DEFAULT_COUNTRY_CODE they can't be made E.164, and would then miss
+    lookups and fail validation on every edit, so refuse to migrate.
+    """
+    if settings.PHONE_DEFAULT_COUNTRY_CODE:
+        return
+    national = (
+        CustomUser.objects.exclude(phone_number='').exclude(phone_number__startswith='+')
+        .exclude(phone_number__startswith='00')
+    )
+    count = national.count()
+    if count:
+        sample = ', '.join(map(str, national.order_by('pk').values_list('pk', flat=True)[:10]))
+        raise ImproperlyConfigured(
+            f"{count} users have phone numbers without a country code (e.g. users {sample}). "
+            f"Set PHONE_DEFAULT_COUNTRY_CODE to the country they belong to and run the migration again."
+        )
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    """Rewrite existing phone numbers in canonical E.164 form, one batch at a time"""
+    CustomUser = apps.get_model('user', 'CustomUser')
+    check_national_numbers(CustomUser)
+    normalize = user.fields.normalize_phone_number
+    last_pk = 0
+    while True:
+        rows = list(
+            CustomUser.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'phone_number')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        normalized = {pk: normalize(phone) for pk, phone in rows}
+        for pk, phone in normalized.items():
+            if phone and not user.fields.E164_RE.match(phone):
+                # Not a phone number at all (too short, letters, ...)
+                logger.warning(f"User {pk}: phone number {phone} is not valid E.164; fix it manually")
+        changed = {pk: normalized[pk] for pk, phone in rows if normalized[pk] != phone}
+        if not changed:
+            continue
+        taken = set(
+            CustomUser.objects.filter(phone_number__in=changed.values()).values_list('phone_number', flat=True)
+        )
+        updates = []
+        for pk, phone in changed.items():
+            if phone in taken:
+                # Another account already has this number; leave it for manual cleanup
+                logger.warning(f"Skipping user {pk}: phone number {phone} is already in use")
+                continue
+            taken.add(phone)
+            updates.append(CustomUser(pk=pk, phone_number=phone))
+        CustomUser.objects.bulk_update(updates, ['phone_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0009_remove_redundant_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='phone_number',
+            field=user.fields.PhoneNumberField(max_length=16, unique=True),
+        ),
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0011_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('login', 'Login'), ('login_failed', 'Failed login'), ('register', 'Registration'), ('admin_add', 'Added in admin'), ('admin_change', 'Changed in admin'), ('admin_delete', 'Deleted in admin'), ('notification_read', 'Notification read')], max_length=30)),
+                ('object_id', models.CharField(blank=True, max_length=64)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='activity_user_created_idx'), models.Index(fields=['created_at'], name='activity_created_idx')],
+            },
+        ),
+    ]
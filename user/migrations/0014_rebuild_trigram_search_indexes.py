@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from ecommerce.trigram_indexes import create_trigram_indexes
+
+# Rebuild the trigram indexes from 0008 on UPPER(column::text), the expression
+# icontains queries; indexes already on it are left alone
+INDEXES = {
+    'user_customuser_email_trgm': 'email',
+    'user_customuser_username_trgm': 'username',
+}
+
+
+def rebuild_trigram_indexes(apps, schema_editor):
+    create_trigram_indexes(schema_editor, 'user_customuser', INDEXES)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('user', '0013_alter_activitylog_action_userremovaljob'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_trigram_indexes, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,113 @@
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from .fields import PhoneNumberField
 
 class CustomUser(AbstractUser):
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, db_index=True)
-    email = models.EmailField(unique=True, blank=False, null=False, db_index=True)
-    phone_number = models.CharField(unique=True, max_length=15, blank=False, null=False, db_index=True)
-    
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    email = models.EmailField(unique=True, blank=False, null=False)
+    phone_number = PhoneNumberField(unique=True, blank=False, null=False)
+
+    class Meta:
+        # No extra indexes: unique=True already indexes uuid, email, phone_number
+        # and username. Run `python manage.py index_advisor` before adding any.
+        indexes = []
+
+
+class RevokedToken(models.Model):
+    """JWT id of a refresh token that may no longer be used (rotated or revoked)"""
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+
+class ActivityLog(models.Model):
+    """
+    Audit trail entry: logins, registrations, admin changes to users and notification reads.
+
+    Written in batches by user.activity. `user` and `actor` carry no database
+    constraint, so entries keep their user ids after the users are deleted.
+    """
+    LOGIN = 'login'
+    LOGIN_FAILED = 'login_failed'
+    REGISTER = 'register'
+    ADMIN_ADD = 'admin_add'
+    ADMIN_CHANGE = 'admin_change'
+    ADMIN_DELETE = 'admin_delete'
+    ANONYMIZED = 'anonymized'
+    NOTIFICATION_READ = 'notification_read'
+    ACTION_CHOICES = [
+        (LOGIN, 'Login'),
+        (LOGIN_FAILED, 'Failed login'),
+        (REGISTER, 'Registration'),
+        (ADMIN_ADD, 'Added in admin'),
+        (ADMIN_CHANGE, 'Changed in admin'),
+        (ADMIN_DELETE, 'Deleted in admin'),
+        (ANONYMIZED, 'Anonymized'),
+        (NOTIFICATION_READ, 'Notification read'),
+    ]
+
+    # No separate FK index: activity_user_created_idx below starts with user
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+',
+        db_index=False,
+    )
+    # Who performed the action, when it isn't the user themselves (e.g. an admin)
+    actor = models.ForeignKey(
+        CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+',
+    )
+    action = models.CharField(max_length=30, choices=ACTION_CHOICES)
+    object_id = models.CharField(max_length=64, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    details = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()
+
     class Meta:
+        ordering = ['-created_at', '-id']
         indexes = [
-            models.Index(fields=['email']),
-            models.Index(fields=['phone_number']),
-            models.Index(fields=['uuid']),
-            models.Index(fields=['username']),
+            models.Index(fields=['user', '-created_at'], name='activity_user_created_idx'),
+            models.Index(fields=['created_at'], name='activity_created_idx'),
         ]
+
+    def __str__(self):
+        return f"{self.action} user={self.user_id} at {self.created_at}"
+
+
+class UserRemovalJob(models.Model):
+    """
+    Deletion or anonymization of a set of users, run by user.deletion.run_job
+    """
+    DELETE = 'delete'
+    ANONYMIZE = 'anonymize'
+    MODE_CHOICES = [
+        (DELETE, 'Delete'),
+        (ANONYMIZE, 'Anonymize'),
+    ]
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES)
+    user_ids = models.JSONField(default=list)
+    requested_by = models.ForeignKey(
+        CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+',
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # Rows deleted or scrubbed so far, per table
+    progress = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_mode_display()} {len(self.user_ids)} users ({self.status})"
@@ -1,20 +1,75 @@
 from rest_framework import serializers
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.validators import UniqueValidator
 from .models import CustomUser
+from .fields import PhoneNumberField, PhoneNumberSerializerField
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-import re
 import uuid
 
 User = get_user_model()
 
+# Phone numbers are normalized before validation so formatted input is accepted
+# and uniqueness is checked against the canonical E.164 value
+SERIALIZER_FIELD_MAPPING = {
+    **serializers.ModelSerializer.serializer_field_mapping,
+    PhoneNumberField: PhoneNumberSerializerField,
+}
+
+
 class CustomUserSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = SERIALIZER_FIELD_MAPPING
+
     class Meta:
         model = CustomUser
         fields = ['id', 'uuid', 'username', 'email', 'phone_number', 'first_name', 'last_name']
 
 
+def _compile_row_mapper(fields, converters):
+    """Build a function mapping a values_list() row to a representation dict"""
+    # Resolve the per-column converter once, not once per row
+    columns = tuple((name, converters.get(name)) for name in fields)
+
+    def to_representation(row):
+        data = {}
+        for (name, convert), value in zip(columns, row):
+            # Mirror DRF: None is passed through without calling the field
+            data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+    return to_representation
+
+
+class CustomUserReadSerializer:
+    """
+    Read-only fast path for CustomUserSerializer.
+
+    Works on .values_list() rows instead of model instances so hot list
+    endpoints skip model construction and per-field DRF dispatch. The output
+    must stay identical to CustomUserSerializer.
+    """
+    fields = tuple(CustomUserSerializer.Meta.fields)
+    # Only columns whose DB value differs from the DRF representation need a converter
+    converters = {'uuid': str}
+
+    to_representation = staticmethod(_compile_row_mapper(fields, converters))
+
+    @classmethod
+    def values(cls, queryset):
+        """Return the queryset as tuples in serializer field order"""
+        return queryset.values_list(*cls.fields)
+
+    @classmethod
+    def many(cls, rows):
+        to_representation = cls.to_representation
+        return [to_representation(row) for row in rows]
+
+
 class RegisterSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = SERIALIZER_FIELD_MAPPING
     password = serializers.CharField(
         write_only=True,
         required=True,
@@ -36,24 +91,55 @@ class RegisterSerializer(serializers.ModelSerializer):
             'phone_number': {'required': True},
         }
 
-    def validate_phone_number(self, value):
-        """Validate phone number format"""
-        # Remove spaces, dashes, and parentheses
-        phone = re.sub(r'[\s\-\(\)]', '', value)
-        # Check if it's a valid phone number (10-15 digits)
-        if not re.match(r'^\+?[1-9]\d{9,14}$', phone):
-            raise serializers.ValidationError("Invalid phone number format. Use international format: +1234567890")
-        return phone
+    # Checked together in a single query instead of one UniqueValidator query each
+    unique_fields = ('email', 'username', 'phone_number')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        self.unique_error_messages = {}
+        for name in self.unique_fields:
+            validators = []
+            for validator in fields[name].validators:
+                if isinstance(validator, UniqueValidator):
+                    self.unique_error_messages[name] = validator.message
+                else:
+                    validators.append(validator)
+            fields[name].validators = validators
+        return fields
+
+    def unique_conflicts(self, attrs):
+        """Return {field: error message} for every unique field already taken"""
+        query = Q()
+        for name in self.unique_fields:
+            query |= Q(**{name: attrs[name]})
+
+        errors = {}
+        # At most one existing row can clash per unique field
+        for row in User.objects.filter(query).values_list(*self.unique_fields)[:len(self.unique_fields)]:
+            for name, value in zip(self.unique_fields, row):
+                if value == attrs[name]:
+                    errors[name] = [ErrorDetail(self.unique_error_messages[name], code='unique')]
+        return errors
 
     def validate(self, attrs):
         """Validate that passwords match"""
         if attrs['password'] != attrs['password_confirm']:
             raise serializers.ValidationError({"password_confirm": "Passwords do not match"})
+        errors = self.unique_conflicts(attrs)
+        if errors:
+            raise serializers.ValidationError(errors)
         return attrs
 
     def create(self, validated_data):
         validated_data.pop('password_confirm')  # Remove password_confirm from validated_data
-        user = User.objects.create_user(**validated_data)
+        # The pre-check in validate() can race a concurrent registration; the
+        # database unique constraints are the real guarantee
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(**validated_data)
+        except IntegrityError:
+            errors = self.unique_conflicts(validated_data)
+            raise serializers.ValidationError(errors or "A user with these details already exists.")
         return user
 
 class LoginSerializer(serializers.Serializer):
@@ -1,3 +1,462 @@
-from django.test import TestCase
+import importlib
+import os
+import queue
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import ProtectedError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from notification.models import Notification, PendingTask
+from order.models import DiscountRule, DiscountUsage, Order, OrderDiscount, OrderItem
+from payment.models import Payment, SettlementDiscrepancy, SettlementRun
+from tracking.models import Shipment
+from .activity import ActivityBuffer
+from .deletion import delete_users, start_job
+from .fields import normalize_phone_number
+from .models import ActivityLog, RevokedToken, UserRemovalJob
+from .serializers import CustomUserReadSerializer, CustomUserSerializer, RegisterSerializer, _compile_row_mapper
+from .tokens import BloomFilter, TokenRevocationStore, revocation_store
+
+User = get_user_model()
+
+
+def make_user(n, **kwargs):
+    return User.objects.create_user(
+        username=f'user{n}', email=f'user{n}@example.com', phone_number=f'+1555000{n:04d}',
+        password='Str0ng!pass123', **kwargs,
+    )
+
+
+class CustomUserReadSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', phone_number='+15559990000', password='x',
+        )
+        make_user(1)
+        make_user(2, first_name='Ada', last_name='Lovelace')
+
+    def test_matches_model_serializer(self):
+        users = User.objects.order_by('pk')
+        expected = JSONRenderer().render(CustomUserSerializer(users, many=True).data)
+        actual = JSONRenderer().render(CustomUserReadSerializer.many(CustomUserReadSerializer.values(users)))
+        self.assertEqual(actual, expected)
+
+    def test_list_and_detail_endpoints_match_model_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get(reverse('user-list'), {'ordering': 'pk'})
+        expected = CustomUserSerializer(User.objects.order_by('pk'), many=True).data
+        results = response.json()['results']
+        self.assertEqual(sorted(results, key=lambda row: row['id']), [dict(row) for row in expected])
+
+        user = User.objects.get(username='user2')
+        response = client.get(reverse('user-detail', args=[user.uuid]))
+        self.assertEqual(response.json(), dict(CustomUserSerializer(user).data))
+
+    def test_none_is_passed_through_without_conversion(self):
+        to_representation = _compile_row_mapper(('id', 'uuid', 'first_name'), {'uuid': str})
+        self.assertEqual(
+            to_representation((1, None, None)),
+            {'id': 1, 'uuid': None, 'first_name': None},
+        )
+
+
+REGISTRATION = {
+    'email': 'new@example.com', 'username': 'new', 'phone_number': '+15550004321',
+    'password': 'Str0ng!pass123', 'password_confirm': 'Str0ng!pass123',
+}
+
+
+class RegisterSerializerTests(TestCase):
+    def test_uniqueness_is_checked_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(RegisterSerializer(data=REGISTRATION).is_valid())
+
+    def test_every_taken_field_is_reported(self):
+        make_user(1)
+        serializer = RegisterSerializer(data={
+            **REGISTRATION, 'email': 'user1@example.com', 'phone_number': '+15550000001',
+        })
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(set(serializer.errors), {'email', 'phone_number'})
+        self.assertEqual(serializer.errors['email'][0].code, 'unique')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    BACKGROUND_TASKS_EAGER=True,
+)
+class ConcurrentRegistrationTests(TransactionTestCase):
+    def setUp(self):
+        # Registration is throttled per client
+        cache.clear()
+
+    def test_double_register_creates_one_user(self):
+        # Both requests pass the validation pre-check before either inserts, so
+        # the loser is caught by the unique constraint in create()
+        barrier = threading.Barrier(2, timeout=10)
+        validate = RegisterSerializer.validate
+        create = RegisterSerializer.create
+        # SQLite's shared-cache test database fails concurrent writers with
+        # "table is locked" instead of waiting, so the inserts take turns there
+        write_lock = threading.Lock() if connection.vendor == 'sqlite' else None
+
+        def validate_then_wait(serializer, attrs):
+            attrs = validate(serializer, attrs)
+            barrier.wait()
+            return attrs
+
+        def serialized_create(serializer, validated_data):
+            if write_lock is None:
+                return create(serializer, validated_data)
+            with write_lock:
+                return create(serializer, validated_data)
+
+        responses = []
+
+        def register():
+            try:
+                responses.append(APIClient().post(reverse('register'), REGISTRATION, format='json'))
+            finally:
+                connection.close()
+
+        with mock.patch.object(RegisterSerializer, 'validate', validate_then_wait), \
+                mock.patch.object(RegisterSerializer, 'create', serialized_create):
+            threads = [threading.Thread(target=register) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(response.status_code for response in responses), [201, 400])
+        rejected = next(response for response in responses if response.status_code == 400)
+        self.assertEqual(set(rejected.json()), {'email', 'username', 'phone_number'})
+        self.assertIn('already exists', rejected.json()['email'][0])
+        self.assertEqual(User.objects.filter(email=REGISTRATION['email']).count(), 1)
+
+
+class PhoneNumberNormalizationTests(TestCase):
+    def test_international_prefixes(self):
+        self.assertEqual(normalize_phone_number('+1 (555) 000-1234'), '+15550001234')
+        self.assertEqual(normalize_phone_number('0044 20 7946 0018'), '+442079460018')
+
+    @override_settings(PHONE_DEFAULT_COUNTRY_CODE='')
+    def test_national_number_is_not_given_a_country_code(self):
+        self.assertEqual(normalize_phone_number('020 7946 0018'), '02079460018')
+        serializer = RegisterSerializer(data={**REGISTRATION, 'phone_number': '555 000 1234'})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['phone_number'][0].code, 'invalid_phone_number')
+
+    @override_settings(PHONE_DEFAULT_COUNTRY_CODE='44')
+    def test_national_number_uses_default_country_code(self):
+        self.assertEqual(normalize_phone_number('020 7946 0018'), '+442079460018')
+
+
+class PhoneNumberMigrationTests(TestCase):
+    migration = importlib.import_module('user.migrations.0010_customuser_phone_number_e164')
+
+    def setUp(self):
+        self.user = make_user(1)
+        # A number saved before E.164 was enforced
+        with self.settings(PHONE_DEFAULT_COUNTRY_CODE=''):
+            User.objects.filter(pk=self.user.pk).update(phone_number='555 123 4567')
+
+    @override_settings(PHONE_DEFAULT_COUNTRY_CODE='')
+    def test_legacy_numbers_need_a_country_code(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'PHONE_DEFAULT_COUNTRY_CODE'):
+            self.migration.normalize_phone_numbers(apps, None)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.phone_number, '5551234567')
+
+    @override_settings(PHONE_DEFAULT_COUNTRY_CODE='1')
+    def test_legacy_numbers_get_the_default_country_code(self):
+        self.migration.normalize_phone_numbers(apps, None)
+        self.assertEqual(User.objects.get(phone_number='+1 555 123 4567'), self.user)
+
+
+class LoginViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_user(1)
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, email, password='Str0ng!pass123'):
+        return APIClient().post(reverse('login'), {'email': email, 'password': password}, format='json')
+
+    def test_non_string_credentials_are_rejected(self):
+        for email, password in ((['user1@example.com'], 'x'), ({'a': 1}, 'x'), (15550000001, 'x'),
+                                ('user1@example.com', ['x'])):
+            response = self.login(email, password)
+            self.assertEqual(response.status_code, 400, (email, password))
+
+    def test_login_by_email_phone_and_username(self):
+        for identifier in ('user1@example.com', '+1 555 000 0001', '0015550000001', 'user1'):
+            self.assertEqual(self.login(identifier).status_code, 200, identifier)
+
+    def test_failed_login_records_the_identifier_type_only(self):
+        for identifier in ('user1@example.com', '+1 555 000 0001', 'someone'):
+            self.assertEqual(self.login(identifier, 'wrong').status_code, 401, identifier)
+        self.assertEqual(
+            list(ActivityLog.objects.filter(action=ActivityLog.LOGIN_FAILED).order_by('id').values_list('details', flat=True)),
+            [{'identifier_type': 'email'}, {'identifier_type': 'phone_number'}, {'identifier_type': 'username'}],
+        )
+
+
+class UserActivityViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(1)
+        cls.admin = make_user(2, is_staff=True)
+
+    def get(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        return client.get(reverse('user-activity', args=[self.user.uuid]), params)
+
+    def test_events_in_range(self):
+        ActivityLog.objects.create(action=ActivityLog.LOGIN, user_id=self.user.pk, created_at=timezone.now())
+        response = self.get(since='2026-01-01T00:00:00Z')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['action'] for event in response.json()], [ActivityLog.LOGIN])
+
+    def test_invalid_datetime_is_a_bad_request(self):
+        for value in ('yesterday', '2026-13-01T00:00:00', '2026-02-30T00:00:00'):
+            response = self.get(since=value)
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('since', response.json())
+
+
+@override_settings(ACTIVITY_LOG_EAGER=False)
+class ActivityBufferTests(TransactionTestCase):
+    def event(self, n):
+        return {
+            'action': ActivityLog.LOGIN, 'user_id': n, 'actor_id': None, 'object_id': '',
+            'ip_address': None, 'details': {}, 'created_at': timezone.now(),
+        }
+
+    def logged_users(self):
+        return sorted(ActivityLog.objects.values_list('user_id', flat=True))
+
+    def test_full_queue_is_written_by_the_caller(self):
+        buffer = ActivityBuffer(max_queued=2, batch_size=2, interval=60)
+        # No writer thread, so the queue fills up
+        buffer._queue, buffer._pid = queue.Queue(maxsize=2), os.getpid()
+        buffer.put(self.event(1))
+        buffer.put(self.event(2))
+        with self.assertLogs('user.activity', 'WARNING'):
+            buffer.put(self.event(3))
+        # The oldest queued event and the new one; the other waits for the writer
+        self.assertEqual(self.logged_users(), [1, 3])
+        buffer.flush()
+        self.assertEqual(self.logged_users(), [1, 2, 3])
+
+    def test_shutdown_drains_the_queue(self):
+        buffer = ActivityBuffer(max_queued=100, batch_size=100, interval=60)
+        for n in range(5):
+            buffer.put(self.event(n))
+        thread = buffer._thread
+        buffer.shutdown()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.logged_users(), [0, 1, 2, 3, 4])
+
+
+class UserDeletionTests(TestCase):
+    def setUp(self):
+        self.user, self.other = make_user(1), make_user(2)
+        self.payment = self.give_dependents(self.user)
+        self.other_payment = self.give_dependents(self.other)
+        self.discrepancy = SettlementDiscrepancy.objects.create(
+            run=SettlementRun.objects.create(provider='stub'), kind=SettlementDiscrepancy.AMOUNT_MISMATCH,
+            reference=self.payment.reference, payment=self.payment,
+        )
+
+    def give_dependents(self, user):
+        Notification.objects.create(user=user, notification_type='system', title='Hi', message='Hello')
+        rule = DiscountRule.objects.create(name=f'Rule {user.pk}', kind=DiscountRule.FIXED, value='1.00')
+        DiscountUsage.objects.create(rule=rule, user=user, count=1)
+        order = Order.objects.create(user=user)
+        OrderItem.objects.create(order=order, product_name='Item', sku='SKU', unit_price='5.00')
+        OrderDiscount.objects.create(order=order, rule=rule, name='One off', amount='1.00')
+        Shipment.objects.create(order=order)
+        ActivityLog.objects.create(action=ActivityLog.LOGIN, user_id=user.pk, ip_address='192.0.2.1', created_at=timezone.now())
+        return Payment.objects.create(order=order, provider='stub', reference=f'ch_{user.pk}', amount='5.00')
+
+    def test_dependents_are_removed(self):
+        counts = delete_users([self.user.pk], chunk_size=1)
+
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        for model in (Notification, DiscountUsage, Order, Payment):
+            self.assertEqual(model.objects.count(), 1, model.__name__)
+        for model in (OrderItem, OrderDiscount, Shipment):
+            self.assertEqual(model.objects.get().order.user, self.other, model.__name__)
+        self.assertEqual(counts[Payment._meta.label], 1)
+        # Kept as a record of what the provider reported, without the payment
+        self.discrepancy.refresh_from_db()
+        self.assertIsNone(self.discrepancy.payment_id)
+        self.assertEqual(
+            list(ActivityLog.objects.filter(user_id=self.user.pk).values_list('ip_address', 'details')), [(None, {})],
+        )
+
+    def test_protected_rows_stop_the_deletion(self):
+        with mock.patch('user.deletion.protected_objects', return_value=[self.other]):
+            with self.assertRaises(ProtectedError):
+                delete_users([self.user.pk])
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_deleted_orders_invalidate_cached_history(self):
+        with mock.patch('user.deletion.history.invalidate') as invalidate:
+            delete_users([self.user.pk], chunk_size=1)
+        invalidate.assert_called_once_with(self.user.pk)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_protected_job_fails_without_being_retried(self):
+        with mock.patch('user.deletion.protected_objects', return_value=[self.other]), \
+                self.assertLogs('user.deletion', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            job = start_job(UserRemovalJob.DELETE, [self.user.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.status, UserRemovalJob.FAILED)
+        self.assertIn('protected foreign keys', job.error)
+        self.assertFalse(PendingTask.objects.exists())
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+
+
+class UserAdminDeletionTests(TestCase):
+    def setUp(self):
+        self.admin = make_user(9, is_staff=True, is_superuser=True)
+        self.user = make_user(1)
+        Order.objects.create(user=self.user)
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:user_customuser_delete', args=[self.user.pk])
+
+    def test_confirmation_page_counts_dependents(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(dict(response.context['model_count']), {'custom users': 1, 'orders': 1})
+        self.assertEqual((response.context['perms_lacking'], response.context['protected']), (set(), []))
+
+    def test_confirmation_page_reports_missing_permissions(self):
+        staff = make_user(8, is_staff=True)
+        staff.user_permissions.set(Permission.objects.filter(codename__in=['view_customuser', 'delete_customuser']))
+        self.client.force_login(staff)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['perms_lacking'], {'order'})
+
+    def test_confirmation_page_reports_protected_rows(self):
+        with mock.patch('user.admin.protected_objects', return_value=[self.admin]):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['protected'], [f'Custom user: {self.admin}'])
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_delete_runs_as_a_job_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(self.url, {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        # Nothing is removed inside delete_view's transaction
+        self.assertTrue(User.objects.filter(pk=self.user.pk).exists())
+        job = UserRemovalJob.objects.get()
+        self.assertEqual((job.mode, job.user_ids, job.status), (UserRemovalJob.DELETE, [self.user.pk], UserRemovalJob.PENDING))
+
+        for callback in callbacks:
+            callback()
+        job.refresh_from_db()
+        self.assertEqual(job.status, UserRemovalJob.DONE)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Order.objects.exists())
+        self.assertTrue(ActivityLog.objects.filter(action=ActivityLog.ADMIN_DELETE, user_id=self.user.pk, actor=self.admin).exists())
+
+
+class TokenRotationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(1)
+
+    def setUp(self):
+        # A ready filter, so requests never start a background build
+        for name, value in (('filter', BloomFilter(1000)), ('last_id', 0), ('last_sync', 0.0)):
+            self.addCleanup(setattr, revocation_store, name, getattr(revocation_store, name))
+            setattr(revocation_store, name, value)
+
+    def refresh(self, token):
+        return APIClient().post(reverse('token_refresh'), {'refresh': str(token)}, format='json')
+
+    def test_refresh_rotates_the_token(self):
+        old = RefreshToken.for_user(self.user)
+        response = self.refresh(old)
+        self.assertEqual(response.status_code, 200)
+        new = response.json()['refresh']
+        self.assertNotEqual(new, str(old))
+        self.assertTrue(RevokedToken.objects.filter(jti=old['jti']).exists())
+        self.assertEqual(self.refresh(new).status_code, 200)
+
+    def test_replayed_token_is_rejected(self):
+        old = RefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(old).status_code, 200)
+        # Before the filter syncs the INSERT catches the replay, afterwards the filter does
+        self.assertEqual(self.refresh(old).status_code, 401)
+        revocation_store.last_sync = 0.0
+        self.assertEqual(self.refresh(old).status_code, 401)
+        self.assertIn(old['jti'], revocation_store.filter)
+
+    def test_filter_false_positive_is_checked_in_the_database(self):
+        token = RefreshToken.for_user(self.user)
+        revocation_store.last_sync = time.monotonic()
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_store.is_revoked('never-revoked'))
+        revocation_store.filter.add(token['jti'])
+        with self.assertNumQueries(1):
+            self.assertFalse(revocation_store.is_revoked(token['jti']))
+        self.assertEqual(self.refresh(token).status_code, 200)
+
+    def test_prune_removes_only_expired_entries(self):
+        now = timezone.now()
+        RevokedToken.objects.bulk_create([
+            RevokedToken(jti='expired-1', expires_at=now - timedelta(days=1)),
+            RevokedToken(jti='expired-2', expires_at=now - timedelta(seconds=1)),
+            RevokedToken(jti='live', expires_at=now + timedelta(days=1)),
+        ])
+        out = StringIO()
+        call_command('prune_revoked_tokens', batch_size=1, stdout=out)
+        self.assertIn('Pruned 2', out.getvalue())
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+
+
+class TokenFilterBuildTests(TestCase):
+    def test_failed_builds_back_off(self):
+        store = TokenRevocationStore(capacity=100, error_rate=0.01, sync_interval=1)
+        with mock.patch('user.tokens.threading.Thread') as thread:
+            store.start_build()
+            store.start_build()
+        # One attempt in flight at a time
+        self.assertEqual(thread.call_count, 1)
+
+        with mock.patch.object(store, 'build', side_effect=Exception('database is down')), \
+                self.assertLogs('user.tokens', 'ERROR'):
+            store._build_in_background()
+        self.assertFalse(store.building)
+        with mock.patch('user.tokens.threading.Thread') as thread:
+            store.start_build()
+        thread.assert_not_called()
+
+        store.next_build_at = 0.0
+        store._build_in_background()
+        self.assertEqual((store.failures, store.filter.count), (0, 0))
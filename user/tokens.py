@@ -0,0 +1,214 @@
+"""
+Refresh token rotation backed by a compact revocation filter
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from hashlib import blake2b
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Membership tests may return false positives (at about `error_rate`
+    while holding up to `capacity` keys) but never false negatives.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from one 128-bit digest
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenRevocationStore:
+    """
+    Revoked refresh token ids, checked against an in-process Bloom filter first.
+
+    Only filter hits (real revocations plus ~error_rate false positives)
+    reach the database. Revocations written by other workers are pulled in
+    incrementally by id at most every `sync_interval` seconds; the INSERT in
+    revoke() is the authoritative check, so a token can never be rotated
+    twice even inside that window.
+
+    That INSERT is the one write every refresh pays: rotation with replay
+    detection has to record that the old token is used up somewhere all
+    workers see. The filter removes the SELECT that would otherwise precede
+    it, and rejects replays of already-synced tokens before the user lookup.
+
+    The filter is built in a background thread. Until it is ready, and while
+    an oversized filter is being rebuilt, checks fall back to the database
+    (or keep using the previous filter), so no request waits for a build.
+    Only one build runs at a time, and after a failed build the next attempt
+    waits `retry_delay` seconds, doubling up to `max_retry_delay`.
+    """
+    load_chunk_size = 10000
+    retry_delay = 5.0
+    max_retry_delay = 300.0
+
+    def __init__(self, capacity, error_rate, sync_interval):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.filter = None
+        self.last_id = 0
+        self.last_sync = 0.0
+        self.lock = threading.Lock()
+        self.building = False
+        self.failures = 0
+        self.next_build_at = 0.0
+
+    def current_filter(self):
+        """Return an up-to-date filter, or None if none has been built yet"""
+        bloom = self.filter
+        if bloom is None or bloom.count > bloom.capacity:
+            self.start_build()
+            if bloom is None:
+                return None
+
+        now = time.monotonic()
+        if now - self.last_sync >= self.sync_interval:
+            with self.lock:
+                if now - self.last_sync >= self.sync_interval:
+                    self.last_id = self._load(self.filter, self.last_id)
+                    self.last_sync = now
+        return self.filter
+
+    def start_build(self):
+        with self.lock:
+            if self.building or time.monotonic() < self.next_build_at:
+                return
+            self.building = True
+        threading.Thread(target=self._build_in_background, name='token-revocation-filter', daemon=True).start()
+
+    def _build_in_background(self):
+        try:
+            self.build()
+        except Exception as e:
+            self.failures += 1
+            delay = min(self.retry_delay * 2 ** (self.failures - 1), self.max_retry_delay)
+            self.next_build_at = time.monotonic() + delay
+            logger.error(f"Could not build the token revocation filter, retrying in {delay:.0f}s: {str(e)}")
+        else:
+            self.failures = 0
+        finally:
+            self.building = False
+
+    def build(self):
+        """Build a filter sized for the current number of revocations and swap it in"""
+        live = RevokedToken.objects.count()
+        bloom = BloomFilter(max(self.capacity, live * 2), self.error_rate)
+        last_id = self._load(bloom, 0)
+        with self.lock:
+            # Catch up with revocations written while the filter was loading
+            self.last_id = self._load(bloom, last_id)
+            self.filter = bloom
+            self.last_sync = time.monotonic()
+        logger.info(f"Token revocation filter built with {bloom.count} entries")
+
+    def _load(self, bloom, after_id):
+        """Add revocations with id > after_id to bloom, returning the last id seen"""
+        while True:
+            rows = list(
+                RevokedToken.objects.filter(id__gt=after_id).order_by('id')
+                .values_list('id', 'jti')[:self.load_chunk_size]
+            )
+            if not rows:
+                return after_id
+            for _, jti in rows:
+                bloom.add(jti)
+            after_id = rows[-1][0]
+
+    def is_revoked(self, jti):
+        bloom = self.current_filter()
+        if bloom is not None and jti not in bloom:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, expires_at):
+        """Record a revocation; returns False if the token was already revoked"""
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        return True
+
+
+revocation_store = TokenRevocationStore(
+    capacity=getattr(settings, 'TOKEN_REVOCATION_FILTER_CAPACITY', 1_000_000),
+    error_rate=getattr(settings, 'TOKEN_REVOCATION_FILTER_ERROR_RATE', 0.001),
+    sync_interval=getattr(settings, 'TOKEN_REVOCATION_SYNC_SECONDS', 1.0),
+)
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer that rotates the refresh token and revokes the old one.
+
+    Replaces simplejwt's blacklist app, which needs an OutstandingToken row
+    per issued token plus a blacklist lookup on every refresh. Here a
+    refresh costs one filter check and one INSERT of the old token's jti
+    (see TokenRevocationStore for why that write stays).
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh[api_settings.JTI_CLAIM]
+
+        if revocation_store.is_revoked(jti):
+            raise InvalidToken('Token is revoked')
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        if user_id:
+            user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(
+                    self.error_messages['no_active_account'],
+                    'no_active_account',
+                )
+
+        expires_at = datetime.fromtimestamp(refresh['exp'], tz=dt_timezone.utc)
+        if not revocation_store.revoke(jti, expires_at):
+            # Lost a race with another refresh of the same token
+            raise InvalidToken('Token is revoked')
+
+        data = {'access': str(refresh.access_token)}
+
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        data['refresh'] = str(refresh)
+        return data
@@ -6,5 +6,6 @@ urlpatterns = [
     path('login/', views.LoginView.as_view(), name='login'),
     path('', views.UserListCreateView.as_view(), name='user-list'),
     path('<uuid:uuid>/', views.UserDetailView.as_view(), name='user-detail'),
+    path('<uuid:uuid>/activity/', views.UserActivityView.as_view(), name='user-activity'),
     
 ]
@@ -3,11 +3,23 @@ from django.shortcuts import render
 # Create your views here.
 from rest_framework import generics, permissions
 from .models import CustomUser
-from .serializers import CustomUserSerializer, RegisterSerializer, LoginSerializer
+from .fields import looks_like_phone_number, normalize_phone_number
+from .serializers import CustomUserSerializer, CustomUserReadSerializer, RegisterSerializer, LoginSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.response import Response
 from rest_framework import status
-from notification.services import NotificationService
+from django.http import Http404
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from ecommerce import tasks
+from notification.tasks import send_welcome_email
+from . import activity
+from .deletion import delete_users
+from .models import ActivityLog
+
+User = get_user_model()
 
 
 
@@ -17,6 +29,16 @@ class UserListCreateView(generics.ListCreateAPIView):
     serializer_class = CustomUserSerializer
     permission_classes = [permissions.IsAdminUser]
 
+    def list(self, request, *args, **kwargs):
+        # Fast read path: map values_list() rows instead of serializing model instances
+        queryset = CustomUserReadSerializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(CustomUserReadSerializer.many(page))
+
+        return Response(CustomUserReadSerializer.many(queryset))
+
 # Retrieve, update, or delete a single user
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = CustomUser.objects.all()
@@ -24,6 +46,24 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAdminUser]
     lookup_field = 'uuid'
 
+    def perform_destroy(self, instance):
+        # Chunked, so a long-lived account's notifications and orders are never all in memory
+        delete_users([instance.pk])
+        activity.record(ActivityLog.ADMIN_DELETE, instance.pk, actor=self.request.user, request=self.request)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Fast read path: fetch a single row tuple instead of a model instance
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        row = CustomUserReadSerializer.values(
+            queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        ).first()
+
+        if row is None:
+            raise Http404
+
+        return Response(CustomUserReadSerializer.to_representation(row))
+
 
 class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
@@ -36,17 +76,13 @@ class RegisterView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
-
-        # Send welcome email notification
-        try:
-            NotificationService.send_welcome_email(user)
-        except Exception as e:
-            # Log error but don't fail registration if email fails
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to send welcome email to {user.email}: {str(e)}")
+        with transaction.atomic():
+            user = serializer.save()
+            # Welcome email runs in the background after the user row is committed,
+            # so SMTP latency or failures never hold up the response
+            tasks.dispatch_on_commit(send_welcome_email, user.pk)
 
+        activity.record(ActivityLog.REGISTER, user, request=request)
         refresh = RefreshToken.for_user(user)
 
         data = serializer.data
@@ -69,7 +105,8 @@ class LoginView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         from django.contrib.auth import authenticate
         
-        email = request.data.get('email')
+        # 'email' may also hold a phone number or username; 'phone_number' is accepted too
+        email = request.data.get('email') or request.data.get('phone_number')
         password = request.data.get('password')
         
         if not email or not password:
@@ -77,17 +114,32 @@ class LoginView(generics.CreateAPIView):
                 {'error': 'Email and password are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if not isinstance(email, str) or not isinstance(password, str):
+            return Response(
+                {'error': 'Email and password must be strings'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Authenticate user - try email first, then username
+        # Authenticate user - look up by email or phone number (one query on a
+        # unique index), then fall back to username
         user = None
-        try:
-            user_obj = User.objects.get(email=email)
+        if '@' in email:
+            lookup = {'email': email}
+        elif looks_like_phone_number(email):
+            lookup = {'phone_number': normalize_phone_number(email)}
+        else:
+            lookup = None
+        # Only the kind of identifier goes in the audit trail, never the value
+        identifier_type = next(iter(lookup)) if lookup else 'username'
+
+        user_obj = User.objects.filter(**lookup).only('username').first() if lookup else None
+        if user_obj is not None:
             user = authenticate(request, username=user_obj.username, password=password)
-        except User.DoesNotExist:
-            # Try to authenticate with username
+        else:
             user = authenticate(request, username=email, password=password)
         
         if user is None:
+                activity.record(ActivityLog.LOGIN_FAILED, user_obj, request=request, identifier_type=identifier_type)
                 return Response(
                     {'error': 'Invalid email or password'},
                     status=status.HTTP_401_UNAUTHORIZED
@@ -99,6 +151,8 @@ class LoginView(generics.CreateAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        activity.record(ActivityLog.LOGIN, user, request=request)
+
         # Generate tokens
         refresh = RefreshToken.for_user(user)
         
@@ -112,3 +166,42 @@ class LoginView(generics.CreateAPIView):
                 'username': user.username,
             }
         }, status=status.HTTP_200_OK)
+
+
+class UserActivityView(generics.GenericAPIView):
+    """
+    A user's audit trail, newest first.
+
+    Optional ISO 8601 `since`/`until` bound the time range; `limit` caps
+    the number of events (default 100, max 1000).
+    """
+    queryset = CustomUser.objects.all()
+    permission_classes = [permissions.IsAdminUser]
+    lookup_field = 'uuid'
+    max_limit = 1000
+
+    def get(self, request, uuid):
+        user_id = self.get_queryset().filter(uuid=uuid).values_list('pk', flat=True).first()
+        if user_id is None:
+            raise Http404
+
+        bounds = {}
+        for name in ('since', 'until'):
+            value = request.query_params.get(name)
+            if value:
+                try:
+                    bounds[name] = parse_datetime(value)
+                except ValueError:
+                    # Well formed but out of range, e.g. month 13
+                    bounds[name] = None
+                if bounds[name] is None:
+                    raise ValidationError({name: 'Expected an ISO 8601 datetime'})
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer'})
+
+        events = activity.for_user(user_id, **bounds).values(
+            'id', 'action', 'actor_id', 'object_id', 'ip_address', 'details', 'created_at',
+        )[:max(limit, 0)]
+        return Response(list(events))